@@ -0,0 +1,101 @@
+"""Add indexes and unique constraints for hot lookup paths
+
+Uniqueness is enforced with unique indexes so the migration also runs on
+SQLite without rebuilding tables. Databases created from the current models
+by 0001 already have these indexes, so each one is only created when missing.
+
+Before any index is created, every table that is getting a unique index is
+checked for rows that would violate it. If any are found the migration
+stops with a report of the duplicated keys so they can be merged by hand;
+rows are never deleted automatically.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ('ix_attendance_employee_date', 'attendance', ['employee_id', 'date'], False),
+    ('uq_payrolls_employee_period', 'payrolls', ['employee_id', 'pay_period_id'], True),
+    ('ix_payrolls_pay_period_id', 'payrolls', ['pay_period_id'], False),
+    ('ix_payroll_entries_payroll_id', 'payroll_entries', ['payroll_id'], False),
+    ('uq_leave_balances_employee_type_year', 'leave_balances', ['employee_id', 'leave_type_id', 'year'], True),
+    ('ix_leave_requests_status_employee', 'leave_requests', ['status', 'employee_id'], False),
+    ('uq_timesheets_employee_period', 'timesheets', ['employee_id', 'pay_period_id'], True),
+    ('ix_timesheets_pay_period_id', 'timesheets', ['pay_period_id'], False),
+    ('uq_time_entries_timesheet_date', 'time_entries', ['timesheet_id', 'date'], True),
+    ('ix_employee_compensations_employee_effective', 'employee_compensations', ['employee_id', 'effective_date'], False),
+    ('ix_employees_status_department', 'employees', ['status', 'department_id'], False),
+    ('ix_employees_manager_id', 'employees', ['manager_id'], False),
+]
+
+
+def _existing_indexes(inspector, table):
+    if not inspector.has_table(table):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+# Duplicated keys listed per index in the report
+DUPLICATE_EXAMPLES = 5
+
+
+def _duplicates(bind, table, columns):
+    """Return the number of duplicated keys and a few example keys."""
+    key = ', '.join(columns)
+    groups = f'SELECT {key}, COUNT(*) AS copies FROM {table} GROUP BY {key} HAVING COUNT(*) > 1'
+    count = bind.execute(sa.text(f'SELECT COUNT(*) FROM ({groups}) AS duplicated')).scalar()
+    if not count:
+        return 0, []
+    examples = bind.execute(sa.text(f'{groups} ORDER BY {key} LIMIT {DUPLICATE_EXAMPLES}')).all()
+    return count, examples
+
+
+def _check_duplicates(bind, pending):
+    problems = []
+    for name, table, columns, unique in pending:
+        if not unique:
+            continue
+        count, examples = _duplicates(bind, table, columns)
+        if not count:
+            continue
+        lines = [f'  {table} ({", ".join(columns)}): {count} duplicated key(s), needed by {name}']
+        for *values, copies in examples:
+            described = ', '.join(f'{column}={value!r}' for column, value in zip(columns, values))
+            lines.append(f'    {described}: {copies} rows')
+        problems.append('\n'.join(lines))
+
+    if problems:
+        raise RuntimeError(
+            'Cannot add unique indexes while duplicate rows exist. Merge or delete the '
+            'duplicates below, then run the migration again:\n' + '\n'.join(problems)
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    pending = []
+    for index in INDEXES:
+        name, table, _columns, _unique = index
+        existing = _existing_indexes(inspector, table)
+        if existing is None or name in existing:
+            continue
+        pending.append(index)
+
+    _check_duplicates(bind, pending)
+    for name, table, columns, unique in pending:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, _columns, _unique in reversed(INDEXES):
+        existing = _existing_indexes(inspector, table)
+        if existing and name in existing:
+            op.drop_index(name, table_name=table)
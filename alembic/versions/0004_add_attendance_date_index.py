@@ -0,0 +1,34 @@
+"""Index attendance by date for organisation-wide date range reports
+
+``ix_attendance_employee_date`` only serves ranges for one employee; the
+dashboard and attendance reports filter every employee's records by date,
+optionally narrowed by status.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_attendance_date_status'
+
+
+def _existing_indexes(inspector):
+    if not inspector.has_table('attendance'):
+        return None
+    return {index['name'] for index in inspector.get_indexes('attendance')}
+
+
+def upgrade():
+    existing = _existing_indexes(sa.inspect(op.get_bind()))
+    if existing is not None and INDEX_NAME not in existing:
+        op.create_index(INDEX_NAME, 'attendance', ['date', 'status'])
+
+
+def downgrade():
+    existing = _existing_indexes(sa.inspect(op.get_bind()))
+    if existing and INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name='attendance')
@@ -0,0 +1,29 @@
+"""Add the daily attendance rollup table and backfill it from attendance
+
+Databases created from the current models by 0001 already have the table;
+it is only created when missing, and rebuilt from the raw sessions either
+way.
+"""
+
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from models import AttendanceDaily
+    from utils.attendance_rollups import rebuild_attendance_rollups
+
+    bind = op.get_bind()
+    AttendanceDaily.__table__.create(bind, checkfirst=True)
+    rebuild_attendance_rollups(connection=bind)
+
+
+def downgrade():
+    from models import AttendanceDaily
+
+    bind = op.get_bind()
+    AttendanceDaily.__table__.drop(bind, checkfirst=True)
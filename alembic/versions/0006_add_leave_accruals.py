@@ -0,0 +1,49 @@
+"""Add the leave accrual ledger and record approved timesheets as accrued
+
+Timesheets approved before the ledger existed have already added to the
+leave balances, so each gets a ledger row and is never accrued again. The
+row's year is the year the timesheet was approved; the rate and hours that
+were credited back then are unknown, so ``accrual_rate`` and
+``hours_accrued`` are left NULL. Databases created from the current models
+by 0001 already have the table; it is only created when missing.
+"""
+
+from datetime import datetime
+
+from alembic import op
+from sqlalchemy import Integer, cast, exists, extract, func, insert, literal, select
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from models import LeaveAccrual, Timesheet
+
+    bind = op.get_bind()
+    LeaveAccrual.__table__.create(bind, checkfirst=True)
+
+    # Approval year, falling back to the timesheet's last change for rows
+    # approved before approved_at was recorded
+    year = func.coalesce(
+        *(cast(extract('year', column), Integer)
+          for column in (Timesheet.approved_at, Timesheet.updated_at, Timesheet.created_at)),
+        literal(datetime.now().year),
+    )
+    approved = (
+        select(Timesheet.id, Timesheet.employee_id, year, Timesheet.total_hours, literal(datetime.utcnow()))
+        .where(Timesheet.status == 'Approved', Timesheet.total_hours > 0,
+               ~exists().where(LeaveAccrual.timesheet_id == Timesheet.id))
+    )
+    bind.execute(insert(LeaveAccrual.__table__).from_select(
+        ['timesheet_id', 'employee_id', 'year', 'hours_worked', 'created_at'],
+        approved,
+    ))
+
+
+def downgrade():
+    from models import LeaveAccrual
+
+    LeaveAccrual.__table__.drop(op.get_bind(), checkfirst=True)
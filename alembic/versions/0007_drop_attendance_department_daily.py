@@ -0,0 +1,51 @@
+"""Drop the per-department attendance rollup
+
+Dashboard counts are grouped straight from ``attendance_daily``, whose
+``(date, status)`` index covers them, so the per-department totals are no
+longer kept. Downgrading recreates the table and rebuilds it from
+``attendance_daily``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+TABLE = 'attendance_department_daily'
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table(TABLE):
+        op.drop_table(TABLE)
+
+
+def downgrade():
+    op.create_table(
+        TABLE,
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('department_id', sa.Integer(), sa.ForeignKey('departments.id')),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('employees', sa.Integer(), nullable=False),
+        sa.Column('present', sa.Integer(), nullable=False),
+        sa.Column('late', sa.Integer(), nullable=False),
+        sa.Column('absent', sa.Integer(), nullable=False),
+        sa.Column('sessions', sa.Integer(), nullable=False),
+        sa.Column('worked_seconds', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('department_id', 'date', name='uq_attendance_department_daily'),
+    )
+    op.create_index('ix_attendance_department_daily_date', TABLE, ['date'])
+    op.execute(
+        f"""
+        INSERT INTO {TABLE} (department_id, date, employees, present, late, absent, sessions, worked_seconds)
+        SELECT department_id, date, COUNT(id),
+               SUM(CASE WHEN status = 'Present' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Late' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Absent' THEN 1 ELSE 0 END),
+               COALESCE(SUM(sessions), 0), COALESCE(SUM(worked_seconds), 0)
+        FROM attendance_daily
+        GROUP BY department_id, date
+        """
+    )
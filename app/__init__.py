@@ -54,6 +54,7 @@ def create_app(config_object=None):
     from routes.timesheets import timesheet_bp
     from routes.payroll import payroll
     from routes.budgeting import budgeting_bp
+    from routes.jobs import jobs_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
@@ -66,6 +67,7 @@ def create_app(config_object=None):
     app.register_blueprint(timesheet_bp, url_prefix='/timesheets')
     app.register_blueprint(payroll, url_prefix='/payroll')
     app.register_blueprint(budgeting_bp, url_prefix='/budgeting')
+    app.register_blueprint(jobs_bp)
 
     with app.app_context():
         import models
@@ -0,0 +1,112 @@
+"""Benchmark extract()-based month filters vs. sargable date range predicates.
+
+Builds a synthetic attendance table in a SQLite file (reused between runs
+with the same row count) and times the dashboard's monthly attendance query
+written both ways, with the query plan SQLite chose for each. No Flask app
+is needed.
+
+    python benchmarks/date_range_filters.py --rows 10000000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (  # noqa: E402
+    Column, Date, Index, Integer, MetaData, String, Table, create_engine, extract, func, insert, select,
+)
+
+from utils.date_ranges import DateRange  # noqa: E402
+
+STATUSES = ('Present', 'Present', 'Present', 'Late', 'Absent')
+FIRST_DAY = datetime.date(2020, 1, 1)
+
+metadata = MetaData()
+attendance = Table(
+    'attendance', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('employee_id', Integer, nullable=False),
+    Column('date', Date, nullable=False),
+    Column('status', String(20)),
+    Index('ix_attendance_employee_date', 'employee_id', 'date'),
+    Index('ix_attendance_date_status', 'date', 'status'),
+)
+
+
+def build_database(path, rows, employees, batch_size=100000, seed=42):
+    engine = create_engine(f'sqlite:///{path}')
+    if os.path.exists(path):
+        with engine.connect() as connection:
+            if connection.scalar(select(func.count()).select_from(attendance)) == rows:
+                return engine
+        os.remove(path)
+
+    metadata.create_all(engine)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch_size):
+            connection.execute(insert(attendance), [
+                {'employee_id': n % employees + 1,
+                 'date': FIRST_DAY + datetime.timedelta(days=n // employees),
+                 'status': rng.choice(STATUSES)}
+                for n in range(offset, min(offset + batch_size, rows))
+            ])
+        connection.exec_driver_sql('ANALYZE')
+    print(f'built {rows} rows in {time.perf_counter() - started:.1f}s')
+    return engine
+
+
+def monthly_query(month, sargable):
+    if sargable:
+        condition = month.filter(attendance.c.date)
+    else:
+        condition = (extract('month', attendance.c.date) == month.start.month) & \
+                    (extract('year', attendance.c.date) == month.start.year)
+    return (
+        select(extract('day', attendance.c.date).label('day'), attendance.c.status, func.count())
+        .where(condition)
+        .group_by('day', attendance.c.status)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--employees', type=int, default=5000)
+    parser.add_argument('--database', default=None, help='SQLite file to build or reuse')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.gettempdir(), f'attendance_{args.rows}.sqlite')
+    engine = build_database(path, args.rows, args.employees)
+    last_day = FIRST_DAY + datetime.timedelta(days=(args.rows - 1) // args.employees)
+    month = DateRange.month_of(last_day)
+
+    print(f'{args.rows} attendance rows, {args.employees} employees, month {month.start:%Y-%m}, '
+          f'best of {args.repeat}')
+    print(f'{"filter":>10} {"seconds":>10} {"rows":>6}  plan')
+    with engine.connect() as connection:
+        results = {}
+        for label, sargable in (('extract', False), ('range', True)):
+            statement = monthly_query(month, sargable)
+            compiled = statement.compile(engine, compile_kwargs={'literal_binds': True})
+            plan = '; '.join(row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}'))
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results[label] = sorted(connection.execute(statement).all())
+                timings.append(time.perf_counter() - started)
+            print(f'{label:>10} {min(timings):>10.3f} {len(results[label]):>6}  {plan}')
+
+    if results['extract'] != results['range']:
+        raise SystemExit('extract() and range filters returned different counts')
+
+
+if __name__ == '__main__':
+    main()
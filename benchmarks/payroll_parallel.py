@@ -0,0 +1,97 @@
+"""Benchmark serial vs. multi-process payroll computation.
+
+Uses synthetic data only; no database or Flask app is needed.
+
+    python benchmarks/payroll_parallel.py --employees 50000 --max-workers 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.payroll_compute import (  # noqa: E402
+    ComponentInput,
+    PayslipInput,
+    compute_payslip,
+    compute_payslips_parallel,
+)
+
+COMPONENT_TYPES = ('allowance', 'bonus', 'deduction', 'tax')
+
+
+def build_data(employees, structures, components_per_structure, seed=42):
+    rng = random.Random(seed)
+    components = {
+        structure_id: [
+            ComponentInput(f'Component {structure_id}-{i}', rng.choice(COMPONENT_TYPES), round(rng.uniform(10, 500), 2))
+            for i in range(components_per_structure)
+        ]
+        for structure_id in range(1, structures + 1)
+    }
+    inputs = [
+        PayslipInput(
+            employee_id=employee_id,
+            base_salary=round(rng.uniform(30000, 150000), 2),
+            salary_type=rng.choice(('Annual', 'Annual', 'Annual', 'Monthly')),
+            salary_structure_id=rng.randint(1, structures),
+        )
+        for employee_id in range(1, employees + 1)
+    ]
+    return inputs, components
+
+
+def run_serial(inputs, components):
+    return [compute_payslip(i, components.get(i.salary_structure_id, ())) for i in inputs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=50000)
+    parser.add_argument('--structures', type=int, default=20)
+    parser.add_argument('--components', type=int, default=8, help='components per salary structure')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--start-method', default=None, help='fork, spawn or forkserver')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    inputs, components = build_data(args.employees, args.structures, args.components)
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    print(f'{args.employees} employees, {args.structures} structures, '
+          f'{args.components} components each, best of {args.repeat}')
+    print(f'{"workers":>8} {"seconds":>10} {"speedup":>8}')
+
+    baseline = None
+    expected = None
+    for workers in worker_counts:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            if workers == 1:
+                result = run_serial(inputs, components)
+            else:
+                result = compute_payslips_parallel(inputs, components, workers,
+                                                   batch_size=args.batch_size, start_method=args.start_method)
+            timings.append(time.perf_counter() - started)
+
+        if expected is None:
+            expected = result
+        elif result != expected:
+            raise SystemExit(f'{workers} workers produced different payslips than the serial run')
+
+        best = min(timings)
+        baseline = baseline or best
+        print(f'{workers:>8} {best:>10.3f} {baseline / best:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -9,3 +9,31 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.join(BASE_DIR, 'static', 'uploads'))
+
+    # Background jobs
+    BACKGROUND_JOBS_INLINE = os.getenv("BACKGROUND_JOBS_INLINE", "false").lower() == "true"
+    BACKGROUND_JOB_WORKERS = int(os.getenv("BACKGROUND_JOB_WORKERS", "4"))
+
+    # Payroll runs
+    PAYROLL_CHUNK_SIZE = int(os.getenv("PAYROLL_CHUNK_SIZE", "500"))
+    PAYROLL_RUN_STALE_SECONDS = int(os.getenv("PAYROLL_RUN_STALE_SECONDS", "300"))
+
+    # Payroll computation. PAYROLL_WORKERS > 1 computes runs of at least
+    # PAYROLL_PARALLEL_MIN_EMPLOYEES in one process pool shared by all of the
+    # run's chunks; the database writes stay in the calling process.
+    PAYROLL_WORKERS = int(os.getenv("PAYROLL_WORKERS", "1"))
+    PAYROLL_PARALLEL_MIN_EMPLOYEES = int(os.getenv("PAYROLL_PARALLEL_MIN_EMPLOYEES", "5000"))
+    PAYROLL_PARALLEL_BATCH_SIZE = int(os.getenv("PAYROLL_PARALLEL_BATCH_SIZE", "2000"))
+    PAYROLL_WORKER_START_METHOD = os.getenv("PAYROLL_WORKER_START_METHOD")
+
+    # File imports are read, validated and committed this many rows at a time
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+
+    # The reporting hierarchy is cached per process and dropped on changes made
+    # here; this bounds how long changes made by other processes go unseen
+    ORG_INDEX_MAX_AGE = int(os.getenv("ORG_INDEX_MAX_AGE", "300"))
+    # Direct reports returned per org chart request
+    ORG_CHART_PAGE_SIZE = int(os.getenv("ORG_CHART_PAGE_SIZE", "50"))
+
+    # Seconds dashboard statistics are cached per role scope; 0 disables
+    DASHBOARD_STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL", "30"))
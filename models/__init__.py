@@ -1,10 +1,10 @@
 from .auth import User, Role, Permission, role_permissions
 from .employees import Department, Employee, Dependent
 from .documents import DocumentType, Document
-from .attendance import Attendance
-from .leave import LeaveType, LeaveRequest, LeaveBalance
+from .attendance import Attendance, AttendanceDaily
+from .leave import LeaveType, LeaveRequest, LeaveBalance, LeaveAccrual
 from .timesheets import PayPeriod, Timesheet, TimeEntry
-from .payroll import Payroll, PayrollEntry
+from .payroll import Payroll, PayrollEntry, PayrollRun, PayrollRunError, PayrollPeriodSummary
 from .compensation import (
     SalaryStructure,
     ComponentType,
@@ -16,18 +16,22 @@ from .compensation import (
 )
 from .benefits import Benefit, EmployeeBenefit
 from .budget import Budget, BudgetItem, BudgetCategory
+from .jobs import BackgroundJob
+from .sequences import IdSequence
 
 __all__ = [
     'User', 'Role', 'Permission', 'role_permissions',
     'Department', 'Employee', 'Dependent',
     'DocumentType', 'Document',
-    'Attendance',
-    'LeaveType', 'LeaveRequest', 'LeaveBalance',
+    'Attendance', 'AttendanceDaily',
+    'LeaveType', 'LeaveRequest', 'LeaveBalance', 'LeaveAccrual',
     'PayPeriod', 'Timesheet', 'TimeEntry',
-    'Payroll', 'PayrollEntry',
+    'Payroll', 'PayrollEntry', 'PayrollRun', 'PayrollRunError', 'PayrollPeriodSummary',
     'SalaryStructure', 'ComponentType', 'IncentiveType',
     'SalaryComponent', 'EmployeeCompensation', 'EmployeeIncentive',
     'CompensationReport',
     'Benefit', 'EmployeeBenefit',
     'Budget', 'BudgetItem', 'BudgetCategory',
+    'BackgroundJob',
+    'IdSequence',
 ]
@@ -3,6 +3,10 @@ from app import db
 
 class Attendance(db.Model):
     __tablename__ = 'attendance'
+    __table_args__ = (
+        db.Index('ix_attendance_employee_date', 'employee_id', 'date'),
+        db.Index('ix_attendance_date_status', 'date', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -14,3 +18,34 @@ class Attendance(db.Model):
 
     def __repr__(self):
         return f'<Attendance {self.employee_id} {self.date}>'
+
+
+class AttendanceDaily(db.Model):
+    """One employee's attendance sessions on one day, rolled up."""
+    __tablename__ = 'attendance_daily'
+    __table_args__ = (
+        db.Index('uq_attendance_daily_employee_date', 'employee_id', 'date', unique=True),
+        db.Index('ix_attendance_daily_date_status', 'date', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    # The employee's department when the day was last rolled up
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
+    date = db.Column(db.Date, nullable=False)
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+    # Sum of the closed sessions; a session still open adds nothing
+    worked_seconds = db.Column(db.Integer, default=0, nullable=False)
+    first_in = db.Column(db.DateTime)
+    last_out = db.Column(db.DateTime)
+    # Status of the day's first session that has one
+    status = db.Column(db.String(20))
+
+    employee = db.relationship('Employee')
+
+    @property
+    def worked_hours(self):
+        return self.worked_seconds / 3600.0
+
+    def __repr__(self):
+        return f'<AttendanceDaily {self.employee_id} {self.date}>'
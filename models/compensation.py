@@ -55,6 +55,9 @@ class SalaryComponent(db.Model):
 
 class EmployeeCompensation(db.Model):
     __tablename__ = 'employee_compensations'
+    __table_args__ = (
+        db.Index('ix_employee_compensations_employee_effective', 'employee_id', 'effective_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -1,7 +1,6 @@
 from datetime import datetime, timedelta
-from sqlalchemy import or_
 from app import db
-from .compensation import EmployeeCompensation
+from utils import compensation as compensation_resolver
 
 class Department(db.Model):
     __tablename__ = 'departments'
@@ -18,6 +17,10 @@ class Department(db.Model):
 
 class Employee(db.Model):
     __tablename__ = 'employees'
+    __table_args__ = (
+        db.Index('ix_employees_status_department', 'status', 'department_id'),
+        db.Index('ix_employees_manager_id', 'manager_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.String(20), unique=True, nullable=False)
@@ -75,13 +78,7 @@ class Employee(db.Model):
 
     @property
     def current_compensation(self):
-        return EmployeeCompensation.query.filter(
-            EmployeeCompensation.employee_id == self.id,
-            or_(
-                EmployeeCompensation.end_date.is_(None),
-                EmployeeCompensation.end_date >= datetime.now().date(),
-            ),
-        ).order_by(EmployeeCompensation.effective_date.desc()).first()
+        return compensation_resolver.resolve(self.id)
 
     @property
     def base_salary(self) -> float:
@@ -102,13 +99,7 @@ class Employee(db.Model):
 
     @property
     def annual_base_salary(self) -> float:
-        comp = self.current_compensation
-        if not comp:
-            return 0.0
-        if comp.salary_type == 'Annual':
-            return comp.base_salary
-        hours = comp.hours_per_week or 40.0
-        return comp.base_salary * hours * 52
+        return compensation_resolver.annual_salary(self.current_compensation)
 
     @property
     def years_of_service(self) -> int:
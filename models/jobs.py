@@ -0,0 +1,37 @@
+from datetime import datetime
+from app import db
+
+
+class BackgroundJob(db.Model):
+    """Persisted progress of a long-running job started from the UI."""
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='Queued')  # Queued, Running, Completed, Failed
+    total = db.Column(db.Integer, default=0, nullable=False)
+    processed = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    message = db.Column(db.Text)
+    params = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    creator = db.relationship('User')
+
+    @property
+    def percent(self) -> float:
+        if self.total:
+            return round(min(self.processed + self.failed, self.total) * 100.0 / self.total, 1)
+        return 100.0 if self.status == 'Completed' else 0.0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('Completed', 'Failed')
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.job_type} {self.status}>'
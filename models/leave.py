@@ -19,6 +19,9 @@ class LeaveType(db.Model):
 
 class LeaveRequest(db.Model):
     __tablename__ = 'leave_requests'
+    __table_args__ = (
+        db.Index('ix_leave_requests_status_employee', 'status', 'employee_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -40,6 +43,9 @@ class LeaveRequest(db.Model):
 
 class LeaveBalance(db.Model):
     __tablename__ = 'leave_balances'
+    __table_args__ = (
+        db.Index('uq_leave_balances_employee_type_year', 'employee_id', 'leave_type_id', 'year', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -78,3 +84,26 @@ class LeaveBalance(db.Model):
 
     def __repr__(self):
         return f'<LeaveBalance {self.employee_id} {self.leave_type_id} {self.year}: {self.remaining_hours} hours>'
+
+
+class LeaveAccrual(db.Model):
+    """Leave accrued from one approved timesheet; a timesheet accrues at most once."""
+    __tablename__ = 'leave_accruals'
+    __table_args__ = (
+        db.Index('uq_leave_accruals_timesheet', 'timesheet_id', unique=True),
+        db.Index('ix_leave_accruals_employee_year', 'employee_id', 'year'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    timesheet_id = db.Column(db.Integer, db.ForeignKey('timesheets.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    hours_worked = db.Column(db.Float, nullable=False)
+    # Both NULL for timesheets accrued before the ledger existed, whose rate is unknown
+    accrual_rate = db.Column(db.Float)
+    # Added to the balance of every paid leave type
+    hours_accrued = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LeaveAccrual {self.timesheet_id}: {self.hours_accrued} hours>'
@@ -4,6 +4,10 @@ from app import db
 
 class Payroll(db.Model):
     __tablename__ = 'payrolls'
+    __table_args__ = (
+        db.Index('uq_payrolls_employee_period', 'employee_id', 'pay_period_id', unique=True),
+        db.Index('ix_payrolls_pay_period_id', 'pay_period_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -28,6 +32,9 @@ class Payroll(db.Model):
 
 class PayrollEntry(db.Model):
     __tablename__ = 'payroll_entries'
+    __table_args__ = (
+        db.Index('ix_payroll_entries_payroll_id', 'payroll_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     payroll_id = db.Column(db.Integer, db.ForeignKey('payrolls.id'), nullable=False)
@@ -46,3 +53,77 @@ class PayrollEntry(db.Model):
 
     def __repr__(self):
         return f'<PayrollEntry {self.component_name}: ${self.amount}>'
+
+
+class PayrollRun(db.Model):
+    """Persisted progress of a chunked payroll run for a pay period."""
+    __tablename__ = 'payroll_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pay_period_id = db.Column(db.Integer, db.ForeignKey('pay_periods.id'), nullable=False)
+    status = db.Column(db.String(20), default='Queued')  # Queued, Running, Completed, Failed
+    chunk_size = db.Column(db.Integer, nullable=False, default=500)
+    total_employees = db.Column(db.Integer, default=0, nullable=False)
+    processed_count = db.Column(db.Integer, default=0, nullable=False)
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
+    # Highest employee id covered by the last committed chunk
+    last_employee_id = db.Column(db.Integer, default=0, nullable=False)
+    message = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    pay_period = db.relationship('PayPeriod', backref=db.backref('payroll_runs', lazy='dynamic'))
+    errors = db.relationship('PayrollRunError', backref='run', lazy='dynamic', cascade='all, delete-orphan')
+
+    @property
+    def remaining_count(self) -> int:
+        return max(self.total_employees - self.processed_count - self.failed_count, 0)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('Completed', 'Failed')
+
+    def __repr__(self):
+        return f'<PayrollRun {self.pay_period_id} {self.status}>'
+
+
+class PayrollRunError(db.Model):
+    """Per-employee failure recorded during a payroll run."""
+    __tablename__ = 'payroll_run_errors'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('payroll_runs.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'))
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PayrollRunError {self.run_id} {self.employee_id}>'
+
+
+class PayrollPeriodSummary(db.Model):
+    """Per-department payroll totals for a pay period, kept in sync with its payslips."""
+    __tablename__ = 'payroll_period_summaries'
+    __table_args__ = (
+        db.UniqueConstraint('pay_period_id', 'department_id', name='uq_payroll_period_summary_department'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    pay_period_id = db.Column(db.Integer, db.ForeignKey('pay_periods.id'), nullable=False, index=True)
+    # NULL groups employees without a department
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
+    headcount = db.Column(db.Integer, default=0, nullable=False)
+    total_gross = db.Column(db.Float, default=0.0, nullable=False)
+    total_net = db.Column(db.Float, default=0.0, nullable=False)
+    total_tax = db.Column(db.Float, default=0.0, nullable=False)
+    total_deductions = db.Column(db.Float, default=0.0, nullable=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    pay_period = db.relationship('PayPeriod', backref=db.backref('payroll_summaries', lazy='dynamic'))
+    department = db.relationship('Department')
+
+    def __repr__(self):
+        return f'<PayrollPeriodSummary {self.pay_period_id} dept={self.department_id}>'
@@ -0,0 +1,12 @@
+from app import db
+
+
+class IdSequence(db.Model):
+    """Named counter handing out blocks of sequential numbers."""
+    __tablename__ = 'id_sequences'
+
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<IdSequence {self.name}={self.next_value}>'
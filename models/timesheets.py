@@ -32,15 +32,23 @@ class PayPeriod(db.Model):
         delta = self.end_date - self.start_date
         return delta.days + 1
 
+    def _summary_total(self, summary_column, payroll_aggregate):
+        from models.payroll import Payroll, PayrollPeriodSummary
+
+        total = db.session.scalar(
+            db.select(db.func.sum(getattr(PayrollPeriodSummary, summary_column)))
+            .where(PayrollPeriodSummary.pay_period_id == self.id)
+        )
+        if total is None:
+            # Not summarized yet (e.g. payslips created before the summary existed)
+            total = db.session.scalar(
+                db.select(payroll_aggregate(Payroll)).where(Payroll.pay_period_id == self.id)
+            )
+        return total or 0
+
     @property
     def total_gross(self) -> float:
-        payrolls = self.payrolls
-        if hasattr(payrolls, 'all'):
-            try:
-                payrolls = payrolls.all()
-            except Exception:
-                payrolls = []
-        return sum(p.gross_pay for p in payrolls) if payrolls else 0.0
+        return float(self._summary_total('total_gross', lambda payroll: db.func.sum(payroll.gross_pay)))
 
     def __repr__(self):
         return f'<PayPeriod {self.start_date} to {self.end_date}>'
@@ -48,6 +56,10 @@ class PayPeriod(db.Model):
 
 class Timesheet(db.Model):
     __tablename__ = 'timesheets'
+    __table_args__ = (
+        db.Index('uq_timesheets_employee_period', 'employee_id', 'pay_period_id', unique=True),
+        db.Index('ix_timesheets_pay_period_id', 'pay_period_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -71,6 +83,9 @@ class Timesheet(db.Model):
 
 class TimeEntry(db.Model):
     __tablename__ = 'time_entries'
+    __table_args__ = (
+        db.Index('uq_time_entries_timesheet_date', 'timesheet_id', 'date', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     timesheet_id = db.Column(db.Integer, db.ForeignKey('timesheets.id'), nullable=False)
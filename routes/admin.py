@@ -1,3 +1,4 @@
+import os
 import secrets
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
@@ -6,6 +7,13 @@ from sqlalchemy.exc import SQLAlchemyError
 from app import db
 from models import User, Role, Permission, Department, Employee, PayPeriod
 from utils.helpers import role_required
+from utils.import_jobs import (
+    BULK_UPDATE_JOB_TYPES,
+    bulk_update_diff_path,
+    get_import_job,
+    start_bulk_update_apply_job,
+    start_import_job,
+)
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -293,7 +301,11 @@ def delete_department(dept_id):
 def bulk_updates():
     """Bulk updates form for employee departments and managers via file upload"""
     departments = Department.query.all()
-    return render_template('admin/bulk_updates.html', departments=departments)
+    job = get_import_job(request.args.get('job_id', type=int), *BULK_UPDATE_JOB_TYPES)
+    diff_available = (job is not None and job.job_type == 'employee_bulk_update_preview'
+                      and os.path.exists(bulk_update_diff_path(job.id)))
+    return render_template('admin/bulk_updates.html', departments=departments, job=job,
+                           diff_available=diff_available)
 
 @admin_bp.route('/bulk-updates/process', methods=['POST'])
 @login_required
@@ -320,20 +332,44 @@ def process_bulk_updates():
         flash('Invalid file format. Please upload a CSV or Excel file.', 'danger')
         return redirect(url_for('admin.bulk_updates'))
     
-    try:
-        # Process the uploaded file for bulk updates
-        from utils.importers import process_employee_bulk_update
-        result = process_employee_bulk_update(uploaded_file)
-        
-        if result['success']:
-            flash(f"Successfully processed {result['updated']} employee updates. {result['errors']} errors found.", 
-                 'success' if result['errors'] == 0 else 'warning')
-        else:
-            flash(f"Error processing bulk update: {result['message']}", 'danger')
-    except Exception as e:
-        flash(f'Error processing file: {str(e)}', 'danger')
-    
-    return redirect(url_for('admin.bulk_updates'))
+    if request.form.get('dry_run'):
+        job = start_import_job('employee_bulk_update_preview', uploaded_file, created_by=current_user.id)
+        flash('Dry run started. No employees are changed until you apply the preview.', 'info')
+    else:
+        job = start_import_job('employee_bulk_update', uploaded_file, created_by=current_user.id)
+        flash('Bulk update started. Progress is shown below.', 'info')
+    return redirect(url_for('admin.bulk_updates', job_id=job.id))
+
+@admin_bp.route('/bulk-updates/<int:job_id>/diff', methods=['GET'])
+@login_required
+@role_required('Admin', 'HR')
+def download_bulk_update_diff(job_id):
+    """Download the changes found by a bulk update dry run"""
+    job = get_import_job(job_id, 'employee_bulk_update_preview')
+    if job is None or not os.path.exists(bulk_update_diff_path(job_id)):
+        flash('This preview is no longer available. Upload the file again.', 'warning')
+        return redirect(url_for('admin.bulk_updates'))
+
+    return send_file(
+        bulk_update_diff_path(job_id),
+        as_attachment=True,
+        download_name=f'bulk_update_diff_{job_id}.csv',
+        mimetype='text/csv'
+    )
+
+@admin_bp.route('/bulk-updates/<int:job_id>/apply', methods=['POST'])
+@login_required
+@role_required('Admin', 'HR')
+def apply_bulk_update(job_id):
+    """Write the changes found by a bulk update dry run"""
+    job = get_import_job(job_id, 'employee_bulk_update_preview')
+    if job is None or job.status != 'Completed' or not os.path.exists(bulk_update_diff_path(job_id)):
+        flash('This preview is no longer available. Upload the file again.', 'warning')
+        return redirect(url_for('admin.bulk_updates'))
+
+    apply_job = start_bulk_update_apply_job(job, created_by=current_user.id)
+    flash('Applying previewed changes. Progress is shown below.', 'info')
+    return redirect(url_for('admin.bulk_updates', job_id=apply_job.id))
 
 @admin_bp.route('/bulk-updates/template', methods=['GET'])
 @login_required
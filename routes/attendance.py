@@ -2,10 +2,14 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import func, extract
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, timedelta
 from app import db
-from models import Attendance, Employee, Department
+from models import Attendance, AttendanceDaily, Employee, Department
 from utils.helpers import role_required
+from utils.dashboard_stats import invalidate_dashboard_stats
+from utils.date_ranges import DateRange
+from utils.org_hierarchy import manager_scope
 
 attendance_bp = Blueprint('attendance', __name__, url_prefix='/attendance')
 
@@ -126,6 +130,7 @@ def clock_in():
             flash('Clock-in successful!', 'success')
         
         db.session.commit()
+        invalidate_dashboard_stats()
         
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -143,11 +148,11 @@ def clock_out():
     
     today = datetime.now().date()
     
-    # Find today's attendance record
+    # Find today's latest attendance session
     record = Attendance.query.filter_by(
         employee_id=current_user.employee.id,
         date=today
-    ).first()
+    ).order_by(Attendance.id.desc()).first()
     
     if not record or not record.clock_in:
         flash('You need to clock in first.', 'warning')
@@ -161,6 +166,7 @@ def clock_out():
         # Update record with clock-out time
         record.clock_out = datetime.now()
         db.session.commit()
+        invalidate_dashboard_stats()
         flash('Clock-out successful!', 'success')
         
     except SQLAlchemyError as e:
@@ -191,12 +197,11 @@ def my_attendance():
     else:
         start_date, end_date = get_default_date_range()
     
-    # Get attendance records for the date range
-    attendance_records = Attendance.query.filter(
-        Attendance.employee_id == current_user.employee.id,
-        Attendance.date >= start_date,
-        Attendance.date <= end_date
-    ).order_by(Attendance.date.desc()).all()
+    # Get the daily attendance rollups for the date range
+    attendance_records = AttendanceDaily.query.filter(
+        AttendanceDaily.employee_id == current_user.employee.id,
+        DateRange.inclusive(start_date, end_date).filter(AttendanceDaily.date)
+    ).order_by(AttendanceDaily.date.desc()).all()
     
     # Calculate working days
     business_days = sum(1 for d in range((end_date - start_date).days + 1)
@@ -238,12 +243,13 @@ def reports():
     else:
         start_date, end_date = get_default_date_range()
     
-    # Base query
-    query = db.session.query(Attendance, Employee).join(
-        Employee, Attendance.employee_id == Employee.id
+    # Base query over the daily rollups, one row per employee per day
+    query = db.session.query(AttendanceDaily).join(
+        Employee, AttendanceDaily.employee_id == Employee.id
+    ).options(
+        contains_eager(AttendanceDaily.employee).joinedload(Employee.department)
     ).filter(
-        Attendance.date >= start_date,
-        Attendance.date <= end_date
+        DateRange.inclusive(start_date, end_date).filter(AttendanceDaily.date)
     )
     
     # Apply filters
@@ -254,23 +260,21 @@ def reports():
         query = query.filter(Employee.department_id == department_id)
     
     if status:
-        query = query.filter(Attendance.status == status)
+        query = query.filter(AttendanceDaily.status == status)
     
     # Apply manager filter for Manager role
     if current_user.role.name == 'Manager' and current_user.employee:
-        # Get all subordinates
-        subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-        query = query.filter(Employee.id.in_(subordinate_ids))
+        # Everyone in the manager's reporting subtree
+        query = query.filter(Employee.id.in_(manager_scope(current_user.employee.id)))
     
     # Execute query
-    results = query.order_by(Attendance.date.desc(), Employee.last_name).all()
+    results = query.order_by(AttendanceDaily.date.desc(), Employee.last_name).all()
     
     # Get all employees and departments for filters
     if current_user.role.name in ['Admin', 'HR']:
         employees = Employee.query.filter_by(status='Active').all()
     elif current_user.role.name == 'Manager' and current_user.employee:
-        subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-        employees = Employee.query.filter(Employee.id.in_(subordinate_ids)).all()
+        employees = Employee.query.filter(Employee.id.in_(manager_scope(current_user.employee.id))).all()
     else:
         employees = []
     
@@ -355,6 +359,7 @@ def manage_attendance():
                 db.session.add(attendance)
             
             db.session.commit()
+            invalidate_dashboard_stats()
             flash('Attendance record saved successfully.', 'success')
             
         except ValueError as e:
@@ -367,9 +372,8 @@ def manage_attendance():
     if current_user.role.name in ['Admin', 'HR']:
         employees = Employee.query.filter_by(status='Active').all()
     elif current_user.role.name == 'Manager' and current_user.employee:
-        subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
         employees = Employee.query.filter(
-            Employee.id.in_(subordinate_ids),
+            Employee.id.in_(manager_scope(current_user.employee.id)),
             Employee.status == 'Active'
         ).all()
     else:
@@ -379,14 +383,5 @@ def manage_attendance():
 
 def get_default_date_range():
     """Return default date range (current month)"""
-    today = datetime.now().date()
-    start_date = today.replace(day=1)
-    
-    # Calculate end of month
-    if today.month == 12:
-        end_date = today.replace(day=31)
-    else:
-        next_month = today.replace(month=today.month+1, day=1)
-        end_date = next_month - timedelta(days=1)
-    
-    return start_date, end_date
+    month = DateRange.month_of(datetime.now().date())
+    return month.start, month.last
@@ -4,19 +4,34 @@ from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
 from sqlalchemy import and_, or_, func
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
 import os
 import io
 import csv
 from decimal import Decimal
-import pandas as pd
 
 from app import db
 from models import (
     User, Employee, Department, SalaryStructure, SalaryComponent,
     EmployeeCompensation, PayPeriod, Payroll, PayrollEntry, Benefit,
-    EmployeeBenefit, Budget, BudgetItem, BudgetCategory, CompensationReport
+    EmployeeBenefit, Budget, BudgetItem, BudgetCategory, CompensationReport,
+    BackgroundJob
 )
+from utils import compensation as compensation_resolver
+from utils.benefit_costs import employer_benefit_costs
+from utils.budget_projection import (
+    ProjectionAssumptions,
+    benefits_column,
+    employee_costs,
+    load_workforce,
+    project_years,
+    summarize,
+    workforce_benefit_costs,
+)
+from utils.compensation_reports import run_compensation_report_job
 from utils.helpers import role_required
+from utils.import_jobs import get_import_job, start_import_job, upload_extension
+from utils.jobs import create_job, start_job
 
 # Create blueprint
 budgeting_bp = Blueprint('budgeting', __name__)
@@ -32,63 +47,19 @@ def get_department_employees(department_id):
 
 def get_employee_annual_salary(employee_id):
     """Get employee's current annual salary, accounting for hourly wages."""
-    compensation = EmployeeCompensation.query.filter(
-        EmployeeCompensation.employee_id == employee_id,
-        or_(
-            EmployeeCompensation.end_date.is_(None),
-            EmployeeCompensation.end_date >= datetime.now().date()
-        )
-    ).order_by(EmployeeCompensation.effective_date.desc()).first()
-
-    if not compensation:
-        return 0
-
-    if compensation.salary_type == 'Annual':
-        return compensation.base_salary
-
-    hours = compensation.hours_per_week or 40.0
-    return compensation.base_salary * hours * 52
+    return compensation_resolver.annual_salary(compensation_resolver.resolve(employee_id))
 
 def get_total_benefits_cost(employee_id):
     """Get total annual benefits cost for an employee"""
-    benefits = EmployeeBenefit.query.filter(
-        EmployeeBenefit.employee_id == employee_id,
-        or_(
-            EmployeeBenefit.end_date.is_(None), 
-            EmployeeBenefit.end_date >= datetime.now().date()
-        )
-    ).all()
-    
-    total = 0
-    
-    for benefit in benefits:
-        # Get the benefit plan to calculate employer contribution
-        plan = benefit.benefit_plan
-        if plan:
-            if plan.employer_contribution:
-                total += plan.employer_contribution * 12  # Annual cost
-            elif plan.employer_contribution_percentage:
-                # Calculate based on salary percentage
-                salary = get_employee_annual_salary(employee_id)
-                total += salary * (plan.employer_contribution_percentage / 100)
-    
-    return total
+    salaries = {employee_id: get_employee_annual_salary(employee_id)}
+    return employer_benefit_costs(salaries, [employee_id]).total
 
 def calculate_payroll_expense(department_id=None):
     """Aggregate salary and benefit costs for the company or a department."""
-    employees_query = Employee.query.filter_by(status='Active')
-    if department_id:
-        employees_query = employees_query.filter_by(department_id=department_id)
-
-    employees = employees_query.all()
-
-    total_salary = 0
-    total_benefits = 0
-
-    for employee in employees:
-        total_salary += get_employee_annual_salary(employee.id)
-        total_benefits += get_total_benefits_cost(employee.id)
+    workforce = load_workforce(department_id)
 
+    total_salary = float(workforce['annual_salary'].sum())
+    total_benefits = workforce_benefit_costs(workforce, department_id).total
     total_expense = total_salary + total_benefits
 
     return total_salary, total_benefits, total_expense
@@ -316,60 +287,19 @@ def import_budget_items(budget_id):
             flash('No file selected.', 'danger')
             return redirect(url_for('budgeting.import_budget_items', budget_id=budget_id))
         
-        try:
-            # Read file based on extension
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(file)
-            else:  # Excel
-                df = pd.read_excel(file)
-            
-            # Process each row
-            success_count = 0
-            error_count = 0
-            
-            for index, row in df.iterrows():
-                try:
-                    category = row['category']
-                    subcategory = row.get('subcategory', '')
-                    description = row.get('description', '')
-                    amount = float(row['amount'])
-                    
-                    # Handle employee if present
-                    employee_id = None
-                    if 'employee_id' in row and not pd.isna(row['employee_id']):
-                        # Look up employee by employee_id field
-                        employee = Employee.query.filter_by(employee_id=row['employee_id']).first()
-                        if employee:
-                            employee_id = employee.id
-                    
-                    # Create budget item
-                    item = BudgetItem(
-                        budget_id=budget_id,
-                        category=category,
-                        subcategory=subcategory,
-                        description=description,
-                        amount=amount,
-                        employee_id=employee_id
-                    )
-                    
-                    db.session.add(item)
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    continue
-            
-            # Commit all at once
-            db.session.commit()
-            
-            flash(f'Successfully imported {success_count} budget items. {error_count} errors.', 'success')
-            return redirect(url_for('budgeting.budget_details', budget_id=budget_id))
-            
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error importing budget items: {str(e)}', 'danger')
+        if upload_extension(file.filename) is None:
+            flash('Invalid file format. Please upload a CSV or Excel file.', 'danger')
+            return redirect(url_for('budgeting.import_budget_items', budget_id=budget_id))
+
+        job = start_import_job('budget_item_import', file, created_by=current_user.id,
+                               params={'budget_id': budget_id})
+        flash('Budget item import started. Progress is shown below.', 'info')
+        return redirect(url_for('budgeting.import_budget_items', budget_id=budget_id, job_id=job.id))
     
-    return render_template('budgeting/import_budget_items.html', budget=budget)
+    job = get_import_job(request.args.get('job_id', type=int), 'budget_item_import')
+    if job is not None and (job.params or {}).get('budget_id') != budget_id:
+        job = None
+    return render_template('budgeting/import_budget_items.html', budget=budget, job=job)
 
 @budgeting_bp.route('/budgets/<int:budget_id>/template')
 @login_required
@@ -412,72 +342,33 @@ def generate_projection():
     """Generate personnel budget projection"""
     year = request.args.get('year', get_current_year(), type=int)
     department_id = request.args.get('department_id', type=int)
+    assumptions = ProjectionAssumptions(
+        years=min(max(request.args.get('years', 1, type=int), 1), 10),
+        raise_rate=request.args.get('raise_pct', 0.0, type=float) / 100,
+        headcount_growth_rate=request.args.get('growth_pct', 0.0, type=float) / 100,
+    )
     
-    # Get employees based on department filter
-    employees_query = Employee.query.filter_by(status='Active')
-    if department_id:
-        employees_query = employees_query.filter_by(department_id=department_id)
-    
-    employees = employees_query.all()
-    
-    # Generate projection data
-    projection_data = []
-    total_salary = 0
-    total_retirement = 0
-    total_healthcare = 0
-    total_taxes = 0
-    total_cost = 0
-    
-    for employee in employees:
-        # Get base salary
-        base_salary = get_employee_annual_salary(employee.id)
-        
-        # Calculate 401K contributions (assumes 4% match if enrolled)
-        retirement_contribution = base_salary * 0.04 if employee.is_401k_enrolled else 0
-        
-        # Calculate payroll taxes (simplified: 7.65% FICA, 0.6% FUTA, 3.5% SUTA)
-        fica = base_salary * 0.0765
-        futa = min(base_salary, 7000) * 0.006  # FUTA only applies to first $7000
-        suta = base_salary * 0.035  # Varies by state, using example rate
-        total_tax = fica + futa + suta
-        
-        # Placeholder for healthcare/benefits cost
-        healthcare_cost = 0
-        
-        # Calculate total
-        total = base_salary + retirement_contribution + total_tax + healthcare_cost
-        
-        # Add to projection
-        projection_data.append({
-            'employee': employee,
-            'base_salary': base_salary,
-            'retirement': retirement_contribution,
-            'taxes': total_tax,
-            'benefits': healthcare_cost,
-            'total': total
-        })
-        
-        # Update totals
-        total_salary += base_salary
-        total_retirement += retirement_contribution
-        total_healthcare += healthcare_cost
-        total_taxes += total_tax
-        total_cost += total
-
-    total_benefits = total_retirement + total_healthcare
+    # Load the workforce once and compute every cost column vectorized
+    workforce = load_workforce(department_id)
+    benefits = benefits_column(workforce, workforce_benefit_costs(workforce, department_id))
+    costs = employee_costs(workforce, benefits)
+    costs['full_name'] = costs['first_name'] + ' ' + costs['last_name']
+    totals = summarize(costs)
     
     return render_template(
         'budgeting/projection.html',
-        projection_data=projection_data,
+        projection_data=costs.to_dict('records'),
+        yearly_projection=project_years(costs, workforce, year, assumptions),
+        assumptions=assumptions,
         year=year,
         department_id=department_id,
         departments=Department.query.all(),
-        total_salary=total_salary,
-        total_retirement=total_retirement,
-        total_healthcare=total_healthcare,
-        total_benefits=total_benefits,
-        total_taxes=total_taxes,
-        total_cost=total_cost
+        total_salary=totals['base_salary'],
+        total_retirement=totals['retirement'],
+        total_healthcare=totals['benefits'],
+        total_benefits=totals['retirement'] + totals['benefits'],
+        total_taxes=totals['taxes'],
+        total_cost=totals['total']
     )
 
 
@@ -569,12 +460,16 @@ def budget_comparison():
 @role_required('Admin', 'HR', 'Finance')
 def compensation_reports():
     """View all compensation reports"""
-    reports = CompensationReport.query.order_by(
+    reports = CompensationReport.query.options(joinedload(CompensationReport.employee)).order_by(
         CompensationReport.year.desc(),
         CompensationReport.generated_date.desc()
     ).all()
+
+    # Progress of a generation job started from generate_compensation_reports
+    job_id = request.args.get('job_id', type=int)
+    job = db.session.get(BackgroundJob, job_id) if job_id else None
     
-    return render_template('budgeting/compensation_reports.html', reports=reports)
+    return render_template('budgeting/compensation_reports.html', reports=reports, job=job)
 
 @budgeting_bp.route('/generate-compensation-reports', methods=['GET', 'POST'])
 @login_required
@@ -584,123 +479,18 @@ def generate_compensation_reports():
     if request.method == 'POST':
         try:
             year = int(request.form['year'])
-            
-            # Get employees based on department filter
-            department_id = request.form.get('department_id', type=int)
-            employees_query = Employee.query.filter_by(status='Active')
-            if department_id:
-                employees_query = employees_query.filter_by(department_id=department_id)
-            
-            employees = employees_query.all()
-            generated_count = 0
-            
-            for employee in employees:
-                # Calculate compensation components
-                base_salary = get_employee_annual_salary(employee.id)
-                
-                # Get any bonuses paid during the year
-                bonus_components = SalaryComponent.query.filter_by(component_type=ComponentType.BONUS).all()
-                bonus_component_ids = [c.id for c in bonus_components]
-                
-                # Sum up bonuses from payroll entries
-                bonus_entries = db.session.query(
-                    func.sum(PayrollEntry.amount).label('total_bonus')
-                ).join(
-                    Payroll, PayrollEntry.payroll_id == Payroll.id
-                ).join(
-                    PayPeriod, Payroll.pay_period_id == PayPeriod.id
-                ).filter(
-                    Payroll.employee_id == employee.id,
-                    PayrollEntry.component_id.in_(bonus_component_ids),
-                    func.extract('year', PayPeriod.payment_date) == year
-                ).first()
-                
-                total_bonus = bonus_entries.total_bonus if bonus_entries.total_bonus else 0
-                
-                # Get allowances in a similar way
-                allowance_components = SalaryComponent.query.filter_by(component_type=ComponentType.ALLOWANCE).all()
-                allowance_component_ids = [c.id for c in allowance_components]
-                
-                allowance_entries = db.session.query(
-                    func.sum(PayrollEntry.amount).label('total_allowances')
-                ).join(
-                    Payroll, PayrollEntry.payroll_id == Payroll.id
-                ).join(
-                    PayPeriod, Payroll.pay_period_id == PayPeriod.id
-                ).filter(
-                    Payroll.employee_id == employee.id,
-                    PayrollEntry.component_id.in_(allowance_component_ids),
-                    func.extract('year', PayPeriod.payment_date) == year
-                ).first()
-                
-                total_allowances = allowance_entries.total_allowances if allowance_entries.total_allowances else 0
-                
-                # Get deductions
-                deduction_components = SalaryComponent.query.filter_by(component_type=ComponentType.DEDUCTION).all()
-                deduction_component_ids = [c.id for c in deduction_components]
-                
-                deduction_entries = db.session.query(
-                    func.sum(PayrollEntry.amount).label('total_deductions')
-                ).join(
-                    Payroll, PayrollEntry.payroll_id == Payroll.id
-                ).join(
-                    PayPeriod, Payroll.pay_period_id == PayPeriod.id
-                ).filter(
-                    Payroll.employee_id == employee.id,
-                    PayrollEntry.component_id.in_(deduction_component_ids),
-                    func.extract('year', PayPeriod.payment_date) == year
-                ).first()
-                
-                total_deductions = deduction_entries.total_deductions if deduction_entries.total_deductions else 0
-                
-                # Get employer benefit contributions
-                benefits_cost = get_total_benefits_cost(employee.id)
-                
-                # Calculate total compensation
-                total_compensation = base_salary + total_bonus + total_allowances + benefits_cost
-                
-                # Create or update compensation report
-                existing_report = CompensationReport.query.filter_by(
-                    employee_id=employee.id,
-                    year=year
-                ).first()
-                
-                if existing_report:
-                    # Update existing report
-                    existing_report.base_salary = base_salary
-                    existing_report.total_bonus = total_bonus
-                    existing_report.total_allowances = total_allowances
-                    existing_report.total_deductions = total_deductions
-                    existing_report.employer_benefit_contributions = benefits_cost
-                    existing_report.total_compensation = total_compensation
-                    existing_report.is_visible_to_employee = True
-                    existing_report.created_by = current_user.id
-                    existing_report.created_at = datetime.utcnow()
-                else:
-                    # Create new report
-                    report = CompensationReport(
-                        employee_id=employee.id,
-                        year=year,
-                        base_salary=base_salary,
-                        total_bonus=total_bonus,
-                        total_allowances=total_allowances,
-                        total_deductions=total_deductions,
-                        employer_benefit_contributions=benefits_cost,
-                        total_compensation=total_compensation,
-                        is_visible_to_employee=True,
-                        created_by=current_user.id
-                    )
-                    db.session.add(report)
-                
-                generated_count += 1
-            
-            db.session.commit()
-            flash(f'Successfully generated {generated_count} compensation reports.', 'success')
-            return redirect(url_for('budgeting.compensation_reports'))
-            
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error generating compensation reports: {str(e)}', 'danger')
+        except (KeyError, ValueError):
+            flash('Please enter a valid year.', 'danger')
+            return redirect(url_for('budgeting.generate_compensation_reports'))
+
+        job = create_job(
+            'compensation_reports',
+            created_by=current_user.id,
+            params={'year': year, 'department_id': request.form.get('department_id', type=int)},
+        )
+        start_job(job, run_compensation_report_job)
+        flash(f'Generating {year} compensation reports in the background.', 'info')
+        return redirect(url_for('budgeting.compensation_reports', job_id=job.id))
     
     return render_template(
         'budgeting/generate_reports.html',
@@ -1,10 +1,13 @@
 from flask import Blueprint, render_template, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_, extract
-from models import Employee, Department, Attendance, LeaveRequest
+from datetime import datetime
+from sqlalchemy import func
+from models import Employee, Department
 from app import db
 from utils.helpers import role_required
+from utils.attendance_rollups import daily_status_counts
+from utils.dashboard_stats import dashboard_stats
+from utils.date_ranges import DateRange
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -13,67 +16,8 @@ dashboard_bp = Blueprint('dashboard', __name__)
 def index():
     # Get user role for conditional rendering
     user_role = current_user.role.name
-    
-    # For all users: Get basic statistics
-    stats = {
-        'employees': Employee.query.filter_by(status='Active').count(),
-        'departments': Department.query.count()
-    }
-    
-    # For HR, Admin, or Manager roles: Get attendance statistics
-    if user_role in ['Admin', 'HR', 'Manager']:
-        today = datetime.now().date()
-        
-        # Get today's attendance numbers
-        attendance_stats = {
-            'present': Attendance.query.filter(
-                Attendance.date == today,
-                Attendance.status == 'Present'
-            ).count(),
-            'absent': Attendance.query.filter(
-                Attendance.date == today,
-                Attendance.status == 'Absent'
-            ).count(),
-            'late': Attendance.query.filter(
-                Attendance.date == today,
-                Attendance.status == 'Late'
-            ).count(),
-        }
-        stats.update(attendance_stats)
-        
-        # Get pending leave requests
-        if user_role in ['Admin', 'HR']:
-            # For admin and HR, get all pending leave requests
-            pending_leaves = LeaveRequest.query.filter_by(status='Pending').count()
-        else:
-            # For managers, get pending leave requests for their subordinates
-            subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-            pending_leaves = LeaveRequest.query.filter(
-                LeaveRequest.employee_id.in_(subordinate_ids),
-                LeaveRequest.status == 'Pending'
-            ).count()
-        
-        stats['pending_leaves'] = pending_leaves
-    
-    # For Employee role: Get personal statistics
-    if user_role == 'Employee' and current_user.employee:
-        employee = current_user.employee
-        
-        # Get personal leave balance
-        leave_stats = {
-            'leave_balance': sum([balance.remaining_days for balance in employee.leave_balances])
-        }
-        
-        # Get personal attendance status for today
-        today = datetime.now().date()
-        today_attendance = Attendance.query.filter_by(
-            employee_id=employee.id,
-            date=today
-        ).first()
-        
-        leave_stats['attendance_today'] = today_attendance.status if today_attendance else 'Not Recorded'
-        
-        stats.update(leave_stats)
+    employee_id = current_user.employee.id if current_user.employee else None
+    stats = dashboard_stats(user_role, employee_id)
     
     return render_template('dashboard.html', stats=stats, user_role=user_role)
 
@@ -114,21 +58,10 @@ def department_distribution():
 @role_required('Admin', 'HR', 'Manager')
 def monthly_attendance():
     # Get attendance data for the current month
-    current_month = datetime.now().month
-    current_year = datetime.now().year
+    month = DateRange.month_of(datetime.now().date())
     
-    # Query to get daily attendance counts for the month
-    monthly_data = db.session.query(
-        extract('day', Attendance.date).label('day'),
-        func.count(Attendance.id).label('count'),
-        Attendance.status
-    ).filter(
-        extract('month', Attendance.date) == current_month,
-        extract('year', Attendance.date) == current_year
-    ).group_by(
-        'day',
-        Attendance.status
-    ).all()
+    # Daily counts come from the daily attendance rollup
+    daily_counts = daily_status_counts(month)
     
     # Organize data by status
     days = range(1, 32)  # 1 to 31
@@ -136,15 +69,11 @@ def monthly_attendance():
     absent_data = [0] * 31
     late_data = [0] * 31
     
-    for record in monthly_data:
-        day_index = int(record.day) - 1  # Adjust to 0-based index
-        if day_index < 31:  # Ensure within bounds
-            if record.status == 'Present':
-                present_data[day_index] = record.count
-            elif record.status == 'Absent':
-                absent_data[day_index] = record.count
-            elif record.status == 'Late':
-                late_data[day_index] = record.count
+    for day, counts in daily_counts.items():
+        day_index = day.day - 1  # Adjust to 0-based index
+        present_data[day_index] = counts['present']
+        absent_data[day_index] = counts['absent']
+        late_data[day_index] = counts['late']
     
     return jsonify({
         'labels': list(days),
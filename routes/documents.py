@@ -6,6 +6,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from app import db
 from models import Document, Employee, DocumentType
 from utils.helpers import role_required, allowed_file, save_document
+from utils.org_hierarchy import manager_scope, manages
 
 document_bp = Blueprint('documents', __name__, url_prefix='/documents')
 
@@ -60,14 +61,11 @@ def index():
         )
     
     elif current_user.role.name == 'Manager' and current_user.employee:
-        # Get subordinates
-        subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-        
-        # Get documents for subordinates - no join with DocumentType needed
+        # Get documents for everyone under the manager - no join with DocumentType needed
         documents = db.session.query(Document, Employee).join(
             Employee, Document.employee_id == Employee.id
         ).filter(
-            Document.employee_id.in_(subordinate_ids)
+            Document.employee_id.in_(manager_scope(current_user.employee.id))
         ).order_by(Document.upload_date.desc()).all()
         
         return render_template(
@@ -191,8 +189,8 @@ def download_document(document_id):
     if not current_user.role.name in ['Admin', 'HR']:
         if current_user.role.name == 'Manager' and current_user.employee:
             # Check if document belongs to a subordinate
-            subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-            if document.employee_id not in subordinate_ids and document.employee_id != current_user.employee.id:
+            if (document.employee_id != current_user.employee.id
+                    and not manages(current_user.employee.id, document.employee_id)):
                 flash('You do not have permission to download this document.', 'danger')
                 return redirect(url_for('documents.index'))
         elif current_user.employee and document.employee_id != current_user.employee.id:
@@ -6,7 +6,9 @@ import os
 from app import db
 from models import Employee, Department, User, Role, Attendance
 from utils.helpers import role_required
-from utils.importers import process_employee_import, get_import_template
+from utils.org_hierarchy import manages
+from utils.importers import get_import_template
+from utils.import_jobs import get_import_job, start_import_job, upload_extension
 
 employee_bp = Blueprint('employees', __name__, url_prefix='/employees')
 
@@ -110,8 +112,7 @@ def view_profile(id):
     if current_user.role.name not in ['Admin', 'HR']:
         if current_user.role.name == 'Manager':
             # Check if employee is a subordinate
-            subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-            if employee.id not in subordinate_ids and employee.id != current_user.employee.id:
+            if employee.id != current_user.employee.id and not manages(current_user.employee.id, employee.id):
                 flash('You do not have permission to view this employee profile.', 'danger')
                 return redirect(url_for('dashboard.index'))
         elif current_user.employee.id != id:
@@ -466,9 +467,11 @@ def contact_list():
 @login_required
 @role_required('Admin', 'HR')
 def import_employees():
-    """Bulk import employees from CSV or Excel file."""
-    from config import Config
-    
+    """Bulk import employees from CSV or Excel file.
+
+    The upload is imported by a background job; the page then shows the
+    job's progress and, once finished, its results.
+    """
     if request.method == 'POST':
         # Check if a file was uploaded
         if 'file' not in request.files:
@@ -482,23 +485,17 @@ def import_employees():
         if file.filename == '':
             flash('No selected file', 'danger')
             return redirect(request.url)
+
+        if upload_extension(file.filename) is None:
+            flash('Invalid file format. Please upload CSV or Excel file.', 'danger')
+            return redirect(request.url)
         
-        # Process the uploaded file
-        success_count, error_count, errors = process_employee_import(file, Config.UPLOAD_FOLDER)
-        
-        if success_count > 0:
-            flash(f'Successfully imported {success_count} employees. {error_count} errors.', 'success')
-        else:
-            flash('Import failed. Please check file format and try again.', 'danger')
-        
-        return render_template(
-            'employees/import.html',
-            success_count=success_count,
-            error_count=error_count,
-            errors=errors
-        )
+        job = start_import_job('employee_import', file, created_by=current_user.id)
+        flash('Employee import started. Progress is shown below.', 'info')
+        return redirect(url_for('employees.import_employees', job_id=job.id))
     
-    return render_template('employees/import.html')
+    job = get_import_job(request.args.get('job_id', type=int), 'employee_import')
+    return render_template('employees/import.html', job=job)
 
 @employee_bp.route('/import-template/<file_format>')
 @login_required
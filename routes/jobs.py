@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify, abort
+from flask_login import login_required, current_user
+
+from app import db
+from models import BackgroundJob
+from utils.jobs import job_status
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+@jobs_bp.route('/jobs/<int:job_id>')
+@login_required
+def status(job_id):
+    """Return a background job's progress as JSON."""
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        abort(404)
+
+    if job.created_by != current_user.id and not current_user.has_role(['Admin', 'HR']):
+        abort(403)
+
+    return jsonify(job_status(job))
@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 from app import db
 from models import LeaveRequest, LeaveType, LeaveBalance, Employee
 from utils.helpers import role_required, calculate_leave_days
+from utils.dashboard_stats import invalidate_dashboard_stats
+from utils.date_ranges import DateRange
+from utils.org_hierarchy import manager_scope, manages
 
 leave_bp = Blueprint('leave', __name__, url_prefix='/leave')
 
@@ -92,6 +95,7 @@ def request_leave():
             
             db.session.add(leave_request)
             db.session.commit()
+            invalidate_dashboard_stats()
             
             flash('Leave request submitted successfully!', 'success')
             return redirect(url_for('leave.my_requests'))
@@ -161,6 +165,7 @@ def cancel_request(request_id):
     try:
         leave_request.status = 'Cancelled'
         db.session.commit()
+        invalidate_dashboard_stats()
         flash('Leave request cancelled successfully.', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -184,9 +189,8 @@ def pending_approvals():
     
     # Filter based on role
     if current_user.role.name == 'Manager' and current_user.employee:
-        # Get all subordinates
-        subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-        query = query.filter(Employee.id.in_(subordinate_ids))
+        # Everyone in the manager's reporting subtree
+        query = query.filter(Employee.id.in_(manager_scope(current_user.employee.id)))
     
     # Get results
     pending_requests = query.order_by(LeaveRequest.created_at).all()
@@ -228,8 +232,7 @@ def approve_request(request_id):
     if current_user.role.name == 'Manager':
         # Check if employee is a subordinate
         if current_user.employee:
-            subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-            if leave_request.employee_id not in subordinate_ids:
+            if not manages(current_user.employee.id, leave_request.employee_id):
                 flash('You can only approve leave for your subordinates.', 'danger')
                 return redirect(url_for('leave.pending_approvals'))
         else:
@@ -270,6 +273,7 @@ def approve_request(request_id):
             flash('Created new leave balance record for this employee.', 'info')
         
         db.session.commit()
+        invalidate_dashboard_stats()
         flash('Leave request approved successfully.', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -287,8 +291,7 @@ def reject_request(request_id):
     # Check permissions similar to approve
     if current_user.role.name == 'Manager':
         if current_user.employee:
-            subordinate_ids = [emp.id for emp in current_user.employee.subordinates]
-            if leave_request.employee_id not in subordinate_ids:
+            if not manages(current_user.employee.id, leave_request.employee_id):
                 flash('You can only manage leave for your subordinates.', 'danger')
                 return redirect(url_for('leave.pending_approvals'))
         else:
@@ -302,6 +305,7 @@ def reject_request(request_id):
         leave_request.approval_date = datetime.now()
         
         db.session.commit()
+        invalidate_dashboard_stats()
         flash('Leave request rejected.', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -318,6 +322,7 @@ def manage():
     employee_id = request.args.get('employee_id', type=int)
     leave_type_id = request.args.get('leave_type_id', type=int)
     status = request.args.get('status')
+    month = DateRange.parse_month(request.args.get('month'))
     
     # Base query
     query = db.session.query(LeaveRequest, Employee, LeaveType).join(
@@ -336,6 +341,10 @@ def manage():
     if status:
         query = query.filter(LeaveRequest.status == status)
     
+    if month:
+        # Requests with at least one day in the month
+        query = query.filter(month.overlaps(LeaveRequest.start_date, LeaveRequest.end_date))
+    
     # Get results
     leave_requests = query.order_by(LeaveRequest.created_at.desc()).all()
     
@@ -351,7 +360,8 @@ def manage():
         current_filters={
             'employee_id': employee_id,
             'leave_type_id': leave_type_id,
-            'status': status
+            'status': status,
+            'month': month.start.strftime('%Y-%m') if month else None
         },
         is_personal=False
     )
@@ -649,6 +659,7 @@ def create_balance():
             existing.used_hours = used_hours
             existing.accrual_rate = accrual_rate
             db.session.commit()
+            invalidate_dashboard_stats()
             flash('Leave balance updated successfully.', 'success')
         else:
             # Create new balance
@@ -662,6 +673,7 @@ def create_balance():
             )
             db.session.add(balance)
             db.session.commit()
+            invalidate_dashboard_stats()
             flash('Leave balance created successfully.', 'success')
     
     except SQLAlchemyError as e:
@@ -713,6 +725,7 @@ def initialize_balances():
                     created_count += 1
         
         db.session.commit()
+        invalidate_dashboard_stats()
         
         if created_count > 0:
             flash(f'Successfully initialized {created_count} leave balances for {year}.', 'success')
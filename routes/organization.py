@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, abort, current_app, render_template, jsonify, request
 from flask_login import login_required
+from sqlalchemy import and_, exists
+from sqlalchemy.orm import aliased, joinedload
+from app import db
 from models import Employee, Department
 from utils.helpers import role_required
+from utils.org_hierarchy import get_org_index, reporting_chain as chain_ids
 
 organization_bp = Blueprint('organization', __name__, url_prefix='/organization')
 
@@ -21,7 +25,7 @@ def chart_data():
     department_id = request.args.get('department_id', type=int)
     
     # Base query to get employees with their managers
-    query = Employee.query.filter(Employee.status == 'Active')
+    query = Employee.query.options(joinedload(Employee.department)).filter(Employee.status == 'Active')
     
     # Apply department filter if provided
     if department_id:
@@ -50,6 +54,83 @@ def chart_data():
     
     return jsonify(org_data)
 
+def _chart_filters(model, department_id):
+    """Conditions for an employee to appear on the chart."""
+    conditions = [model.status == 'Active']
+    if department_id:
+        conditions.append(model.department_id == department_id)
+    return conditions
+
+
+def _chart_node(employee, forest):
+    return {
+        'id': str(employee.id),
+        'name': employee.full_name,
+        'title': employee.job_title,
+        'department': employee.department.name if employee.department else '',
+        'report_count': forest.report_counts.get(employee.id, 0),
+        'descendant_count': forest.descendant_counts.get(employee.id, 0),
+    }
+
+
+def _chart_page(query, forest, total):
+    """One page of chart nodes, ordered by name, with paging metadata."""
+    page_size = current_app.config['ORG_CHART_PAGE_SIZE']
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', page_size, type=int), 1), page_size * 4)
+    employees = query.options(joinedload(Employee.department)).order_by(
+        Employee.last_name, Employee.first_name, Employee.id
+    ).offset(offset).limit(limit).all()
+    return {
+        'children': [_chart_node(employee, forest) for employee in employees],
+        'offset': offset,
+        'limit': limit,
+        'total': total,
+        'has_more': offset + len(employees) < total,
+    }
+
+
+def _conditional_json(payload):
+    """JSON response with an ETag; a matching If-None-Match gets a bodiless 304."""
+    response = jsonify(payload)
+    response.add_etag()
+    # Cached by the browser but revalidated on every use
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@organization_bp.route('/chart/nodes')
+@login_required
+def chart_roots():
+    """Top of the org chart: employees whose manager is not on the chart."""
+    department_id = request.args.get('department_id', type=int)
+    forest = get_org_index().chart_forest(department_id)
+
+    manager = aliased(Employee)
+    query = Employee.query.filter(
+        *_chart_filters(Employee, department_id),
+        ~exists().where(manager.id == Employee.manager_id, and_(*_chart_filters(manager, department_id))),
+    )
+    return _conditional_json({'node': None, **_chart_page(query, forest, len(forest.roots))})
+
+
+@organization_bp.route('/chart/nodes/<int:employee_id>')
+@login_required
+def chart_node(employee_id):
+    """An org chart node with one page of its direct reports and their subtree sizes."""
+    department_id = request.args.get('department_id', type=int)
+    forest = get_org_index().chart_forest(department_id)
+    employee = db.session.get(Employee, employee_id, options=[joinedload(Employee.department)])
+    if employee is None or employee_id not in forest.report_counts:
+        abort(404)
+
+    query = Employee.query.filter(Employee.manager_id == employee_id, *_chart_filters(Employee, department_id))
+    return _conditional_json({
+        'node': _chart_node(employee, forest),
+        **_chart_page(query, forest, forest.report_counts[employee_id]),
+    })
+
 @organization_bp.route('/employee-count-by-department')
 @login_required
 @role_required('Admin', 'HR', 'Manager')
@@ -75,18 +156,14 @@ def employee_count_by_department():
 @login_required
 def reporting_chain(employee_id):
     """Get the reporting chain for a specific employee."""
-    employee = Employee.query.get_or_404(employee_id)
-    
-    # Build reporting chain
-    chain = [employee]
-    current = employee
-    
-    # Get all managers up the chain
-    while current.manager_id:
-        current = current.manager
-        if current in chain:  # Avoid circular references
-            break
-        chain.append(current)
+    chain = chain_ids(employee_id)
+    employees = {
+        emp.id: emp
+        for emp in Employee.query.options(joinedload(Employee.department)).filter(Employee.id.in_(chain))
+    }
+    if employee_id not in employees:
+        abort(404)
+    chain = [employees[emp_id] for emp_id in chain if emp_id in employees]
     
     # Format response
     result = []
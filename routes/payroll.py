@@ -5,8 +5,8 @@ import os
 from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, current_app, abort, send_file
 from io import BytesIO
 from flask_login import login_required, current_user
-from sqlalchemy import func, desc, and_, case, or_, extract
-from sqlalchemy.orm import aliased
+from sqlalchemy import func, desc, and_, case, or_, select
+from sqlalchemy.orm import aliased, joinedload
 
 from app import db
 from models import (
@@ -28,7 +28,22 @@ from models import (
     EmployeeIncentive,
     IncentiveType,
 )
+from utils.compensation import (
+    CompensationTotals,
+    annual_salary,
+    compensation_totals,
+    current_compensation_subquery,
+)
+from utils.date_ranges import DateRange
 from utils.helpers import role_required, get_current_employee, format_currency
+from utils.payroll_runs import start_payroll_run, get_latest_run, run_progress
+from utils.payroll_summary import (
+    apply_payslip_change,
+    get_period_summary,
+    payslip_amounts,
+    period_totals,
+    refresh_period_summary,
+)
 
 payroll = Blueprint('payroll', __name__)
 
@@ -70,6 +85,9 @@ def index():
     if current_user.has_role(['Admin', 'HR']):
         pending_count = Payroll.query.filter_by(status='Pending').count()
         employee_count = Employee.query.filter_by(status='Active').count()
+
+    listed_periods = past_periods + ([current_period] if current_period else [])
+    period_summaries = period_totals(period.id for period in listed_periods)
     
     return render_template('payroll/index.html', 
                            employee=employee,
@@ -79,6 +97,7 @@ def index():
                            recent_payslips=recent_payslips,
                            pending_count=pending_count,
                            employee_count=employee_count,
+                           period_totals=period_summaries,
                            current_date=datetime.now().date())
 
 
@@ -88,8 +107,9 @@ def index():
 def payroll_periods():
     """View all pay periods"""
     periods = PayPeriod.query.order_by(PayPeriod.start_date.desc()).all()
+    totals = period_totals(period.id for period in periods)
     
-    return render_template('payroll/periods.html', periods=periods)
+    return render_template('payroll/periods.html', periods=periods, totals=totals)
 
 
 @payroll.route('/periods/create', methods=['GET', 'POST'])
@@ -153,33 +173,57 @@ def view_period(period_id):
     """View details of a specific payroll period"""
     period = PayPeriod.query.get_or_404(period_id)
     
-    # Get all payslips for this period
-    payslips = Payroll.query.filter_by(pay_period_id=period_id).all()
-    
-    # Calculate totals
-    total_gross = sum(payslip.gross_pay for payslip in payslips) if payslips else 0
-    total_net = sum(payslip.net_pay for payslip in payslips) if payslips else 0
-    total_tax = sum(payslip.tax_amount for payslip in payslips) if payslips else 0
-    total_deductions = sum(payslip.total_deductions for payslip in payslips) if payslips else 0
-    
-    # Group by department
-    departments = {}
-    for payslip in payslips:
-        department_name = payslip.employee.department.name
-        if department_name not in departments:
-            departments[department_name] = {
-                'count': 0,
-                'total_gross': 0,
-                'total_net': 0
+    # Payslip table; employees and departments are loaded with the payslips
+    payslips = (
+        Payroll.query.filter_by(pay_period_id=period_id)
+        .options(joinedload(Payroll.employee).joinedload(Employee.department))
+        .all()
+    )
+
+    # Totals come from the materialized summary rather than the payslips
+    summary = get_period_summary(period_id)
+    if summary:
+        total_count = sum(row.headcount for row in summary)
+        total_gross = sum(row.total_gross for row in summary)
+        total_net = sum(row.total_net for row in summary)
+        total_tax = sum(row.total_tax for row in summary)
+        total_deductions = sum(row.total_deductions for row in summary)
+
+        departments = {
+            (row.department.name if row.department else 'No Department'): {
+                'count': row.headcount,
+                'total_gross': row.total_gross,
+                'total_net': row.total_net,
             }
-        
-        departments[department_name]['count'] += 1
-        departments[department_name]['total_gross'] += payslip.gross_pay
-        departments[department_name]['total_net'] += payslip.net_pay
+            for row in summary
+        }
+    else:
+        # Not summarized yet; aggregate without writing on a GET
+        totals = period_totals([period_id])[period_id]
+        total_count = totals.headcount
+        total_gross = totals.total_gross
+        total_net = totals.total_net
+        total_tax = totals.total_tax
+        total_deductions = totals.total_deductions
+
+        departments = {}
+        for payslip in payslips:
+            department = payslip.employee.department
+            data = departments.setdefault(
+                department.name if department else 'No Department',
+                {'count': 0, 'total_gross': 0.0, 'total_net': 0.0},
+            )
+            data['count'] += 1
+            data['total_gross'] += payslip.gross_pay or 0.0
+            data['total_net'] += payslip.net_pay or 0.0
+    
+    payroll_run = get_latest_run(period_id)
     
     return render_template('payroll/view_period.html', 
                            period=period,
+                           payroll_run=payroll_run,
                            payslips=payslips,
+                           total_count=total_count,
                            total_gross=total_gross,
                            total_net=total_net,
                            total_tax=total_tax,
@@ -236,7 +280,9 @@ def complete_period(period_id):
         for payslip in period.payrolls:
             if payslip.status == 'Pending':
                 payslip.status = 'Approved'
-        
+
+        db.session.flush()
+        refresh_period_summary(period.id)
         db.session.commit()
         flash('Payroll period has been marked as completed.', 'success')
     except Exception as e:
@@ -290,7 +336,7 @@ def create_annual_periods():
     
     # Check if periods already exist for this year
     existing_count = PayPeriod.query.filter(
-        extract('year', PayPeriod.start_date) == current_year
+        DateRange.for_year(current_year).filter(PayPeriod.start_date)
     ).count()
     
     if existing_count > 0:
@@ -407,124 +453,18 @@ def process_period(period_id):
         flash('Only draft periods can be processed', 'danger')
         return redirect(url_for('payroll.view_period', period_id=period_id))
     
-    # Get all active employees
-    employees = Employee.query.filter_by(status='Active').all()
-    
-    if not employees:
+    # Make sure there is at least one active employee to pay
+    if not Employee.query.filter_by(status='Active').first():
         flash('No active employees found', 'warning')
         return redirect(url_for('payroll.view_period', period_id=period_id))
     
     try:
-        # Loop through each employee and create a payslip
-        for employee in employees:
-            # Check if a payslip already exists for this employee in this period
-            existing_payslip = Payroll.query.filter_by(
-                employee_id=employee.id,
-                pay_period_id=period.id
-            ).first()
-            
-            if existing_payslip:
-                continue  # Skip if payslip already exists
-            
-            # Create new payslip
-            new_payslip = Payroll(
-                employee_id=employee.id,
-                pay_period_id=period.id,
-                gross_pay=employee.base_salary / 26 if employee.salary_type == 'Annual' else employee.base_salary,  # Biweekly for annual salaries
-                tax_amount=0,  # Will be calculated in the next step
-                net_pay=0,     # Will be calculated in the next step
-                status='Pending',
-                created_by=current_user.id
-            )
-            
-            db.session.add(new_payslip)
-            db.session.flush()  # Get the ID without committing
-            
-            # Add base salary as a payroll entry
-            base_entry = PayrollEntry(
-                payroll_id=new_payslip.id,
-                component_name='Base Salary',
-                amount=new_payslip.gross_pay,
-                type='Earning',
-                is_recurring=True,
-                created_by=current_user.id
-            )
-            
-            db.session.add(base_entry)
-            
-            # Add any recurring salary components for this employee
-            components = []
-
-            compensation = EmployeeCompensation.query.filter(
-                EmployeeCompensation.employee_id == employee.id,
-                or_(
-                    EmployeeCompensation.end_date.is_(None),
-                    EmployeeCompensation.end_date >= datetime.now().date(),
-                ),
-            ).order_by(EmployeeCompensation.effective_date.desc()).first()
-
-            if compensation and compensation.salary_structure_id:
-                components = (
-                    SalaryComponent.query.filter_by(
-                        salary_structure_id=compensation.salary_structure_id,
-                        is_active=True,
-                    ).all()
-                )
-            
-            total_earnings = new_payslip.gross_pay
-            total_deductions = 0
-            
-            for component in components:
-                entry_type = (
-                    'Deduction'
-                    if component.component_type in ['deduction', 'tax']
-                    else 'Earning'
-                )
-
-                entry = PayrollEntry(
-                    payroll_id=new_payslip.id,
-                    component_name=component.name,
-                    amount=component.value,
-                    type=entry_type,
-                    is_recurring=True,
-                    created_by=current_user.id,
-                )
-
-                db.session.add(entry)
-
-                if entry_type == 'Deduction':
-                    total_deductions += component.value
-                else:
-                    total_earnings += component.value
-            
-            # Simple tax calculation (would be more complex in a real system)
-            tax_rate = 0.2  # 20% tax rate
-            tax_amount = total_earnings * tax_rate
-            
-            # Update payslip
-            new_payslip.gross_pay = total_earnings
-            new_payslip.tax_amount = tax_amount
-            new_payslip.deductions = total_deductions
-            new_payslip.net_pay = total_earnings - tax_amount - total_deductions
-            
-            # Add tax as a deduction entry
-            tax_entry = PayrollEntry(
-                payroll_id=new_payslip.id,
-                component_name='Income Tax',
-                amount=tax_amount,
-                type='Deduction',
-                is_recurring=True,
-                created_by=current_user.id
-            )
-            
-            db.session.add(tax_entry)
-        
-        # Update period status
-        period.status = 'Processing'
-        period.updated_at = datetime.now()
-        
-        db.session.commit()
-        flash('Payroll period processed successfully. Payslips have been generated.', 'success')
+        # Payslips are generated in committed chunks by a background job
+        run = start_payroll_run(period, created_by=current_user.id)
+        if run.status == 'Completed':
+            flash('Payroll period processed successfully. Payslips have been generated.', 'success')
+        else:
+            flash('Payroll processing has started. Progress is shown below.', 'info')
     except Exception as e:
         db.session.rollback()
         flash(f'Error processing payroll: {str(e)}', 'danger')
@@ -533,6 +473,15 @@ def process_period(period_id):
     return redirect(url_for('payroll.view_period', period_id=period_id))
 
 
+@payroll.route('/periods/<int:period_id>/run-status')
+@login_required
+@role_required('Admin', 'HR')
+def period_run_status(period_id):
+    """Return JSON progress of the latest payroll run for a period"""
+    PayPeriod.query.get_or_404(period_id)
+    return jsonify(run_progress(get_latest_run(period_id)))
+
+
 @payroll.route('/payslips')
 @login_required
 @role_required('Admin', 'HR')
@@ -610,6 +559,7 @@ def edit_payslip(payroll_id):
     entries = PayrollEntry.query.filter_by(payroll_id=payroll_id).order_by(PayrollEntry.id).all()
 
     if request.method == 'POST':
+        previous_amounts = payslip_amounts(payslip)
         for entry in entries:
             field = f'amount_{entry.id}'
             if field in request.form:
@@ -629,6 +579,7 @@ def edit_payslip(payroll_id):
         payslip.total_deductions = total_deductions - tax_amount
         payslip.net_pay = total_earnings - total_deductions
 
+        apply_payslip_change(payslip, previous_amounts)
         db.session.commit()
         flash('Payslip updated successfully.', 'success')
         return redirect(url_for('payroll.view_payslip', payroll_id=payroll_id))
@@ -682,13 +633,7 @@ def my_compensation():
     # a direct employee_id column, so we fetch components via the
     # employee's salary structure if available.
     components = []
-    compensation = EmployeeCompensation.query.filter(
-        EmployeeCompensation.employee_id == employee.id,
-        or_(
-            EmployeeCompensation.end_date.is_(None),
-            EmployeeCompensation.end_date >= datetime.now().date(),
-        )
-    ).order_by(EmployeeCompensation.effective_date.desc()).first()
+    compensation = employee.current_compensation
 
     if compensation and compensation.salary_structure_id:
         components = (
@@ -976,40 +921,20 @@ def compensations():
     
     # Get departments for filter
     departments = Department.query.order_by(Department.name).all()
-    
-    def annual_base(comp):
-        if comp.salary_type == 'Annual':
-            return comp.base_salary
-        hours = comp.hours_per_week or 40.0
-        return comp.base_salary * hours * 52
-
-    def annual_bonus(emp_id):
-        return (
-            db.session.query(func.coalesce(func.sum(EmployeeIncentive.amount), 0.0))
-            .filter(EmployeeIncentive.employee_id == emp_id)
-            .scalar()
-            or 0.0
-        )
 
-    def annual_benefits(emp_id):
-        return (
-            db.session.query(func.coalesce(func.sum(Benefit.employer_contribution), 0.0))
-            .join(EmployeeBenefit, EmployeeBenefit.benefit_id == Benefit.id)
-            .filter(
-                EmployeeBenefit.employee_id == emp_id,
-                or_(EmployeeBenefit.end_date.is_(None), EmployeeBenefit.end_date >= datetime.now().date()),
-            )
-            .scalar()
-            or 0.0
-        )
+    employee_ids = select(Employee.id)
+    if department_id:
+        employee_ids = employee_ids.where(Employee.department_id == department_id)
+    totals = compensation_totals(employee_ids)
 
     # Calculate totals using current compensation data
     total_salary = 0.0
     total_compensation = 0.0
     for emp, comp in results:
-        comp.annual_salary = annual_base(comp)
-        comp.total_bonus = annual_bonus(emp.id)
-        comp.total_benefits = annual_benefits(emp.id)
+        employee_totals = totals.get(emp.id, CompensationTotals())
+        comp.annual_salary = annual_salary(comp)
+        comp.total_bonus = employee_totals.bonus
+        comp.total_benefits = employee_totals.benefits
         total_salary += comp.annual_salary
         total_compensation += comp.annual_salary + comp.total_bonus + comp.total_benefits
     
@@ -1029,52 +954,25 @@ def compensation_reports():
     # Get filter parameters
     report_type = request.args.get('type', 'department')
     
-    employees = db.session.query(Employee, EmployeeCompensation)\
-        .join(EmployeeCompensation, Employee.id == EmployeeCompensation.employee_id)\
-        .filter(
-            or_(
-                EmployeeCompensation.end_date.is_(None),
-                EmployeeCompensation.end_date >= datetime.now().date(),
-            )
-        ).all()
-
-    def annual_base(comp):
-        if comp.salary_type == 'Annual':
-            return comp.base_salary
-        hours = comp.hours_per_week or 40.0
-        return comp.base_salary * hours * 52
-
-    def annual_bonus(emp_id):
-        return (
-            db.session.query(func.coalesce(func.sum(EmployeeIncentive.amount), 0.0))
-            .filter(EmployeeIncentive.employee_id == emp_id)
-            .scalar()
-            or 0.0
-        )
-
-    def annual_benefits(emp_id):
-        return (
-            db.session.query(func.coalesce(func.sum(Benefit.employer_contribution), 0.0))
-            .join(EmployeeBenefit, EmployeeBenefit.benefit_id == Benefit.id)
-            .filter(
-                EmployeeBenefit.employee_id == emp_id,
-                or_(EmployeeBenefit.end_date.is_(None), EmployeeBenefit.end_date >= datetime.now().date()),
-            )
-            .scalar()
-            or 0.0
-        )
+    # Employees with a compensation record currently in effect
+    current = current_compensation_subquery()
+    current_ids = select(current.c.employee_id).where(current.c.rank == 1)
+    totals = compensation_totals(current_ids)
+    employees = Employee.query.options(joinedload(Employee.department))\
+        .filter(Employee.id.in_(current_ids)).all()
 
     aggregates = {}
-    for emp, comp in employees:
+    for emp in employees:
+        employee_totals = totals.get(emp.id, CompensationTotals())
         category = emp.department.name if report_type == 'department' else emp.job_title
         data = aggregates.setdefault(
             category,
             {'employee_count': 0, 'total_base_pay': 0.0, 'total_bonus': 0.0, 'total_benefits': 0.0},
         )
         data['employee_count'] += 1
-        data['total_base_pay'] += annual_base(comp)
-        data['total_bonus'] += annual_bonus(emp.id)
-        data['total_benefits'] += annual_benefits(emp.id)
+        data['total_base_pay'] += employee_totals.base
+        data['total_bonus'] += employee_totals.bonus
+        data['total_benefits'] += employee_totals.benefits
 
     results = []
     for category, data in sorted(aggregates.items()):
@@ -1193,33 +1091,12 @@ def view_compensation_report(report_id):
     # Order by department, then name
     query = query.order_by(Employee.department_id, Employee.first_name, Employee.last_name)
     
-    results = query.all()
-    
-    def annual_base(comp):
-        if comp.salary_type == 'Annual':
-            return comp.base_salary
-        hours = comp.hours_per_week or 40.0
-        return comp.base_salary * hours * 52
-
-    def annual_bonus(emp_id):
-        return (
-            db.session.query(func.coalesce(func.sum(EmployeeIncentive.amount), 0.0))
-            .filter(EmployeeIncentive.employee_id == emp_id)
-            .scalar()
-            or 0.0
-        )
+    results = query.options(joinedload(Employee.department)).all()
 
-    def annual_benefits(emp_id):
-        return (
-            db.session.query(func.coalesce(func.sum(Benefit.employer_contribution), 0.0))
-            .join(EmployeeBenefit, EmployeeBenefit.benefit_id == Benefit.id)
-            .filter(
-                EmployeeBenefit.employee_id == emp_id,
-                or_(EmployeeBenefit.end_date.is_(None), EmployeeBenefit.end_date >= datetime.now().date()),
-            )
-            .scalar()
-            or 0.0
-        )
+    employee_ids = select(Employee.id)
+    if report.department_id:
+        employee_ids = employee_ids.where(Employee.department_id == report.department_id)
+    totals = compensation_totals(employee_ids)
 
     # Format data for the report
     report_data = []
@@ -1228,9 +1105,10 @@ def view_compensation_report(report_id):
     total_benefits = 0.0
 
     for employee, comp in results:
-        base_pay = annual_base(comp)
-        bonus_pay = annual_bonus(employee.id) if report.include_bonuses else 0.0
-        benefits_pay = annual_benefits(employee.id) if report.include_benefits else 0.0
+        base_pay = annual_salary(comp)
+        employee_totals = totals.get(employee.id, CompensationTotals())
+        bonus_pay = employee_totals.bonus if report.include_bonuses else 0.0
+        benefits_pay = employee_totals.benefits if report.include_benefits else 0.0
 
         total_comp = base_pay + bonus_pay + benefits_pay
 
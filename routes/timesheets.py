@@ -1,11 +1,17 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
 from flask_login import login_required, current_user
 from app import db
-from models import Employee, PayPeriod, Timesheet, TimeEntry, Attendance, Payroll, PayrollEntry
+from models import BackgroundJob, Employee, PayPeriod, Timesheet, TimeEntry, Payroll, PayrollEntry
 from create_pay_periods import create_initial_pay_periods
+from utils.attendance_hours import employee_attendance_hours
+from utils.dashboard_stats import invalidate_dashboard_stats
+from utils.date_ranges import DateRange
 from utils.helpers import role_required
+from utils.org_hierarchy import manager_scope, manages
 from utils.pdf_utils import html_to_text, simple_pdf
+from utils.timesheet_generation import start_period_timesheets_job
 from utils.timesheet_service import TimesheetService
+from utils.upserts import dialect_insert
 import io
 from datetime import datetime, timedelta, date
 from sqlalchemy.exc import SQLAlchemyError
@@ -47,34 +53,10 @@ def calculate_hours_from_attendance(employee_id, date_obj):
     """Calculate hours worked on a specific date from attendance records
     
     This function calculates hours for both past and future dates where attendance
-    records exist, regardless of the current date.
+    records exist, regardless of the current date. All of the day's clock-in
+    sessions count, rounded to the nearest half hour.
     """
-    # Get attendance record for this date
-    attendance = Attendance.query.filter_by(
-        employee_id=employee_id,
-        date=date_obj
-    ).first()
-    
-    # If there's no attendance record, or missing clock in/out, return 0
-    if not attendance:
-        return 0.0
-    
-    # For future dates, still use attendance if it exists
-    if attendance.clock_in and attendance.clock_out:
-        # Calculate time difference in hours
-        clock_in_time = attendance.clock_in
-        clock_out_time = attendance.clock_out
-        
-        # Calculate difference in seconds and convert to hours
-        time_diff = (clock_out_time - clock_in_time).total_seconds() / 3600
-        # Round to nearest 0.5 hours (30 minutes)
-        return round(time_diff * 2) / 2
-    
-    # If there's a status of "Present" but no clock times, use a default of 8 hours
-    if attendance.status == "Present":
-        return 8.0
-    
-    return 0.0
+    return employee_attendance_hours(employee_id, DateRange.inclusive(date_obj, date_obj)).get(date_obj, 0.0)
 
 def get_employee_timesheet(employee_id, pay_period_id):
     """Get an employee's timesheet for a specific pay period or create one"""
@@ -84,13 +66,19 @@ def get_employee_timesheet(employee_id, pay_period_id):
     ).first()
     
     if not timesheet:
-        timesheet = Timesheet(
-            employee_id=employee_id,
-            pay_period_id=pay_period_id,
-            status='Draft'
+        # The period's generation job may create it at the same time
+        now = datetime.utcnow()
+        db.session.execute(
+            dialect_insert(Timesheet)
+            .values(employee_id=employee_id, pay_period_id=pay_period_id, status='Draft', total_hours=0.0,
+                    created_at=now, updated_at=now)
+            .on_conflict_do_nothing(index_elements=['employee_id', 'pay_period_id'])
         )
-        db.session.add(timesheet)
         db.session.commit()
+        timesheet = Timesheet.query.filter_by(
+            employee_id=employee_id,
+            pay_period_id=pay_period_id
+        ).one()
     
     return timesheet
 
@@ -427,24 +415,44 @@ def period_timesheets(period_id):
     """View all timesheets for a specific pay period"""
     period = PayPeriod.query.get_or_404(period_id)
     
-    # For managers, only show their direct reports
+    # For managers, only show their reporting subtree
     if current_user.role.name == 'Manager' and current_user.employee:
-        subordinates = Employee.query.filter_by(manager_id=current_user.employee.id).all()
-        subordinate_ids = [s.id for s in subordinates]
         timesheets = Timesheet.query.filter(
             Timesheet.pay_period_id == period_id,
-            Timesheet.employee_id.in_(subordinate_ids)
+            Timesheet.employee_id.in_(manager_scope(current_user.employee.id))
         ).all()
     else:
         # For HR/Admin, show all
         timesheets = Timesheet.query.filter_by(pay_period_id=period_id).all()
     
+    # Progress of a job started from generate_period_timesheets
+    job_id = request.args.get('job_id', type=int)
+    job = db.session.get(BackgroundJob, job_id) if job_id else None
+    if job is not None and (job.params or {}).get('period_id') != period_id:
+        job = None
+    
     return render_template(
         'timesheets/period_view.html',
         period=period,
-        timesheets=timesheets
+        timesheets=timesheets,
+        job=job
     )
 
+@timesheet_bp.route('/period/<int:period_id>/generate', methods=['POST'])
+@login_required
+@role_required('Admin', 'HR')
+def generate_period_timesheets(period_id):
+    """Create and prefill the timesheets of every active employee for a pay period"""
+    period = PayPeriod.query.get_or_404(period_id)
+    
+    if period.status == 'Closed':
+        flash('Reopen this pay period before generating its timesheets.', 'warning')
+        return redirect(url_for('timesheets.period_timesheets', period_id=period_id))
+    
+    job = start_period_timesheets_job(period, created_by=current_user.id)
+    flash('Generating timesheets for this pay period in the background.', 'info')
+    return redirect(url_for('timesheets.period_timesheets', period_id=period_id, job_id=job.id))
+
 
 
 def populate_timesheet_from_attendance(timesheet):
@@ -452,56 +460,12 @@ def populate_timesheet_from_attendance(timesheet):
     
     This function will take a timesheet object and populate it with
     attendance data for all dates in the pay period, including
-    future dates where attendance records exist.
+    future dates where attendance records exist. The whole period's
+    attendance is read with a single query.
     
     Returns: True if updates were made, False otherwise
     """
-    employee_id = timesheet.employee_id
-    pay_period = timesheet.pay_period
-    
-    # Auto-populate from attendance
-    current_date = pay_period.start_date
-    updates_made = False
-    
-    # Get existing time entries
-    existing_entries = TimeEntry.query.filter_by(timesheet_id=timesheet.id).all()
-    entry_dates = {entry.date.strftime('%Y-%m-%d'): entry for entry in existing_entries}
-    
-    # Iterate through all dates in the pay period
-    while current_date <= pay_period.end_date:
-        date_str = current_date.strftime('%Y-%m-%d')
-        hours = calculate_hours_from_attendance(employee_id, current_date)
-        
-        if hours > 0:
-            # Check if entry exists for this date
-            entry = entry_dates.get(date_str)
-            
-            if not entry:
-                # Create new entry
-                entry = TimeEntry(
-                    timesheet_id=timesheet.id,
-                    date=current_date,
-                    hours=hours,
-                    description="Auto-filled from attendance records"
-                )
-                db.session.add(entry)
-                updates_made = True
-            elif entry.hours == 0:
-                # Update existing entry with zero hours
-                entry.hours = hours
-                entry.description = "Auto-filled from attendance records"
-                updates_made = True
-        
-        current_date += timedelta(days=1)
-    
-    if updates_made:
-        # Recalculate total hours
-        timesheet.total_hours = db.session.query(func.sum(TimeEntry.hours))\
-            .filter(TimeEntry.timesheet_id == timesheet.id).scalar() or 0
-        db.session.commit()
-        return True
-    
-    return False
+    return TimesheetService.fill_from_attendance(timesheet)
 
 @timesheet_bp.route('/view/<int:timesheet_id>', methods=['GET', 'POST'])
 @login_required
@@ -509,10 +473,10 @@ def view_timesheet(timesheet_id):
     """View a specific timesheet with edit capabilities and navigation between employees"""
     timesheet = Timesheet.query.get_or_404(timesheet_id)
     
-    # Check access rights
+    # Check access rights; managers see their whole reporting subtree, as on the period page
     if (current_user.role.name not in ['Admin', 'HR'] and 
         (not current_user.employee or current_user.employee.id != timesheet.employee_id) and
-        (not current_user.employee or current_user.employee.id != timesheet.employee.manager_id)):
+        (not current_user.employee or not manages(current_user.employee.id, timesheet.employee_id))):
         flash('You do not have permission to view this timesheet.', 'danger')
         return redirect(url_for('timesheets.index'))
     
@@ -591,41 +555,7 @@ def edit_timesheet(timesheet_id):
     
     if request.method == 'POST':
         try:
-            # Process each day in the pay period
-            start_date = timesheet.pay_period.start_date
-            end_date = timesheet.pay_period.end_date
-            current_date = start_date
-            
-            while current_date <= end_date:
-                date_str = current_date.strftime('%Y-%m-%d')
-                hours = request.form.get(f'hours_{date_str}', '0')
-                description = request.form.get(f'description_{date_str}', '')
-                
-                # Find or create entry for this date
-                entry = TimeEntry.query.filter_by(
-                    timesheet_id=timesheet.id,
-                    date=current_date
-                ).first()
-                
-                if not entry:
-                    entry = TimeEntry(
-                        timesheet_id=timesheet.id,
-                        date=current_date,
-                        hours=float(hours) if hours else 0,
-                        description=description
-                    )
-                    db.session.add(entry)
-                else:
-                    entry.hours = float(hours) if hours else 0
-                    entry.description = description
-                
-                current_date += timedelta(days=1)
-            
-            # Update total hours
-            timesheet.total_hours = db.session.query(func.sum(TimeEntry.hours))\
-                .filter(TimeEntry.timesheet_id == timesheet.id).scalar() or 0
-            
-            db.session.commit()
+            TimesheetService.update_entries_from_form(timesheet, request.form)
             flash('Timesheet updated successfully.', 'success')
             return redirect(url_for('timesheets.view_timesheet', timesheet_id=timesheet.id))
             
@@ -643,46 +573,14 @@ def edit_timesheet(timesheet_id):
     
     # Check if fill from attendance was requested
     if request.args.get('fill_from_attendance') == '1':
-        employee_id = timesheet.employee_id
-        start_date = timesheet.pay_period.start_date
-        end_date = timesheet.pay_period.end_date
-        current_date = start_date
-        
-        updates_made = False
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Only update entries with zero hours or no entry
-            if date_str not in entries_by_date or entries_by_date[date_str].hours == 0:
-                hours = calculate_hours_from_attendance(employee_id, current_date)
-                
-                if hours > 0:
-                    # Create or update entry
-                    entry = entries_by_date.get(date_str, None)
-                    if not entry:
-                        entry = TimeEntry(
-                            timesheet_id=timesheet.id,
-                            date=current_date,
-                            hours=hours,
-                            description="Auto-filled from attendance records"
-                        )
-                        db.session.add(entry)
-                        entries_by_date[date_str] = entry
-                        updates_made = True
-                    elif entry.hours == 0:
-                        entry.hours = hours
-                        entry.description = "Auto-filled from attendance records"
-                        updates_made = True
-            
-            current_date += timedelta(days=1)
-        
-        if updates_made:
-            # Update total hours
-            timesheet.total_hours = db.session.query(func.sum(TimeEntry.hours))\
-                .filter(TimeEntry.timesheet_id == timesheet.id).scalar() or 0
-            
-            db.session.commit()
+        if populate_timesheet_from_attendance(timesheet):
             flash('Timesheet has been filled with hours from attendance records.', 'success')
+            
+            # Reorganize entries by date after the update
+            time_entries = TimeEntry.query.filter_by(timesheet_id=timesheet.id).all()
+            entries_by_date = {}
+            for entry in time_entries:
+                entries_by_date[entry.date.strftime('%Y-%m-%d')] = entry
         else:
             flash('No attendance records found to fill the timesheet.', 'info')
     
@@ -752,6 +650,8 @@ def approve_timesheet(timesheet_id):
         # Accrue leave hours based on the approved timesheet hours
         from utils.leave_accrual import accrue_leave_from_timesheet
         accrual_results = accrue_leave_from_timesheet(timesheet.id)
+        if accrual_results:
+            invalidate_dashboard_stats()
         
         # If any hours were accrued, display a message
         if accrual_results and any(hours > 0 for hours in accrual_results.values()):
@@ -804,3 +704,42 @@ def reject_timesheet(timesheet_id):
         flash(f'Error rejecting timesheet: {str(e)}', 'danger')
     
     return redirect(url_for('timesheets.view_timesheet', timesheet_id=timesheet.id))
+
+@timesheet_bp.route('/review-bulk', methods=['POST'])
+@login_required
+def review_timesheets():
+    """Approve or reject several submitted timesheets at once"""
+    action = request.form.get('action')
+    timesheet_ids = request.form.getlist('timesheet_ids', type=int)
+    period_id = request.form.get('period_id', type=int)
+    redirect_url = (url_for('timesheets.period_timesheets', period_id=period_id) if period_id
+                    else url_for('timesheets.index'))
+    
+    if action not in ('approve', 'reject'):
+        flash('Please choose whether to approve or reject the selected timesheets.', 'warning')
+        return redirect(redirect_url)
+    if not timesheet_ids:
+        flash('No timesheets were selected.', 'warning')
+        return redirect(redirect_url)
+    
+    try:
+        results = TimesheetService.review_timesheets(
+            timesheet_ids, action == 'approve', current_user, request.form.get('comments', '')
+        )
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error reviewing timesheets: {str(e)}', 'danger')
+        return redirect(redirect_url)
+    
+    reviewed = [result for result in results.values() if result['status']]
+    if reviewed:
+        flash(f"{len(reviewed)} timesheet(s) {'approved' if action == 'approve' else 'rejected'}.", 'success')
+        accrued = sum(hours for result in reviewed for hours in result['accrued'].values())
+        if accrued > 0:
+            flash(f'Leave hours accrued: {accrued:.2f} hours in total.', 'info')
+    skipped = {timesheet_id: result['message'] for timesheet_id, result in results.items() if not result['status']}
+    if skipped:
+        details = '; '.join(f'#{timesheet_id}: {message}' for timesheet_id, message in skipped.items())
+        flash(f'{len(skipped)} timesheet(s) skipped. {details}', 'warning')
+    
+    return redirect(redirect_url)
@@ -0,0 +1,47 @@
+// jobs.js - Progress polling for background jobs
+//
+// Any element with the "job-progress" class and a data-status-url attribute
+// is polled until the job finishes, then the page is reloaded.
+
+function updateJobProgress(card, data) {
+    const setText = (selector, value) => {
+        const element = card.querySelector(selector);
+        if (element) {
+            element.textContent = value;
+        }
+    };
+
+    setText('.job-status', data.status);
+    setText('.job-processed', data.processed);
+    setText('.job-total', data.total);
+    setText('.job-failed', data.failed);
+
+    const bar = card.querySelector('.job-progress-bar');
+    if (bar) {
+        bar.style.width = data.percent + '%';
+        bar.setAttribute('aria-valuenow', data.percent);
+        bar.textContent = Math.round(data.percent) + '%';
+    }
+}
+
+function pollJob(card) {
+    fetch(card.dataset.statusUrl)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'Completed' || data.status === 'Failed') {
+                window.location.reload();
+                return;
+            }
+            updateJobProgress(card, data);
+            setTimeout(() => pollJob(card), 2000);
+        })
+        .catch(error => console.error('Error loading job status:', error));
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.job-progress').forEach(card => {
+        if (['Queued', 'Running'].includes(card.dataset.jobStatus)) {
+            pollJob(card);
+        }
+    });
+});
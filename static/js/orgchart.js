@@ -8,6 +8,24 @@ document.addEventListener('DOMContentLoaded', function() {
     setupDepartmentFilter();
 });
 
+// Filter parameters (department_id) passed on to every chart request
+function orgChartParams(extra) {
+    const params = new URLSearchParams(window.location.search);
+    Object.entries(extra || {}).forEach(([key, value]) => params.set(key, value));
+    return params.toString();
+}
+
+// Fetch one page of chart nodes. Responses carry an ETag and "no-cache", so
+// the browser revalidates and unchanged subtrees come back as an empty 304.
+function fetchOrgChartPage(employeeId, offset) {
+    const path = employeeId ? `/organization/chart/nodes/${employeeId}` : '/organization/chart/nodes';
+    return fetch(`${path}?${orgChartParams({ offset: offset || 0 })}`, { cache: 'no-cache' })
+        .then(response => {
+            if (!response.ok) throw new Error(`Chart request failed: ${response.status}`);
+            return response.json();
+        });
+}
+
 // Function to initialize organizational chart
 function initializeOrgChart() {
     const chartContainer = document.getElementById('orgChartContainer');
@@ -23,14 +41,13 @@ function initializeOrgChart() {
         </div>
     `;
     
-    // Fetch chart data
-    fetch('/organization/chart-data' + window.location.search)
-        .then(response => response.json())
-        .then(data => {
+    // Only the top of the chart is loaded; subtrees load when expanded
+    fetchOrgChartPage(null, 0)
+        .then(page => {
             // Clear loading state
             chartContainer.innerHTML = '';
             
-            if (data.length === 0) {
+            if (page.total === 0) {
                 chartContainer.innerHTML = `
                     <div class="text-center py-5">
                         <p class="text-muted">No employees found for the selected criteria</p>
@@ -39,9 +56,10 @@ function initializeOrgChart() {
                 return;
             }
             
-            // Initialize OrgChart from orgchart.js
-            // We're using a placeholder implementation here, as we can't load external libraries
-            renderSimpleOrgChart(chartContainer, data);
+            const chartDiv = document.createElement('div');
+            chartDiv.className = 'org-chart';
+            chartContainer.appendChild(chartDiv);
+            appendOrgChartPage(chartDiv, null, page);
         })
         .catch(error => {
             console.error('Error loading org chart data:', error);
@@ -56,74 +74,93 @@ function initializeOrgChart() {
         });
 }
 
-// Function to render a simple org chart (placeholder for full library)
-function renderSimpleOrgChart(container, data) {
-    // Create a map for quick lookup
-    const nodeMap = new Map();
-    data.forEach(node => {
-        nodeMap.set(node.id, { ...node, children: [] });
-    });
-    
-    // Build the tree structure
-    const rootNodes = [];
-    data.forEach(node => {
-        if (node.pid) {
-            const parent = nodeMap.get(node.pid);
-            if (parent) {
-                parent.children.push(nodeMap.get(node.id));
-            } else {
-                rootNodes.push(nodeMap.get(node.id));
-            }
-        } else {
-            rootNodes.push(nodeMap.get(node.id));
-        }
-    });
-    
-    // Create chart container
-    const chartDiv = document.createElement('div');
-    chartDiv.className = 'org-chart';
-    container.appendChild(chartDiv);
+// Append a page of nodes to a container, with a "show more" button while
+// the parent has further direct reports
+function appendOrgChartPage(container, parentId, page) {
+    page.children.forEach(child => container.appendChild(createNodeElement(child)));
     
-    // Render the tree starting from root nodes
-    rootNodes.forEach(rootNode => {
-        const rootElement = createNodeElement(rootNode);
-        chartDiv.appendChild(rootElement);
-    });
+    if (page.has_more) {
+        const remaining = page.total - page.offset - page.children.length;
+        const moreButton = document.createElement('button');
+        moreButton.className = 'btn btn-sm btn-outline-secondary m-2 org-more';
+        moreButton.textContent = `Show ${Math.min(remaining, page.limit)} more of ${remaining}`;
+        moreButton.addEventListener('click', () => {
+            moreButton.disabled = true;
+            fetchOrgChartPage(parentId, page.offset + page.children.length)
+                .then(nextPage => {
+                    moreButton.remove();
+                    appendOrgChartPage(container, parentId, nextPage);
+                })
+                .catch(error => {
+                    console.error('Error loading org chart data:', error);
+                    moreButton.disabled = false;
+                });
+        });
+        container.appendChild(moreButton);
+    }
 }
 
 // Function to create a node element in the org chart
 function createNodeElement(node) {
     const nodeDiv = document.createElement('div');
     nodeDiv.className = 'org-node';
+    nodeDiv.dataset.employeeId = node.id;
     
     // Node content
     nodeDiv.innerHTML = `
         <div class="card org-card">
             <div class="card-body text-center">
-                <h6 class="card-title mb-0">${node.name}</h6>
-                <p class="card-text small text-muted">${node.title}</p>
-                <span class="badge bg-info">${node.department}</span>
+                <h6 class="card-title mb-0"></h6>
+                <p class="card-text small text-muted"></p>
+                <span class="badge bg-info"></span>
             </div>
         </div>
     `;
+    nodeDiv.querySelector('.card-title').textContent = node.name;
+    nodeDiv.querySelector('.card-text').textContent = node.title || '';
+    nodeDiv.querySelector('.badge').textContent = node.department;
     
-    // If there are children, create a container for them
-    if (node.children && node.children.length > 0) {
+    // Direct reports are fetched the first time the node is expanded
+    if (node.report_count > 0) {
+        const toggle = document.createElement('button');
+        toggle.className = 'btn btn-sm btn-link org-toggle';
+        toggle.textContent = orgToggleLabel(node, false);
+        nodeDiv.querySelector('.card-body').appendChild(toggle);
+        
         const childrenContainer = document.createElement('div');
         childrenContainer.className = 'org-children';
+        childrenContainer.hidden = true;
+        nodeDiv.appendChild(childrenContainer);
         
-        // Add each child
-        node.children.forEach(child => {
-            const childElement = createNodeElement(child);
-            childrenContainer.appendChild(childElement);
+        toggle.addEventListener('click', () => {
+            const expanding = childrenContainer.hidden;
+            childrenContainer.hidden = !expanding;
+            toggle.textContent = orgToggleLabel(node, expanding);
+            if (!expanding || childrenContainer.dataset.loaded) return;
+            
+            childrenContainer.dataset.loaded = 'true';
+            childrenContainer.innerHTML = '<div class="spinner-border spinner-border-sm text-primary" role="status"></div>';
+            fetchOrgChartPage(node.id, 0)
+                .then(page => {
+                    childrenContainer.innerHTML = '';
+                    appendOrgChartPage(childrenContainer, node.id, page);
+                })
+                .catch(error => {
+                    console.error('Error loading org chart data:', error);
+                    delete childrenContainer.dataset.loaded;
+                    childrenContainer.innerHTML = '<p class="text-danger small">Error loading reports</p>';
+                });
         });
-        
-        nodeDiv.appendChild(childrenContainer);
     }
     
     return nodeDiv;
 }
 
+function orgToggleLabel(node, expanded) {
+    const total = node.descendant_count > node.report_count ? ` (${node.descendant_count} total)` : '';
+    return `${expanded ? 'Hide' : 'Show'} ${node.report_count} report${node.report_count === 1 ? '' : 's'}${total}`;
+}
+
 // Function to set up department filter
 function setupDepartmentFilter() {
     const filterForm = document.getElementById('departmentFilterForm');
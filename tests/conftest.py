@@ -1,6 +1,7 @@
 import os
 import sys
 import types
+from contextlib import contextmanager
 import pytest
 import sqlalchemy
 from datetime import date
@@ -11,10 +12,12 @@ os.environ.setdefault("SESSION_SECRET", "testing")
 os.environ.setdefault("SECRET_KEY", "testing-secret")
 
 # Provide pandas stub if not available
-sys.modules.setdefault(
-    "pandas",
-    types.SimpleNamespace(read_csv=lambda *a, **k: None, read_excel=lambda *a, **k: None),
-)
+try:
+    import pandas  # noqa: F401
+except ImportError:
+    sys.modules["pandas"] = types.SimpleNamespace(
+        read_csv=lambda *a, **k: None, read_excel=lambda *a, **k: None,
+    )
 
 from app import create_app, db
 from models import Role, User, Employee
@@ -34,6 +37,24 @@ def app():
         db.session.remove()
         db.drop_all()
 
+@contextmanager
+def _statements_sent():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    sqlalchemy.event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        sqlalchemy.event.remove(db.engine, 'before_cursor_execute', listener)
+
+@pytest.fixture()
+def count_statements():
+    """``with count_statements() as statements:`` collects the SQL sent inside the block.
+
+    Needs an application context when the block is entered.
+    """
+    return _statements_sent
+
 @pytest.fixture()
 def client(app):
     return app.test_client()
@@ -0,0 +1,202 @@
+import os
+import datetime
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Attendance, AttendanceDaily, Department, Employee, Role, User
+from routes.timesheets import calculate_hours_from_attendance
+from utils.attendance_rollups import daily_status_counts, rebuild_attendance_rollups, refresh_attendance_days
+from utils.date_ranges import DateRange
+
+DAY = datetime.date(2024, 5, 6)
+
+
+def at(hour, minute=0, day=DAY):
+    return datetime.datetime.combine(day, datetime.time(hour, minute))
+
+
+@pytest.fixture()
+def staff():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+        it = Department(name='IT')
+        db.session.add(it)
+        db.session.flush()
+        employees = [
+            Employee(employee_id=code, first_name=code, last_name='L', email=f'{code}@x.com',
+                     hire_date=datetime.date(2020, 1, 1), status='Active', department_id=department_id)
+            for code, department_id in (('A', it.id), ('B', it.id), ('C', None))
+        ]
+        db.session.add_all(employees)
+        db.session.commit()
+        yield {'it': it.id, **{e.employee_id: e.id for e in employees}}
+        db.session.remove()
+
+
+def daily(employee_id, day=DAY):
+    return db.session.scalar(select(AttendanceDaily).where(
+        AttendanceDaily.employee_id == employee_id, AttendanceDaily.date == day))
+
+
+def status_counts(day=DAY):
+    counts = daily_status_counts(DateRange.inclusive(day, day)).get(day)
+    return counts and (counts['present'], counts['late'], counts['absent'])
+
+
+def test_sessions_roll_up_per_employee(staff):
+    db.session.add_all([
+        Attendance(employee_id=staff['A'], date=DAY, clock_in=at(9), clock_out=at(12), status='Late'),
+        Attendance(employee_id=staff['A'], date=DAY, clock_in=at(13), clock_out=at(17, 30), status='Present'),
+        Attendance(employee_id=staff['A'], date=DAY, clock_in=at(19)),
+        Attendance(employee_id=staff['B'], date=DAY, status='Absent'),
+        Attendance(employee_id=staff['C'], date=DAY, clock_in=at(8), clock_out=at(16), status='Present'),
+    ])
+    db.session.commit()
+
+    day = daily(staff['A'])
+    assert (day.sessions, day.worked_seconds, day.first_in, day.last_out, day.status) == (
+        3, 27000, at(9), at(17, 30), 'Late')
+    assert day.department_id == staff['it']
+    assert status_counts() == (1, 1, 1)
+    assert calculate_hours_from_attendance(staff['A'], DAY) == 7.5
+
+
+def test_edits_moves_and_deletes_refresh_both_days(staff):
+    first = Attendance(employee_id=staff['A'], date=DAY, clock_in=at(9), clock_out=at(17), status='Present')
+    second = Attendance(employee_id=staff['B'], date=DAY, clock_in=at(9), clock_out=at(10), status='Present')
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    first.clock_out = at(18)
+    db.session.commit()
+    assert daily(staff['A']).worked_seconds == 9 * 3600
+
+    tomorrow = DAY + datetime.timedelta(days=1)
+    second.date = tomorrow
+    second.clock_in, second.clock_out = at(9, day=tomorrow), at(11, day=tomorrow)
+    db.session.commit()
+    assert daily(staff['B']) is None and daily(staff['B'], tomorrow).worked_seconds == 7200
+    assert status_counts() == (1, 0, 0)
+
+    db.session.delete(first)
+    db.session.commit()
+    assert daily(staff['A']) is None and status_counts() is None
+
+    # Notes alone do not feed the rollups
+    second.notes = 'Dentist'
+    db.session.flush()
+    assert 'attendance_rollup_days' not in db.session.info
+
+
+def test_rolled_back_sessions_leave_no_rollup(staff):
+    db.session.add(Attendance(employee_id=staff['A'], date=DAY, status='Present'))
+    db.session.flush()
+    assert daily(staff['A']).status == 'Present'
+
+    db.session.rollback()
+    assert daily(staff['A']) is None and status_counts() is None
+
+
+def test_bulk_statements_refresh_the_days_they_touch(staff):
+    db.session.execute(insert(Attendance), [
+        {'employee_id': staff['A'], 'date': DAY, 'clock_in': at(9), 'clock_out': at(17), 'status': 'Present'},
+        {'employee_id': staff['B'], 'date': DAY, 'status': 'Absent'},
+    ])
+    assert status_counts() == (1, 0, 1)
+
+    db.session.execute(update(Attendance).where(Attendance.employee_id == staff['B']).values(status='Late'))
+    assert daily(staff['B']).status == 'Late'
+
+    session_id = db.session.scalar(select(Attendance.id).where(Attendance.employee_id == staff['A']))
+    db.session.execute(update(Attendance), [{'id': session_id, 'clock_out': at(13)}])
+    assert daily(staff['A']).worked_seconds == 4 * 3600
+
+    db.session.execute(delete(Attendance).where(Attendance.employee_id == staff['B']))
+    assert daily(staff['B']) is None
+    assert status_counts() == (1, 0, 0)
+
+
+def test_single_and_multi_row_value_inserts_refresh_their_days(staff):
+    db.session.execute(insert(Attendance).values(employee_id=staff['A'], date=DAY, status='Present'))
+    assert daily(staff['A']).status == 'Present'
+
+    result = db.session.execute(insert(Attendance).values([
+        {'employee_id': staff['B'], 'date': DAY, 'status': 'Absent'},
+        {'employee_id': staff['B'], 'date': DAY + datetime.timedelta(days=1), 'status': 'Late'},
+    ]))
+    assert result.rowcount == 2
+    assert daily(staff['B']).status == 'Absent'
+    assert daily(staff['B'], DAY + datetime.timedelta(days=1)).status == 'Late'
+
+
+def test_refreshing_a_day_again_updates_its_row_in_place(staff):
+    db.session.add(Attendance(employee_id=staff['A'], date=DAY, clock_in=at(9), clock_out=at(12), status='Present'))
+    db.session.commit()
+    row_id = daily(staff['A']).id
+
+    # A second refresh of the same day, as a concurrent clock-in would run
+    db.session.execute(insert(Attendance), [{'employee_id': staff['A'], 'date': DAY, 'clock_in': at(13)}])
+    refresh_attendance_days([(staff['A'], DAY), (staff['B'], DAY)])
+    db.session.commit()
+
+    day = daily(staff['A'])
+    assert (day.id, day.sessions, day.worked_seconds) == (row_id, 2, 3 * 3600)
+    assert daily(staff['B']) is None
+
+
+def test_rebuild_matches_incremental_rollups(staff):
+    for offset in range(3):
+        day = DAY + datetime.timedelta(days=offset)
+        for code in ('A', 'B', 'C'):
+            db.session.add(Attendance(employee_id=staff[code], date=day, clock_in=at(9, day=day),
+                                      clock_out=at(10 + offset, day=day), status='Present'))
+    db.session.commit()
+
+    def snapshot():
+        return (
+            db.session.execute(select(AttendanceDaily.employee_id, AttendanceDaily.date, AttendanceDaily.sessions,
+                                      AttendanceDaily.worked_seconds, AttendanceDaily.status)
+                               .order_by(AttendanceDaily.employee_id, AttendanceDaily.date)).all(),
+            [status_counts(DAY + datetime.timedelta(days=offset)) for offset in range(3)],
+        )
+
+    incremental = snapshot()
+    db.session.execute(delete(AttendanceDaily))
+    assert rebuild_attendance_rollups(DateRange.inclusive(DAY, DAY + datetime.timedelta(days=1))) == 6
+    assert rebuild_attendance_rollups(DateRange.inclusive(DAY + datetime.timedelta(days=2), DAY + datetime.timedelta(days=2))) == 3
+    assert snapshot() == incremental
+
+
+def test_reports_and_chart_read_the_rollups(staff):
+    role = Role(name='Admin')
+    db.session.add(role)
+    db.session.flush()
+    user = User(username='admin', email='admin@x.com', password_hash='x', role_id=role.id)
+    db.session.add(user)
+    db.session.flush()
+    db.session.get(Employee, staff['A']).user_id = user.id
+    db.session.commit()
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+
+    client.post('/attendance/clock_in')
+    client.post('/attendance/clock_out')
+    client.post('/attendance/clock_in')
+    client.post('/attendance/clock_out')
+    today = datetime.date.today()
+    assert daily(staff['A'], today).sessions == 2
+    assert Attendance.query.filter(Attendance.clock_out.is_(None)).count() == 0
+
+    page = client.get(f'/attendance/reports?start_date={today}&end_date={today}')
+    assert b'A L' in page.data and b'<td>2</td>' in page.data
+
+    chart = client.get('/charts/monthly_attendance').get_json()
+    assert chart['datasets'][0]['data'][today.day - 1] == 1
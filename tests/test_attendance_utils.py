@@ -120,3 +120,33 @@ def test_calculate_hours_from_attendance(setup_env):
         db.session.commit()
         hours = calculate_hours_from_attendance(employee.id, att2.date)
         assert hours == 8.5
+
+
+def test_fill_sums_sessions_with_constant_queries(setup_env, count_statements):
+    employee, timesheet, period = setup_env
+    day1 = period.start_date
+    day3 = period.end_date
+    with app.app_context():
+        # A second session on day 1 and two sessions on day 3
+        db.session.add_all([
+            Attendance(employee_id=employee.id, date=day1, status='Present',
+                       clock_in=datetime.datetime.combine(day1, datetime.time(18, 0)),
+                       clock_out=datetime.datetime.combine(day1, datetime.time(19, 30))),
+            Attendance(employee_id=employee.id, date=day3, status='Present',
+                       clock_in=datetime.datetime.combine(day3, datetime.time(8, 0)),
+                       clock_out=datetime.datetime.combine(day3, datetime.time(12, 0))),
+            Attendance(employee_id=employee.id, date=day3, status='Present',
+                       clock_in=datetime.datetime.combine(day3, datetime.time(13, 0)),
+                       clock_out=datetime.datetime.combine(day3, datetime.time(14, 0))),
+        ])
+        db.session.commit()
+        timesheet = db.session.get(Timesheet, timesheet.id)
+
+        with count_statements() as statements:
+            assert populate_timesheet_from_attendance(timesheet) is True
+
+        hours = {entry.date: entry.hours for entry in TimeEntry.query.filter_by(timesheet_id=timesheet.id)}
+        assert hours == {day1: 9.5, day1 + datetime.timedelta(days=1): 8.0, day3: 5.0}
+        assert timesheet.total_hours == 22.5
+        # Pay period, attendance and existing entries, whatever the period length
+        assert sum(s.startswith('SELECT') for s in statements) == 3
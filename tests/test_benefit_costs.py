@@ -0,0 +1,83 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Benefit, Department, Employee, EmployeeBenefit, EmployeeCompensation
+from routes.budgeting import calculate_payroll_expense, get_total_benefits_cost
+from utils.benefit_costs import employer_benefit_costs
+
+
+@pytest.fixture()
+def setup_env():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dept = Department(name='Engineering')
+        db.session.add(dept)
+        db.session.flush()
+
+        today = datetime.date.today()
+        health = Benefit(name='Health', benefit_type='Health', employer_contribution=500.0)
+        pension = Benefit(name='Pension', benefit_type='Retirement', employer_contribution_percentage=5.0)
+        db.session.add_all([health, pension])
+        db.session.flush()
+
+        ids = []
+        for i, salary in enumerate([60000.0, 80000.0]):
+            emp = Employee(employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                           hire_date=today, status='Active', department_id=dept.id if i == 0 else None)
+            db.session.add(emp)
+            db.session.flush()
+            db.session.add(EmployeeCompensation(employee_id=emp.id, base_salary=salary, salary_type='Annual',
+                                                effective_date=today))
+            ids.append(emp.id)
+
+        db.session.add_all([
+            EmployeeBenefit(employee_id=ids[0], benefit_id=health.id, enrollment_date=today),
+            EmployeeBenefit(employee_id=ids[0], benefit_id=pension.id, enrollment_date=today),
+            EmployeeBenefit(employee_id=ids[1], benefit_id=pension.id, enrollment_date=today),
+            # Ended enrollments cost nothing
+            EmployeeBenefit(employee_id=ids[1], benefit_id=health.id, enrollment_date=today,
+                            end_date=today - datetime.timedelta(days=1)),
+        ])
+        db.session.commit()
+
+        yield dept.id, ids
+        db.session.remove()
+        db.drop_all()
+
+
+def test_flat_and_percentage_contributions(setup_env):
+    _, ids = setup_env
+    with app.app.app_context():
+        costs = employer_benefit_costs({ids[0]: 60000.0, ids[1]: 80000.0})
+
+        assert costs.get(ids[0]) == pytest.approx(500 * 12 + 60000 * 0.05)
+        assert costs.get(ids[1]) == pytest.approx(80000 * 0.05)
+        assert costs.flat_total == pytest.approx(6000.0)
+        assert costs.total == pytest.approx(6000 + 3000 + 4000)
+
+
+def test_single_employee_cost(setup_env):
+    _, ids = setup_env
+    with app.app.app_context():
+        assert get_total_benefits_cost(ids[1]) == pytest.approx(4000.0)
+
+
+def test_payroll_expense_rollup_uses_fixed_queries(setup_env, count_statements):
+    dept_id, _ = setup_env
+    with app.app.app_context():
+        with count_statements() as statements:
+            company = calculate_payroll_expense()
+            department = calculate_payroll_expense(dept_id)
+
+        assert len(statements) == 4
+        assert company == pytest.approx((140000.0, 13000.0, 153000.0))
+        assert department == pytest.approx((60000.0, 9000.0, 69000.0))
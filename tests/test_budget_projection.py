@@ -0,0 +1,93 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Department, Employee, EmployeeCompensation
+from utils.budget_projection import (
+    ProjectionAssumptions,
+    employee_costs,
+    load_workforce,
+    project_years,
+    summarize,
+)
+
+
+@pytest.fixture()
+def department_id():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dept = Department(name='Engineering')
+        db.session.add(dept)
+        db.session.flush()
+
+        today = datetime.date.today()
+        salaried = Employee(employee_id='E1', first_name='Ada', last_name='L', email='a@x.com',
+                            hire_date=today, status='Active', department_id=dept.id, is_401k_enrolled=True)
+        hourly = Employee(employee_id='E2', first_name='Bob', last_name='M', email='b@x.com',
+                          hire_date=today, status='Active', department_id=dept.id)
+        unpaid = Employee(employee_id='E3', first_name='Cy', last_name='N', email='c@x.com',
+                          hire_date=today, status='Active')
+        inactive = Employee(employee_id='E4', first_name='Di', last_name='O', email='d@x.com',
+                            hire_date=today, status='Inactive', department_id=dept.id)
+        db.session.add_all([salaried, hourly, unpaid, inactive])
+        db.session.flush()
+
+        db.session.add_all([
+            EmployeeCompensation(employee_id=salaried.id, base_salary=100000.0, salary_type='Annual',
+                                 effective_date=today),
+            EmployeeCompensation(employee_id=hourly.id, base_salary=20.0, salary_type='Hourly',
+                                 hours_per_week=None, effective_date=today),
+            EmployeeCompensation(employee_id=inactive.id, base_salary=90000.0, salary_type='Annual',
+                                 effective_date=today),
+        ])
+        db.session.commit()
+        dept_id = dept.id
+
+        yield dept_id
+        db.session.remove()
+        db.drop_all()
+
+
+def test_workforce_annualizes_salaries(department_id):
+    with app.app.app_context():
+        workforce = load_workforce()
+
+        assert list(workforce['first_name']) == ['Ada', 'Bob', 'Cy']
+        assert list(workforce['annual_salary']) == [100000.0, 20.0 * 40 * 52, 0.0]
+        assert len(load_workforce(department_id)) == 2
+
+
+def test_costs_match_per_employee_formula(department_id):
+    with app.app.app_context():
+        costs = employee_costs(load_workforce(department_id))
+
+        ada = costs.iloc[0]
+        assert ada['retirement'] == pytest.approx(4000.0)
+        assert ada['taxes'] == pytest.approx(100000 * 0.0765 + 7000 * 0.006 + 100000 * 0.035)
+        assert ada['total'] == pytest.approx(100000 + 4000 + ada['taxes'])
+
+        bob = costs.iloc[1]
+        assert bob['retirement'] == 0.0
+        assert summarize(costs)['base_salary'] == pytest.approx(100000 + 41600)
+
+
+def test_multi_year_projection_applies_raises_and_growth(department_id):
+    with app.app.app_context():
+        workforce = load_workforce(department_id)
+        costs = employee_costs(workforce)
+        rows = project_years(costs, workforce, 2025,
+                             ProjectionAssumptions(years=3, raise_rate=0.1, headcount_growth_rate=0.5))
+
+        assert [row['year'] for row in rows] == [2025, 2026, 2027]
+        assert rows[0]['base_salary'] == pytest.approx(141600.0)
+        assert rows[1]['base_salary'] == pytest.approx(141600.0 * 1.1 * 1.5)
+        assert rows[2]['headcount'] == round(2 * 1.5 ** 2)
+        assert rows[0]['total'] == pytest.approx(summarize(costs)['total'])
@@ -0,0 +1,133 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import (
+    BackgroundJob,
+    CompensationReport,
+    Employee,
+    EmployeeCompensation,
+    PayPeriod,
+    Payroll,
+    PayrollEntry,
+    SalaryComponent,
+    SalaryStructure,
+)
+from utils.compensation_reports import generate_compensation_reports, run_compensation_report_job
+from utils.jobs import create_job, start_job
+
+
+@pytest.fixture()
+def setup_env():
+    app.app.config.update(TESTING=True, BACKGROUND_JOBS_INLINE=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        structure = SalaryStructure(name='Standard', base_salary_min=0, base_salary_max=100000)
+        db.session.add(structure)
+        db.session.flush()
+        db.session.add_all([
+            SalaryComponent(name='Signing', component_type='bonus', value=0.0, salary_structure_id=structure.id),
+            SalaryComponent(name='Phone', component_type='allowance', value=0.0, salary_structure_id=structure.id),
+            SalaryComponent(name='Dental', component_type='deduction', value=0.0, salary_structure_id=structure.id),
+        ])
+
+        this_year = PayPeriod(start_date=datetime.date(2024, 3, 1), end_date=datetime.date(2024, 3, 14),
+                              payment_date=datetime.date(2024, 3, 15), status='Completed')
+        last_year = PayPeriod(start_date=datetime.date(2023, 3, 1), end_date=datetime.date(2023, 3, 14),
+                              payment_date=datetime.date(2023, 3, 15), status='Completed')
+        db.session.add_all([this_year, last_year])
+        db.session.flush()
+
+        for i in range(3):
+            emp = Employee(
+                employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                hire_date=datetime.date(2020, 1, 1), status='Active',
+            )
+            db.session.add(emp)
+            db.session.flush()
+            db.session.add(EmployeeCompensation(
+                employee_id=emp.id, base_salary=52000.0, salary_type='Annual',
+                effective_date=datetime.date(2020, 1, 1),
+            ))
+            for period in (this_year, last_year):
+                payroll = Payroll(employee_id=emp.id, pay_period_id=period.id, gross_pay=2000.0, net_pay=1500.0)
+                db.session.add(payroll)
+                db.session.flush()
+                db.session.add_all([
+                    PayrollEntry(payroll_id=payroll.id, component_name='Base Salary', type='Earning', amount=2000.0),
+                    PayrollEntry(payroll_id=payroll.id, component_name='Signing', type='Earning', amount=100.0),
+                    PayrollEntry(payroll_id=payroll.id, component_name='Phone', type='Earning', amount=50.0),
+                    PayrollEntry(payroll_id=payroll.id, component_name='Dental', type='Deduction', amount=20.0),
+                ])
+        db.session.commit()
+
+        yield
+        db.session.remove()
+        db.drop_all()
+    app.app.config.update(BACKGROUND_JOBS_INLINE=False)
+
+
+def test_generate_reports_sums_year_entries(setup_env):
+    with app.app.app_context():
+        assert generate_compensation_reports(2024) == 3
+
+        reports = CompensationReport.query.filter_by(year=2024).all()
+        assert len(reports) == 3
+        for report in reports:
+            assert report.base_salary == 52000.0
+            assert report.total_bonus == 100.0
+            assert report.total_allowances == 50.0
+            assert report.total_deductions == 20.0
+            assert report.total_compensation == 52150.0
+            assert report.is_visible_to_employee
+
+
+def test_regenerating_updates_existing_reports(setup_env):
+    with app.app.app_context():
+        generate_compensation_reports(2024)
+        EmployeeCompensation.query.update({'base_salary': 60000.0})
+        db.session.commit()
+
+        generate_compensation_reports(2024)
+
+        reports = CompensationReport.query.filter_by(year=2024).all()
+        assert len(reports) == 3
+        assert {r.base_salary for r in reports} == {60000.0}
+
+
+def test_query_count_does_not_grow_with_headcount(setup_env, count_statements):
+    with app.app.app_context():
+        with count_statements() as small:
+            generate_compensation_reports(2024)
+
+        for i in range(3, 20):
+            db.session.add(Employee(
+                employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                hire_date=datetime.date(2020, 1, 1), status='Active',
+            ))
+        db.session.commit()
+
+        with count_statements() as large:
+            generate_compensation_reports(2024)
+        # The second run also has updates to write, which adds one bulk statement
+        assert len(large) <= len(small) + 1
+
+
+def test_report_job_records_progress(setup_env):
+    with app.app.app_context():
+        job = create_job('compensation_reports', params={'year': 2024})
+        start_job(job, run_compensation_report_job)
+
+        job = db.session.get(BackgroundJob, job.id)
+        assert job.status == 'Completed'
+        assert job.total == 3
+        assert job.processed == 3
+        assert job.percent == 100.0
+        assert job.result == {'generated': 3, 'year': 2024}
@@ -0,0 +1,141 @@
+import os
+import datetime
+import sqlalchemy
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Employee, EmployeeCompensation
+from utils import compensation as compensation_resolver
+
+
+@pytest.fixture()
+def employee_ids():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        today = datetime.date.today()
+        ids = []
+        for i in range(3):
+            emp = Employee(
+                employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                hire_date=today, status='Active',
+            )
+            db.session.add(emp)
+            db.session.flush()
+            ids.append(emp.id)
+
+        db.session.add_all([
+            # Superseded, future-dated and ended records must be ignored
+            EmployeeCompensation(employee_id=ids[0], base_salary=40000.0, salary_type='Annual',
+                                 effective_date=today - datetime.timedelta(days=400)),
+            EmployeeCompensation(employee_id=ids[0], base_salary=52000.0, salary_type='Annual',
+                                 effective_date=today - datetime.timedelta(days=30)),
+            EmployeeCompensation(employee_id=ids[0], base_salary=60000.0, salary_type='Annual',
+                                 effective_date=today + datetime.timedelta(days=30)),
+            EmployeeCompensation(employee_id=ids[1], base_salary=25.0, salary_type='Hourly',
+                                 hours_per_week=30.0, effective_date=today),
+            EmployeeCompensation(employee_id=ids[2], base_salary=90000.0, salary_type='Annual',
+                                 effective_date=today - datetime.timedelta(days=400),
+                                 end_date=today - datetime.timedelta(days=1)),
+        ])
+        db.session.commit()
+        ids = list(ids)
+    yield ids
+    with app.app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_resolve_many_picks_current_record(employee_ids):
+    with app.app.app_context():
+        resolved = compensation_resolver.resolve_many(employee_ids)
+
+        assert resolved[employee_ids[0]].base_salary == 52000.0
+        assert resolved[employee_ids[1]].salary_type == 'Hourly'
+        assert employee_ids[2] not in resolved
+        assert compensation_resolver.annual_salary(resolved[employee_ids[1]]) == 25.0 * 30.0 * 52
+
+
+def test_employee_properties_share_one_query(employee_ids, count_statements):
+    with app.app.app_context():
+        employee = db.session.get(Employee, employee_ids[1])
+
+        def read_properties():
+            assert employee.base_salary == 25.0
+            assert employee.salary_type == 'Hourly'
+            assert employee.hours_per_week == 30.0
+            assert employee.annual_base_salary == 25.0 * 30.0 * 52
+
+        with count_statements() as statements:
+            read_properties()
+        assert len(statements) == 1
+        with count_statements() as statements:
+            read_properties()
+        assert statements == []
+
+
+def test_preloaded_employees_need_no_further_queries(employee_ids, count_statements):
+    with app.app.app_context():
+        employees = Employee.query.all()
+        compensation_resolver.resolve_many(e.id for e in employees)
+
+        with count_statements() as statements:
+            salaries = [e.annual_base_salary for e in employees]
+        assert statements == []
+        assert salaries == [52000.0, 25.0 * 30.0 * 52, 0.0]
+
+
+def test_new_compensation_invalidates_cache(employee_ids):
+    with app.app.app_context():
+        employee = db.session.get(Employee, employee_ids[2])
+        assert employee.base_salary == 0.0
+
+        db.session.add(EmployeeCompensation(employee_id=employee.id, base_salary=70000.0,
+                                            salary_type='Annual', effective_date=datetime.date.today()))
+        db.session.commit()
+
+        assert employee.base_salary == 70000.0
+
+
+def test_compensation_totals_use_fixed_query_count(employee_ids, count_statements):
+    from models import Benefit, EmployeeBenefit, EmployeeIncentive
+
+    with app.app.app_context():
+        today = datetime.date.today()
+        benefit = Benefit(name='Health', benefit_type='Health', employer_contribution=300.0)
+        pension = Benefit(name='Pension', benefit_type='Retirement', employer_contribution_percentage=5.0)
+        db.session.add_all([benefit, pension])
+        db.session.flush()
+        db.session.add_all([
+            EmployeeIncentive(employee_id=employee_ids[0], incentive_type='Bonus', amount=1000.0),
+            EmployeeIncentive(employee_id=employee_ids[0], incentive_type='Bonus', amount=500.0),
+            EmployeeBenefit(employee_id=employee_ids[0], benefit_id=pension.id, enrollment_date=today),
+            EmployeeBenefit(employee_id=employee_ids[1], benefit_id=benefit.id, enrollment_date=today),
+            EmployeeBenefit(employee_id=employee_ids[2], benefit_id=benefit.id, enrollment_date=today,
+                            end_date=today - datetime.timedelta(days=1)),
+        ])
+        db.session.commit()
+
+        with count_statements() as statements:
+            totals = compensation_resolver.compensation_totals()
+        assert len(statements) == 3
+
+        assert totals[employee_ids[0]].base == 52000.0
+        assert totals[employee_ids[0]].bonus == 1500.0
+        assert totals[employee_ids[1]].base == 25.0 * 30.0 * 52
+        # Flat plans cost twelve monthly contributions, percentage plans a share of base pay
+        assert totals[employee_ids[0]].benefits == pytest.approx(52000.0 * 0.05)
+        assert totals[employee_ids[1]].benefits == 300.0 * 12
+        assert employee_ids[2] not in totals
+
+        only_first = compensation_resolver.compensation_totals(
+            sqlalchemy.select(Employee.id).where(Employee.id == employee_ids[0])
+        )
+        assert list(only_first) == [employee_ids[0]]
+        assert only_first[employee_ids[0]].total == pytest.approx(52000.0 + 1500.0 + 2600.0)
@@ -0,0 +1,106 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Attendance, Department, Employee, LeaveBalance, LeaveRequest, LeaveType, Role, User
+from utils.dashboard_stats import dashboard_stats, invalidate_dashboard_stats
+
+
+@pytest.fixture()
+def org():
+    app.app.config.update(TESTING=True, DASHBOARD_STATS_TTL=30)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+        invalidate_dashboard_stats()
+        today = datetime.date.today()
+        db.session.add(Department(name='IT'))
+        boss = Employee(employee_id='B', first_name='Boss', last_name='L', email='b@x.com',
+                        hire_date=datetime.date(2020, 1, 1), status='Active')
+        lead = Employee(employee_id='L', first_name='Lead', last_name='L', email='l@x.com',
+                        hire_date=datetime.date(2020, 1, 1), status='Active', manager=boss)
+        dev = Employee(employee_id='D', first_name='Dev', last_name='L', email='d@x.com',
+                       hire_date=datetime.date(2020, 1, 1), status='Active', manager=lead)
+        gone = Employee(employee_id='G', first_name='Gone', last_name='L', email='g@x.com',
+                        hire_date=datetime.date(2020, 1, 1), status='Inactive')
+        leave_type = LeaveType(name='Vacation')
+        db.session.add_all([boss, lead, dev, gone, leave_type])
+        db.session.flush()
+        db.session.add_all([
+            Attendance(employee_id=boss.id, date=today, status='Present'),
+            Attendance(employee_id=lead.id, date=today, status='Late'),
+            Attendance(employee_id=dev.id, date=today - datetime.timedelta(days=1), status='Absent'),
+            LeaveRequest(employee_id=dev.id, leave_type_id=leave_type.id, status='Pending',
+                         start_date=today, end_date=today),
+            LeaveRequest(employee_id=lead.id, leave_type_id=leave_type.id, status='Approved',
+                         start_date=today, end_date=today),
+            LeaveBalance(employee_id=dev.id, leave_type_id=leave_type.id, year=today.year,
+                         total_hours=80.0, used_hours=None),
+            LeaveBalance(employee_id=dev.id, leave_type_id=leave_type.id, year=today.year - 1,
+                         total_hours=24.0, used_hours=16.0),
+        ])
+        db.session.commit()
+        yield {'boss': boss.id, 'lead': lead.id, 'dev': dev.id}
+        db.session.remove()
+
+
+def test_admin_stats_take_two_queries_then_none(org, count_statements):
+    with count_statements() as statements:
+        stats = dashboard_stats('Admin')
+
+    assert stats == {'employees': 3, 'departments': 1, 'pending_leaves': 1, 'present': 1, 'absent': 0, 'late': 1}
+    assert len(statements) == 2
+    with count_statements() as statements:
+        assert dashboard_stats('HR') == stats
+    assert statements == []
+
+
+def test_manager_and_employee_scopes(org, count_statements):
+    dashboard_stats('Admin')
+
+    assert dashboard_stats('Manager', org['boss'])['pending_leaves'] == 1  # skip-level report
+    assert dashboard_stats('Manager', org['dev'])['pending_leaves'] == 0
+
+    with count_statements() as statements:
+        stats = dashboard_stats('Employee', org['dev'])
+    assert len(statements) == 1
+    assert stats == {'employees': 3, 'departments': 1, 'leave_balance': 11.0, 'attendance_today': 'Not Recorded'}
+
+
+def test_cache_is_dropped_on_invalidation_and_expires(org):
+    assert dashboard_stats('Admin')['present'] == 1
+    db.session.add(Attendance(employee_id=org['dev'], date=datetime.date.today(), status='Present'))
+    db.session.commit()
+    assert dashboard_stats('Admin')['present'] == 1  # cached
+
+    invalidate_dashboard_stats()
+    assert dashboard_stats('Admin')['present'] == 2
+
+    app.app.config['DASHBOARD_STATS_TTL'] = 0
+    db.session.query(Attendance).filter_by(employee_id=org['dev']).delete()
+    db.session.commit()
+    assert dashboard_stats('Admin')['present'] == 1
+
+
+def test_clock_in_refreshes_the_dashboard(org):
+    role = Role(name='Employee')
+    db.session.add(role)
+    db.session.flush()
+    user = User(username='dev', email='dev@x.com', password_hash='x', role_id=role.id)
+    db.session.add(user)
+    db.session.flush()
+    db.session.get(Employee, org['dev']).user_id = user.id
+    db.session.commit()
+
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+
+    assert b'Not Recorded' in client.get('/').data
+    client.post('/attendance/clock_in')
+    assert dashboard_stats('Employee', org['dev'])['attendance_today'] in ('Present', 'Late')
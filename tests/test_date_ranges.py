@@ -0,0 +1,45 @@
+import datetime
+
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, Table, select
+
+from models import PayPeriod
+from utils.date_ranges import DateRange
+
+metadata = MetaData()
+events = Table('events', metadata, Column('id', Integer, primary_key=True),
+               Column('day', Date), Column('at', DateTime))
+
+
+def test_month_and_year_ranges_are_half_open():
+    december = DateRange.for_month(2024, 12)
+    assert (december.start, december.end, december.last) == (
+        datetime.date(2024, 12, 1), datetime.date(2025, 1, 1), datetime.date(2024, 12, 31))
+    assert len(DateRange.month_of(datetime.date(2024, 2, 10))) == 29
+    assert DateRange.for_year(2023) == DateRange(datetime.date(2023, 1, 1), datetime.date(2024, 1, 1))
+    assert datetime.date(2024, 12, 31) in december and datetime.date(2025, 1, 1) not in december
+
+
+def test_inclusive_and_period_ranges_include_the_last_day():
+    period = PayPeriod(start_date=datetime.date(2024, 3, 3), end_date=datetime.date(2024, 3, 16))
+    days = list(DateRange.for_period(period).days())
+    assert (days[0], days[-1], len(days)) == (period.start_date, period.end_date, 14)
+    assert DateRange.inclusive(period.start_date, period.start_date).end == datetime.date(2024, 3, 4)
+
+
+def test_parse_month():
+    assert DateRange.parse_month('2024-05') == DateRange.for_month(2024, 5)
+    assert DateRange.parse_month('') is None
+    assert DateRange.parse_month('2024-13') is None
+    assert DateRange.parse_month('May') is None
+
+
+def test_filters_compare_the_bare_column():
+    month = DateRange.for_month(2024, 5)
+    sql = str(select(events.c.id).where(month.filter(events.c.day)).compile(compile_kwargs={'literal_binds': True}))
+    assert "events.day >= '2024-05-01' AND events.day < '2024-06-01'" in sql
+
+    params = select(events.c.id).where(month.filter(events.c.at)).compile().params
+    assert datetime.datetime(2024, 6, 1) in params.values()
+
+    overlap = str(month.overlaps(events.c.day, events.c.day).compile(compile_kwargs={'literal_binds': True}))
+    assert overlap == "events.day < '2024-06-01' AND events.day >= '2024-05-01'"
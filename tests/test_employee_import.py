@@ -0,0 +1,242 @@
+import io
+import os
+import datetime
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Department, Employee, Role, User
+from utils import importers
+from utils.importers import (
+    apply_bulk_update_diff,
+    diff_employee_bulk_update,
+    import_employees,
+    iter_import_frames,
+    process_employee_bulk_update,
+)
+from utils.sequences import allocate_block
+
+
+def employee_frame(rows):
+    columns = ['first_name', 'last_name', 'email', 'hire_date', 'job_title', 'department',
+               'manager_email', 'is_manager', 'birth_date']
+    return pd.DataFrame([dict(zip(columns, row)) for row in rows], columns=columns, dtype=str)
+
+
+@pytest.fixture()
+def ctx(monkeypatch):
+    # Default password hashing is deliberately slow; it is not under test here
+    monkeypatch.setattr(importers, 'generate_password_hash', lambda password: f'hashed:{password}')
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([Role(name='Employee'), Department(name='IT')])
+        db.session.commit()
+        yield
+        db.session.remove()
+
+
+def test_import_creates_employees_users_and_unique_ids(ctx):
+    df = employee_frame([
+        ('Ann', 'Lee', 'ann@x.com', '2023-01-15', 'Dev', 'IT', 'bob@x.com', 'No', '1990-05-15'),
+        ('Bob', 'Ray', 'bob@x.com', '2022-03-01', 'Lead', 'IT', None, 'yes', 'not a date'),
+    ])
+
+    result = import_employees(df)
+
+    assert (result.success_count, result.error_count) == (2, 0)
+    ann = Employee.query.filter_by(email='ann@x.com').one()
+    bob = Employee.query.filter_by(email='bob@x.com').one()
+    assert ann.manager_id == bob.id  # manager later in the same file
+    assert bob.is_manager and not ann.is_manager
+    assert ann.hire_date == datetime.date(2023, 1, 15)
+    assert ann.birth_date == datetime.date(1990, 5, 15) and bob.birth_date is None
+    assert ann.department.name == 'IT'
+    assert ann.employee_id != bob.employee_id
+    assert ann.user.username == 'ann' and ann.user.role.name == 'Employee'
+
+
+def test_import_updates_existing_and_reports_row_errors(ctx):
+    db.session.add(Employee(employee_id='E1', first_name='Old', last_name='Name', email='ann@x.com',
+                            hire_date=datetime.date(2020, 1, 1), status='Active'))
+    db.session.add(User(username='cy', email='cy@x.com', password_hash='x'))
+    db.session.commit()
+
+    df = employee_frame([
+        ('Ann', 'Lee', 'ann@x.com', '2023-01-15', 'Dev', 'Nowhere', None, None, None),
+        ('Bad', 'Date', 'bad@x.com', 'someday', 'Dev', None, None, None, None),
+        (None, 'Missing', 'missing@x.com', '2023-01-15', 'Dev', None, None, None, None),
+        ('Cy', 'Taken', 'cy@x.com', '2023-01-15', 'Dev', None, None, None, None),
+        ('Ann', 'Again', 'ann@x.com', '2023-01-15', 'Dev', None, None, None, None),
+    ])
+
+    result = import_employees(df)
+
+    assert result.success_count == 1
+    assert result.error_count == 4
+    assert "Row 2: Department 'Nowhere' not found" in result.errors
+    assert "Row 3: Invalid date format for hire_date. Use YYYY-MM-DD" in result.errors
+    assert "Row 4: Missing mandatory fields" in result.errors
+    assert any(error.startswith('Row 5: A user account') for error in result.errors)
+    assert any(error.startswith('Row 6: Duplicate email') for error in result.errors)
+
+    ann = Employee.query.filter_by(email='ann@x.com').one()
+    assert (ann.employee_id, ann.first_name) == ('E1', 'Ann')
+    assert Employee.query.count() == 1
+
+
+def test_failed_batch_is_retried_per_row(ctx, monkeypatch):
+    db.session.add(User(username='cy', email='cy@x.com', password_hash='x'))
+    db.session.commit()
+    employee_values = importers._employee_values
+
+    def values_rejected_for_boom(row, department_id):
+        values = employee_values(row, department_id)
+        return {**values, 'first_name': None} if row.email == 'boom@x.com' else values
+
+    monkeypatch.setattr(importers, '_employee_values', values_rejected_for_boom)
+    df = employee_frame([
+        ('Ann', 'Lee', 'ann@x.com', '2023-01-15', 'Dev', 'Nowhere', None, None, None),
+        ('Boom', 'Row', 'boom@x.com', '2023-01-15', 'Dev', None, None, None, None),
+        ('Cy', 'Taken', 'cy@x.com', '2023-01-15', 'Dev', None, None, None, None),
+        ('Dan', 'Ok', 'dan@x.com', '2023-01-15', 'Dev', None, None, None, None),
+    ])
+
+    result = import_employees(df)
+
+    assert (result.success_count, result.error_count) == (2, 2)
+    assert len(result.errors) == 3
+    assert "Row 2: Department 'Nowhere' not found" in result.errors
+    assert "Row 4: A user account with email 'cy@x.com' already exists" in result.errors
+    assert any(error.startswith('Row 3: ') for error in result.errors)
+    assert {e.email for e in Employee.query} == {'ann@x.com', 'dan@x.com'}
+    assert User.query.filter_by(email='boom@x.com').first() is None
+
+
+def test_import_query_count_does_not_grow_with_rows(ctx, count_statements):
+    def statements_for(rows):
+        df = employee_frame([
+            (f'F{i}', f'L{i}', f'{rows}-{i}@x.com', '2023-01-15', 'Dev', 'IT', None, None, None)
+            for i in range(rows)
+        ])
+        with count_statements() as statements:
+            assert import_employees(df).success_count == rows
+        return len(statements)
+
+    statements_for(1)  # seeds the employee ID sequence
+    assert statements_for(5) == statements_for(200)
+
+
+def test_allocate_block_hands_out_consecutive_ranges(ctx):
+    assert list(allocate_block('test', 3, initial=10)) == [10, 11, 12]
+    assert list(allocate_block('test', 2, initial=10)) == [13, 14]
+
+
+def test_streaming_import_commits_chunks_and_resolves_later_managers(ctx, tmp_path):
+    path = tmp_path / 'employees.csv'
+    employee_frame([
+        ('Ann', 'Lee', 'ann@x.com', '2023-01-15', 'Dev', 'IT', 'dee@x.com', None, None),
+        ('Bob', 'Ray', 'bob@x.com', 'bad', 'Dev', 'IT', None, None, None),
+        ('Cy', 'Ng', 'cy@x.com', '2023-01-15', 'Dev', 'IT', 'ann@x.com', None, None),
+        ('Dee', 'Fox', 'dee@x.com', '2023-01-15', 'Lead', 'IT', None, 'yes', None),
+        ('Eve', 'Ho', 'eve@x.com', '2023-01-15', 'Dev', 'IT', None, None, None),
+    ]).to_csv(path, index=False)
+    progress = []
+
+    result = import_employees(iter_import_frames(str(path), 'csv', chunk_size=2),
+                              progress=lambda rows, errors: progress.append((rows, errors)))
+
+    assert progress == [(2, 1), (4, 1), (5, 1)]
+    assert result.success_count == 4
+    assert result.errors == ["Row 3: Invalid date format for hire_date. Use YYYY-MM-DD"]
+    managers = {e.email: e.manager.email if e.manager else None for e in Employee.query}
+    assert managers['ann@x.com'] == 'dee@x.com'
+    assert managers['cy@x.com'] == 'ann@x.com'
+
+
+def test_xlsx_frames_are_read_row_by_row(ctx, tmp_path):
+    path = tmp_path / 'employees.xlsx'
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['First Name', 'Last Name', 'Email', 'Hire Date', 'Job Title', 'Level'])
+    sheet.append(['Ann', 'Lee', 'ann@x.com', datetime.datetime(2023, 1, 15), 'Dev', 3.0])
+    sheet.append([None, None, None, None, None, None])
+    sheet.append(['Bob', 'Ray', 'bob@x.com', '2022-03-01', 'Lead', None])
+    workbook.save(path)
+
+    frames = list(iter_import_frames(str(path), 'xlsx', chunk_size=1))
+
+    assert [list(frame.index) for frame in frames] == [[0], [2]]
+    assert frames[0].iloc[0].tolist() == ['Ann', 'Lee', 'ann@x.com', '2023-01-15', 'Dev', '3']
+    assert import_employees(frames).success_count == 2
+    assert Employee.query.filter_by(email='ann@x.com').one().level == '3'
+
+
+def test_bulk_update_streams_chunks(ctx, monkeypatch):
+    for code in ('E1', 'E2', 'E3'):
+        db.session.add(Employee(employee_id=code, first_name='F', last_name=code, email=f'{code}@x.com',
+                                hire_date=datetime.date(2020, 1, 1), status='Active'))
+    db.session.commit()
+    app.app.config['IMPORT_CHUNK_SIZE'] = 2
+    upload = FileStorage(
+        stream=io.BytesIO(b'employee_id,department_name,manager_employee_id\nE1,IT,E3\nE2,IT,\nE9,IT,\n'),
+        filename='updates.csv',
+    )
+    progress = []
+    try:
+        result = process_employee_bulk_update(upload, progress=lambda rows, errors: progress.append((rows, errors)))
+    finally:
+        app.app.config['IMPORT_CHUNK_SIZE'] = 5000
+
+    assert result['success'] and result['updated'] == 2
+    assert result['error_messages'] == ["Row 4: Employee with ID 'E9' not found"]
+    assert progress == [(2, 0), (3, 1)]
+    e1 = Employee.query.filter_by(employee_id='E1').one()
+    assert e1.department.name == 'IT' and e1.manager.employee_id == 'E3'
+
+
+def test_bulk_update_dry_run_diffs_cells_and_apply_writes_only_changes(ctx):
+    it = Department.query.filter_by(name='IT').one()
+    for code in ('E1', 'E2', 'E3'):
+        db.session.add(Employee(employee_id=code, first_name='F', last_name=code, email=f'{code}@x.com',
+                                hire_date=datetime.date(2020, 1, 1), status='Active', department_id=it.id))
+    db.session.add(Department(name='HR'))
+    db.session.commit()
+    df = pd.DataFrame({
+        'Employee ID': ['E1', 'E2', 'E9', 'E3'],
+        'department_name': ['HR', 'IT', 'IT', None],
+        'manager_employee_id': ['E3', None, None, 'E3'],
+        'is_manager': [None, 'no', None, 'yes'],
+        'Notes': ['x', None, None, None],
+    })
+
+    diff = diff_employee_bulk_update([df])
+
+    assert diff.changes[['row', 'employee_id', 'field', 'old_value']].values.tolist() == [
+        [2, 'E1', 'department_id', str(it.id)],
+        [2, 'E1', 'manager_id', ''],
+        [5, 'E3', 'is_manager', 'False'],
+    ]
+    assert diff.employees_changed == 2
+    assert diff.unknown_keys == ['E9'] and diff.unknown_columns == ['notes']
+    assert diff.errors == ["Row 4: Employee with ID 'E9' not found",
+                           "Row 5: Cannot set employee as their own manager"]
+    assert Employee.query.filter_by(employee_id='E1').one().department.name == 'IT'  # nothing written
+
+    # E3 is edited after the dry run; its stale cell is skipped, not overwritten
+    Employee.query.filter_by(employee_id='E3').one().is_manager = None
+    db.session.commit()
+    result = apply_bulk_update_diff(diff.changes)
+
+    assert result.success_count == 1
+    assert result.errors == ["Row 5: is_manager of employee 'E3' changed since the preview; not updated"]
+    e1 = Employee.query.filter_by(employee_id='E1').one()
+    assert e1.department.name == 'HR' and e1.manager.employee_id == 'E3'
+    assert Employee.query.filter_by(employee_id='E3').one().is_manager is None
@@ -0,0 +1,127 @@
+import io
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import BackgroundJob, Budget, BudgetItem, Department, Employee, Role, User
+from utils import importers
+
+
+@pytest.fixture()
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(importers, 'generate_password_hash', lambda password: f'hashed:{password}')
+    app.app.config.update(TESTING=True, BACKGROUND_JOBS_INLINE=True, UPLOAD_FOLDER=str(tmp_path))
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+        admin_role = Role(name='Admin')
+        db.session.add_all([admin_role, Role(name='Employee'), Department(name='IT')])
+        db.session.flush()
+        admin = User(username='admin', email='admin@x.com', password_hash='x', role_id=admin_role.id)
+        db.session.add(admin)
+        db.session.add(Employee(employee_id='E1', first_name='F', last_name='L', email='e1@x.com',
+                                hire_date=datetime.date(2020, 1, 1), status='Active'))
+        db.session.add(Budget(name='FY', year=2024, total_amount=10000.0))
+        db.session.commit()
+        admin_id = admin.id
+
+    with app.app.test_client() as client:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin_id)
+        yield client
+
+    with app.app.app_context():
+        db.session.remove()
+
+
+def upload(content, filename):
+    return io.BytesIO(content.encode()), filename
+
+
+def job_id_from(response):
+    return int(response.headers['Location'].rsplit('job_id=', 1)[1])
+
+
+def test_employee_import_runs_as_job(client, tmp_path):
+    csv = ('first_name,last_name,email,hire_date,job_title,department\n'
+           'Ann,Lee,ann@x.com,2023-01-15,Dev,IT\n'
+           'Bob,Ray,bob@x.com,bad,Dev,IT\n')
+    response = client.post('/employees/import', data={'file': upload(csv, 'staff.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 302
+    job_id = job_id_from(response)
+
+    status = client.get(f'/jobs/{job_id}').get_json()
+    assert status['status'] == 'Completed'
+    assert (status['total'], status['processed'], status['failed']) == (2, 2, 1)
+    assert status['result']['imported'] == 1
+    assert status['result']['errors'] == ['Row 3: Invalid date format for hire_date. Use YYYY-MM-DD']
+    assert list(tmp_path.iterdir()) == []  # upload removed once imported
+
+    page = client.get(f'/employees/import?job_id={job_id}')
+    assert b'Row 3: Invalid date format' in page.data
+
+
+def test_bulk_update_runs_as_job(client):
+    csv = 'employee_id,department_name\nE1,IT\nE9,IT\n'
+    response = client.post('/admin/bulk-updates/process', data={'upload_file': upload(csv, 'updates.csv')},
+                           content_type='multipart/form-data')
+    status = client.get(f'/jobs/{job_id_from(response)}').get_json()
+
+    assert status['status'] == 'Completed'
+    assert status['result']['updated'] == 1
+    assert status['result']['errors'] == ["Row 3: Employee with ID 'E9' not found"]
+    with app.app.app_context():
+        assert Employee.query.filter_by(employee_id='E1').one().department.name == 'IT'
+
+
+def test_bulk_update_dry_run_then_apply(client, tmp_path):
+    with app.app.app_context():
+        db.session.add(Department(name='HR'))
+        db.session.commit()
+    csv = 'employee_id,department_name\nE1,HR\nE9,IT\n'
+    response = client.post('/admin/bulk-updates/process',
+                           data={'upload_file': upload(csv, 'updates.csv'), 'dry_run': '1'},
+                           content_type='multipart/form-data')
+    preview_id = job_id_from(response)
+    status = client.get(f'/jobs/{preview_id}').get_json()
+
+    assert status['status'] == 'Completed'
+    assert (status['result']['employees_changed'], status['result']['unknown_keys']) == (1, ['E9'])
+    assert status['result']['preview'][0]['new_label'] == 'HR'
+    with app.app.app_context():
+        assert Employee.query.filter_by(employee_id='E1').one().department_id is None
+    page = client.get(f'/admin/bulk-updates?job_id={preview_id}')
+    assert b'Apply Changes' in page.data
+    download = client.get(f'/admin/bulk-updates/{preview_id}/diff')
+    assert download.data.decode().splitlines()[1] == '2,E1,department_id,,2,,HR'
+
+    response = client.post(f'/admin/bulk-updates/{preview_id}/apply')
+    status = client.get(f'/jobs/{job_id_from(response)}').get_json()
+
+    assert status['status'] == 'Completed' and status['result']['updated'] == 1
+    with app.app.app_context():
+        assert Employee.query.filter_by(employee_id='E1').one().department.name == 'HR'
+    # Each preview is applied once
+    assert client.post(f'/admin/bulk-updates/{preview_id}/apply').headers['Location'].endswith('/admin/bulk-updates')
+
+
+def test_budget_item_import_runs_as_job(client):
+    with app.app.app_context():
+        budget_id = Budget.query.one().id
+    csv = 'category,subcategory,description,amount,employee_id\nSalaries,,Dev,1000,E1\nTravel,,Trip,abc,\n'
+    response = client.post(f'/budgeting/budgets/{budget_id}/import', data={'import_file': upload(csv, 'items.csv')},
+                           content_type='multipart/form-data')
+    status = client.get(f'/jobs/{job_id_from(response)}').get_json()
+
+    assert status['result']['imported'] == 1
+    assert status['result']['errors'] == ['Row 3: Invalid amount']
+    with app.app.app_context():
+        item = BudgetItem.query.one()
+        assert (item.category, item.amount, item.employee.employee_id) == ('Salaries', 1000.0, 'E1')
+        assert db.session.get(BackgroundJob, job_id_from(response)).params['budget_id'] == budget_id
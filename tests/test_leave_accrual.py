@@ -0,0 +1,126 @@
+import os
+import datetime
+import types
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Employee, LeaveAccrual, LeaveBalance, LeaveType, PayPeriod, Timesheet
+from utils.leave_accrual import (
+    accrual_rate_for_hire_date,
+    accrue_leave_for_timesheets,
+    accrue_leave_from_timesheet,
+)
+from utils.upserts import dialect_insert
+
+TODAY = datetime.date(2024, 6, 15)
+
+
+@pytest.fixture()
+def setup_env():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        vacation = LeaveType(name='Vacation', is_paid=True)
+        sick = LeaveType(name='Sick', is_paid=True)
+        unpaid = LeaveType(name='Unpaid', is_paid=False)
+        senior = Employee(employee_id='S', first_name='S', last_name='S', email='s@x.com',
+                          hire_date=datetime.date(2019, 6, 15), status='Active')
+        junior = Employee(employee_id='J', first_name='J', last_name='J', email='j@x.com',
+                          hire_date=datetime.date(2019, 6, 16), status='Active')
+        period = PayPeriod(start_date=datetime.date(2024, 6, 1), end_date=datetime.date(2024, 6, 14))
+        next_period = PayPeriod(start_date=datetime.date(2024, 6, 15), end_date=datetime.date(2024, 6, 28))
+        db.session.add_all([vacation, sick, unpaid, senior, junior, period, next_period])
+        db.session.flush()
+
+        year = datetime.datetime.now().year
+        db.session.add(LeaveBalance(employee_id=senior.id, leave_type_id=vacation.id, year=year,
+                                    total_hours=10.0, used_hours=2.0))
+        timesheets = [
+            Timesheet(employee_id=senior.id, pay_period_id=period.id, status='Approved', total_hours=40.0),
+            Timesheet(employee_id=junior.id, pay_period_id=period.id, status='Approved', total_hours=20.0),
+            Timesheet(employee_id=junior.id, pay_period_id=next_period.id, status='Submitted', total_hours=40.0),
+        ]
+        db.session.add_all(timesheets)
+        db.session.commit()
+
+        yield [ts.id for ts in timesheets], senior.id, junior.id
+        db.session.remove()
+        db.drop_all()
+
+
+def balances():
+    return {
+        (b.employee_id, b.leave_type.name): (b.total_hours, b.accrual_rate)
+        for b in LeaveBalance.query.all()
+    }
+
+
+def test_rate_depends_on_full_years_of_service():
+    assert accrual_rate_for_hire_date(datetime.date(2019, 6, 15), TODAY) == 3.80
+    assert accrual_rate_for_hire_date(datetime.date(2019, 6, 16), TODAY) == 2.80
+    assert accrual_rate_for_hire_date(None, TODAY) == 2.80
+
+
+def test_batch_accrues_approved_timesheets_and_upserts_balances(setup_env):
+    (senior_ts, junior_ts, submitted_ts), senior, junior = setup_env
+    with app.app.app_context():
+        results = accrue_leave_for_timesheets([senior_ts, junior_ts, submitted_ts], today=TODAY)
+        db.session.commit()
+
+        assert results == {
+            senior_ts: {'Vacation': pytest.approx(3.8), 'Sick': pytest.approx(3.8)},
+            junior_ts: {'Vacation': pytest.approx(1.4), 'Sick': pytest.approx(1.4)},
+        }
+        assert balances() == {
+            (senior, 'Vacation'): (pytest.approx(13.8), 3.8),
+            (senior, 'Sick'): (pytest.approx(3.8), 3.8),
+            (junior, 'Vacation'): (pytest.approx(1.4), 2.8),
+            (junior, 'Sick'): (pytest.approx(1.4), 2.8),
+        }
+        assert LeaveBalance.query.filter_by(employee_id=senior, used_hours=2.0).count() == 1
+
+        ledger = {row.timesheet_id: (row.hours_worked, row.accrual_rate) for row in LeaveAccrual.query}
+        assert ledger == {senior_ts: (40.0, 3.8), junior_ts: (20.0, 2.8)}
+
+
+def test_timesheets_accrue_only_once(setup_env):
+    (senior_ts, junior_ts, _submitted_ts), *_ = setup_env
+    with app.app.app_context():
+        accrue_leave_for_timesheets([senior_ts], today=TODAY)
+        db.session.commit()
+        before = balances()
+
+        assert accrue_leave_for_timesheets([senior_ts], today=TODAY) == {}
+        assert accrue_leave_from_timesheet(senior_ts) is None
+        assert balances() == before
+
+        # Only the timesheet not yet in the ledger accrues
+        results = accrue_leave_for_timesheets([senior_ts, junior_ts], today=TODAY)
+        assert list(results) == [junior_ts]
+        assert LeaveAccrual.query.count() == 2
+
+
+def test_statement_count_does_not_grow_with_batch_size(setup_env, count_statements):
+    (senior_ts, junior_ts, submitted_ts), _senior, junior = setup_env
+    with app.app.app_context():
+        Timesheet.query.filter_by(id=submitted_ts).update({'status': 'Approved'})
+        db.session.commit()
+
+        with count_statements() as statements:
+            accrue_leave_for_timesheets([senior_ts, junior_ts, submitted_ts], today=TODAY)
+
+        # Paid leave types, the ledger insert and the balance upsert
+        assert len(statements) == 3
+        assert balances()[(junior, 'Vacation')] == (pytest.approx(4.2), 2.8)
+
+
+def test_upserts_need_a_supported_dialect():
+    mysql = types.SimpleNamespace(dialect=types.SimpleNamespace(name='mysql'))
+    with pytest.raises(NotImplementedError, match="'mysql'"):
+        dialect_insert(LeaveBalance, mysql)
@@ -0,0 +1,213 @@
+import os
+import datetime
+import pytest
+from sqlalchemy import update
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Employee, LeaveRequest, LeaveType, Role, User
+from utils.org_hierarchy import (
+    depth,
+    direct_reports,
+    get_org_index,
+    manager_scope,
+    manages,
+    reporting_chain,
+    span_of_control,
+    subtree,
+)
+
+
+def add_employee(code, manager=None):
+    employee = Employee(employee_id=code, first_name=code, last_name='L', email=f'{code}@x.com',
+                        hire_date=datetime.date(2020, 1, 1), status='Active', manager=manager)
+    db.session.add(employee)
+    return employee
+
+
+@pytest.fixture()
+def tree():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+        ceo = add_employee('CEO')
+        cto = add_employee('CTO', ceo)
+        cfo = add_employee('CFO', ceo)
+        dev = add_employee('DEV', cto)
+        ops = add_employee('OPS', cto)
+        intern = add_employee('INT', dev)
+        db.session.commit()
+        yield {e.employee_id: e.id for e in (ceo, cto, cfo, dev, ops, intern)}
+        db.session.remove()
+
+
+def test_hierarchy_queries_are_answered_from_memory(tree, count_statements):
+    get_org_index()
+
+    def ask():
+        return (reporting_chain(tree['INT']), direct_reports(tree['CTO']), subtree(tree['CEO']),
+                span_of_control(tree['CTO']), depth(tree['INT']), depth(tree['CEO']))
+
+    with count_statements() as statements:
+        chain, reports, members, span, intern_depth, top_depth = ask()
+
+    assert statements == []
+    assert chain == [tree['INT'], tree['DEV'], tree['CTO'], tree['CEO']]
+    assert sorted(reports) == sorted([tree['DEV'], tree['OPS']])
+    assert sorted(members) == sorted(v for k, v in tree.items() if k != 'CEO')
+    assert subtree(tree['DEV'], include_self=True) == [tree['DEV'], tree['INT']]
+    assert (span, intern_depth, top_depth) == (2, 3, 0)
+    assert reporting_chain(9999) == [] and subtree(9999) == []
+
+
+def test_index_is_dropped_when_a_manager_changes(tree):
+    assert depth(tree['OPS']) == 2
+    ops = db.session.get(Employee, tree['OPS'])
+    ops.manager_id = tree['CFO']
+    db.session.commit()
+
+    assert reporting_chain(tree['OPS']) == [tree['OPS'], tree['CFO'], tree['CEO']]
+    assert span_of_control(tree['CTO']) == 1
+
+    # Unrelated edits keep the cached index
+    index = get_org_index()
+    ops.job_title = 'Ops Lead'
+    db.session.commit()
+    assert get_org_index() is index
+
+
+def test_bulk_writes_and_new_employees_drop_the_index(tree):
+    get_org_index()
+    db.session.execute(update(Employee), [{'id': tree['INT'], 'manager_id': tree['CFO']}])
+    db.session.commit()
+    assert reporting_chain(tree['INT']) == [tree['INT'], tree['CFO'], tree['CEO']]
+
+    new_hire = add_employee('NEW', db.session.get(Employee, tree['INT']))
+    db.session.commit()
+    assert depth(new_hire.id) == 3
+
+
+def test_rolled_back_changes_are_not_kept(tree):
+    ops = db.session.get(Employee, tree['OPS'])
+    ops.manager_id = tree['CFO']
+    db.session.flush()
+    assert direct_reports(tree['CFO']) == [tree['OPS']]  # the session sees its own change
+
+    db.session.rollback()
+    assert direct_reports(tree['CFO']) == []
+
+
+def test_cycles_do_not_loop(tree):
+    ceo = db.session.get(Employee, tree['CEO'])
+    ceo.manager_id = tree['INT']
+    db.session.commit()
+
+    assert reporting_chain(tree['DEV']) == [tree['DEV'], tree['CTO'], tree['CEO'], tree['INT']]
+    assert len(subtree(tree['CEO'], include_self=True)) == 6
+
+
+def login_client(role_name, employee_id=None):
+    role = Role(name=role_name)
+    db.session.add(role)
+    db.session.flush()
+    user = User(username=role_name.lower(), email=f'{role_name}@x.com', password_hash='x', role_id=role.id)
+    db.session.add(user)
+    db.session.flush()
+    if employee_id:
+        db.session.get(Employee, employee_id).user_id = user.id
+    db.session.commit()
+
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    return client
+
+
+def scope_of(manager_id, include_self=False):
+    return sorted(db.session.scalars(manager_scope(manager_id, include_self)))
+
+
+def test_manager_scope_covers_skip_level_reports_in_sql(tree):
+    assert scope_of(tree['CTO']) == sorted([tree['DEV'], tree['OPS'], tree['INT']])
+    assert scope_of(tree['DEV'], include_self=True) == sorted([tree['DEV'], tree['INT']])
+    assert scope_of(tree['INT']) == []
+    assert manages(tree['CEO'], tree['INT']) and not manages(tree['DEV'], tree['OPS'])
+    assert not manages(tree['CTO'], tree['CTO'])
+
+    db.session.get(Employee, tree['CEO']).manager_id = tree['INT']
+    db.session.commit()
+    assert len(scope_of(tree['CTO'])) == 5  # the cycle back through the CEO terminates
+
+
+def test_pending_approvals_include_skip_level_reports(tree):
+    leave_type = LeaveType(name='Vacation')
+    db.session.add(leave_type)
+    db.session.flush()
+    for code in ('INT', 'CFO'):
+        db.session.add(LeaveRequest(employee_id=tree[code], leave_type_id=leave_type.id, status='Pending',
+                                    start_date=datetime.date(2024, 5, 1), end_date=datetime.date(2024, 5, 2)))
+    db.session.commit()
+    intern_request, cfo_request = LeaveRequest.query.order_by(LeaveRequest.id).all()
+    client = login_client('Manager', tree['CTO'])
+
+    page = client.get('/leave/pending-approvals')
+    assert b'INT L' in page.data and b'CFO L' not in page.data
+
+    client.post(f'/leave/approve/{cfo_request.id}')
+    client.post(f'/leave/approve/{intern_request.id}')
+    db.session.expire_all()
+    assert (intern_request.status, cfo_request.status) == ('Approved', 'Pending')
+
+
+def test_reporting_chain_route(tree):
+    client = login_client('Admin')
+    with client:
+        response = client.get(f"/organization/reporting-chain/{tree['DEV']}")
+        missing = client.get('/organization/reporting-chain/9999')
+
+    assert [node['name'] for node in response.get_json()] == ['DEV L', 'CTO L', 'CEO L']
+    assert missing.status_code == 404
+
+
+def test_chart_forest_counts_visible_subtrees(tree):
+    forest = get_org_index().chart_forest()
+    assert forest.roots == [tree['CEO']]
+    assert (forest.report_counts[tree['CEO']], forest.descendant_counts[tree['CEO']]) == (2, 5)
+    assert (forest.report_counts[tree['CTO']], forest.descendant_counts[tree['CTO']]) == (2, 3)
+
+    # An inactive manager drops out and their reports move to the top
+    db.session.get(Employee, tree['CTO']).status = 'Inactive'
+    db.session.commit()
+    forest = get_org_index().chart_forest()
+    assert sorted(forest.roots) == sorted([tree['CEO'], tree['DEV'], tree['OPS']])
+    assert forest.descendant_counts[tree['CEO']] == 1
+
+
+def test_chart_api_pages_children_with_etags(tree, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'ORG_CHART_PAGE_SIZE', 1)
+    client = login_client('Employee')
+
+    roots = client.get('/organization/chart/nodes')
+    assert [node['name'] for node in roots.get_json()['children']] == ['CEO L']
+
+    first = client.get(f"/organization/chart/nodes/{tree['CTO']}")
+    payload = first.get_json()
+    assert payload['node']['descendant_count'] == 3
+    assert [(node['name'], node['report_count']) for node in payload['children']] == [('DEV L', 1)]
+    assert (payload['total'], payload['has_more']) == (2, True)
+    second = client.get(f"/organization/chart/nodes/{tree['CTO']}?offset=1").get_json()
+    assert [node['name'] for node in second['children']] == ['OPS L'] and not second['has_more']
+
+    unchanged = client.get(f"/organization/chart/nodes/{tree['CTO']}", headers={'If-None-Match': first.headers['ETag']})
+    assert unchanged.status_code == 304 and unchanged.data == b''
+
+    add_employee('NEW', db.session.get(Employee, tree['OPS']))
+    db.session.commit()
+    changed = client.get(f"/organization/chart/nodes/{tree['CTO']}", headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json()['node']['descendant_count'] == 4
+
+    assert client.get('/organization/chart/nodes/9999').status_code == 404
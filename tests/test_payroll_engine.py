@@ -0,0 +1,172 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import (
+    Employee,
+    EmployeeCompensation,
+    PayPeriod,
+    Payroll,
+    PayrollEntry,
+    SalaryComponent,
+    SalaryStructure,
+)
+from utils.payroll_engine import (
+    ComponentInput,
+    PayslipInput,
+    compute_payslip,
+    compute_payslips,
+    compute_payslips_parallel,
+    load_payslip_inputs,
+    load_structure_components,
+    payroll_worker_pool,
+    write_payslips,
+)
+
+
+@pytest.fixture()
+def setup_env():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        structure = SalaryStructure(name='Standard', base_salary_min=0, base_salary_max=100000)
+        db.session.add(structure)
+        db.session.commit()
+
+        db.session.add_all([
+            SalaryComponent(name='Phone', component_type='allowance', value=50.0, salary_structure_id=structure.id),
+            SalaryComponent(name='Dental', component_type='deduction', value=20.0, salary_structure_id=structure.id),
+            SalaryComponent(name='Old', component_type='bonus', value=999.0, salary_structure_id=structure.id, is_active=False),
+        ])
+
+        period = PayPeriod(
+            start_date=datetime.date.today(),
+            end_date=datetime.date.today() + datetime.timedelta(days=13),
+            status='Draft',
+        )
+        db.session.add(period)
+        db.session.commit()
+
+        yield structure.id, period.id
+        db.session.remove()
+        db.drop_all()
+
+
+def add_employees(count, structure_id, offset=0):
+    for i in range(offset, offset + count):
+        emp = Employee(
+            employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+            hire_date=datetime.date.today(), status='Active',
+        )
+        db.session.add(emp)
+        db.session.flush()
+        db.session.add(EmployeeCompensation(
+            employee_id=emp.id, base_salary=26000.0, salary_type='Annual',
+            effective_date=datetime.date.today(), salary_structure_id=structure_id,
+        ))
+    db.session.commit()
+
+
+def test_compute_payslip_annual_with_components():
+    payslip = compute_payslip(
+        PayslipInput(employee_id=1, base_salary=26000.0, salary_type='Annual', salary_structure_id=1),
+        [ComponentInput('Phone', 'allowance', 50.0), ComponentInput('Dental', 'deduction', 20.0)],
+    )
+    assert payslip.gross_pay == 1050.0
+    assert payslip.tax_amount == pytest.approx(210.0)
+    assert payslip.total_deductions == 20.0
+    assert payslip.net_pay == pytest.approx(820.0)
+    assert [e[0] for e in payslip.entries] == ['Base Salary', 'Phone', 'Dental', 'Income Tax']
+
+
+def test_compute_payslip_without_compensation():
+    payslip = compute_payslip(PayslipInput(employee_id=1), [])
+    assert payslip.gross_pay == 0.0
+    assert payslip.net_pay == 0.0
+
+
+def test_parallel_compute_matches_serial():
+    components = {
+        1: [ComponentInput('Phone', 'allowance', 50.0), ComponentInput('Dental', 'deduction', 20.0)],
+        2: [ComponentInput('Bonus', 'bonus', 300.0)],
+    }
+    inputs = [
+        PayslipInput(employee_id=i, base_salary=1000.0 + i, salary_type='Annual' if i % 3 else 'Monthly',
+                     salary_structure_id=(i % 3) or None)
+        for i in range(1, 51)
+    ]
+    with app.app.app_context():
+        serial = compute_payslips(inputs, components)
+    parallel = compute_payslips_parallel(inputs, components, workers=2, batch_size=7)
+    assert parallel == serial
+
+
+def test_worker_pool_depends_on_run_size():
+    app.app.config.update(PAYROLL_WORKERS=2, PAYROLL_PARALLEL_MIN_EMPLOYEES=10)
+    try:
+        with app.app.app_context():
+            with payroll_worker_pool(9) as pool:
+                assert pool is None
+            with payroll_worker_pool(10) as pool:
+                assert pool is not None
+                inputs = [PayslipInput(employee_id=i, base_salary=26000.0, salary_type='Annual') for i in range(3)]
+                # A pool is reused across calls
+                assert compute_payslips(inputs, {}, pool=pool) == compute_payslips(inputs, {})
+                assert compute_payslips(inputs[:1], {}, pool=pool) == compute_payslips(inputs[:1], {})
+    finally:
+        app.app.config.update(PAYROLL_WORKERS=1, PAYROLL_PARALLEL_MIN_EMPLOYEES=5000)
+
+
+def generate_payslips(period):
+    inputs = load_payslip_inputs(period)
+    components = load_structure_components(i.salary_structure_id for i in inputs)
+    return write_payslips(period, compute_payslips(inputs, components))
+
+
+def test_write_payslips_creates_payslips(setup_env):
+    structure_id, period_id = setup_env
+    with app.app.app_context():
+        add_employees(3, structure_id)
+        period = db.session.get(PayPeriod, period_id)
+
+        created = generate_payslips(period)
+        db.session.commit()
+
+        assert created == 3
+        payslips = Payroll.query.filter_by(pay_period_id=period_id).all()
+        assert len(payslips) == 3
+        for payslip in payslips:
+            assert payslip.gross_pay == 1050.0
+            assert payslip.total_deductions == 20.0
+            names = sorted(e.component_name for e in payslip.entries)
+            assert names == ['Base Salary', 'Dental', 'Income Tax', 'Phone']
+
+        # Employees who already have a payslip are not loaded again
+        assert load_payslip_inputs(period) == []
+        assert generate_payslips(period) == 0
+        assert PayrollEntry.query.count() == 12
+
+
+def test_payslip_generation_query_count_is_constant(setup_env, count_statements):
+    structure_id, period_id = setup_env
+    with app.app.app_context():
+        add_employees(2, structure_id)
+        period = db.session.get(PayPeriod, period_id)
+        with count_statements() as small:
+            generate_payslips(period)
+        db.session.rollback()
+
+        add_employees(20, structure_id, offset=2)
+        period = db.session.get(PayPeriod, period_id)
+        with count_statements() as large:
+            generate_payslips(period)
+        db.session.rollback()
+
+        assert len(small) == len(large)
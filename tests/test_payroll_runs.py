@@ -0,0 +1,149 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Employee, EmployeeCompensation, PayPeriod, Payroll, PayrollPeriodSummary, PayrollRun
+from utils import payroll_engine, payroll_runs
+from utils.payroll_compute import open_worker_pool
+from utils.payroll_engine import load_payslip_inputs
+from utils.payroll_runs import process_next_chunk, run_progress, start_payroll_run
+
+
+@pytest.fixture()
+def setup_env():
+    app.app.config.update(TESTING=True, BACKGROUND_JOBS_INLINE=True, PAYROLL_CHUNK_SIZE=2)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        for i in range(5):
+            emp = Employee(
+                employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                hire_date=datetime.date.today(), status='Active',
+            )
+            db.session.add(emp)
+            db.session.flush()
+            db.session.add(EmployeeCompensation(
+                employee_id=emp.id, base_salary=26000.0, salary_type='Annual',
+                effective_date=datetime.date.today(),
+            ))
+
+        period = PayPeriod(
+            start_date=datetime.date.today(),
+            end_date=datetime.date.today() + datetime.timedelta(days=13),
+            status='Draft',
+        )
+        db.session.add(period)
+        db.session.commit()
+
+        yield period.id
+        db.session.remove()
+        db.drop_all()
+    app.app.config.update(BACKGROUND_JOBS_INLINE=False)
+
+
+def test_run_processes_all_chunks(setup_env):
+    period_id = setup_env
+    with app.app.app_context():
+        period = db.session.get(PayPeriod, period_id)
+        run = start_payroll_run(period)
+
+        db.session.refresh(run)
+        assert run.status == 'Completed'
+        assert run.total_employees == 5
+        assert run.processed_count == 5
+        assert run.remaining_count == 0
+        assert Payroll.query.filter_by(pay_period_id=period_id).count() == 5
+
+        db.session.refresh(period)
+        assert period.status == 'Processing'
+
+        progress = run_progress(run)
+        assert progress['percent'] == 100.0
+        assert progress['errors'] == []
+
+
+def test_run_resumes_after_crash(setup_env):
+    period_id = setup_env
+    with app.app.app_context():
+        period = db.session.get(PayPeriod, period_id)
+        run = PayrollRun(pay_period_id=period_id, chunk_size=2, total_employees=5, status='Running')
+        db.session.add(run)
+        db.session.commit()
+
+        # One chunk commits, then the worker "dies" without finishing
+        assert process_next_chunk(run, period) is True
+        run.updated_at = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        db.session.commit()
+        assert Payroll.query.count() == 2
+        # The chunk's summary totals were committed with its payslips
+        assert PayrollPeriodSummary.query.one().headcount == 2
+
+        resumed = start_payroll_run(period)
+        assert resumed.id == run.id
+
+        db.session.refresh(resumed)
+        assert resumed.status == 'Completed'
+        assert resumed.processed_count == 5
+        assert Payroll.query.count() == 5
+        assert PayrollPeriodSummary.query.one().headcount == 5
+
+
+def test_active_run_is_not_restarted(setup_env):
+    period_id = setup_env
+    with app.app.app_context():
+        period = db.session.get(PayPeriod, period_id)
+        run = PayrollRun(pay_period_id=period_id, chunk_size=2, total_employees=5, status='Running')
+        db.session.add(run)
+        db.session.commit()
+
+        assert start_payroll_run(period).id == run.id
+        assert Payroll.query.count() == 0
+
+
+def test_run_shares_one_worker_pool_across_chunks(setup_env, monkeypatch):
+    period_id = setup_env
+    pools = []
+
+    def open_pool(workers, start_method=None):
+        pools.append(open_worker_pool(workers, start_method))
+        return pools[-1]
+
+    monkeypatch.setattr(payroll_engine, 'open_worker_pool', open_pool)
+    app.app.config.update(PAYROLL_WORKERS=2, PAYROLL_PARALLEL_MIN_EMPLOYEES=5)
+    try:
+        with app.app.app_context():
+            run = start_payroll_run(db.session.get(PayPeriod, period_id))
+
+            db.session.refresh(run)
+            assert run.status == 'Completed'
+            assert Payroll.query.filter_by(pay_period_id=period_id).count() == 5
+            # Three chunks of two, one pool even though each chunk is below the threshold
+            assert len(pools) == 1
+    finally:
+        app.app.config.update(PAYROLL_WORKERS=1, PAYROLL_PARALLEL_MIN_EMPLOYEES=5000)
+
+
+def test_failed_run_leaves_summary_matching_committed_chunks(setup_env, monkeypatch):
+    period_id = setup_env
+    calls = []
+
+    def load_inputs(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            raise RuntimeError('database went away')
+        return load_payslip_inputs(*args, **kwargs)
+
+    monkeypatch.setattr(payroll_runs, 'load_payslip_inputs', load_inputs)
+    with app.app.app_context():
+        run = start_payroll_run(db.session.get(PayPeriod, period_id))
+
+        db.session.refresh(run)
+        assert run.status == 'Failed'
+        assert Payroll.query.count() == 2
+        assert PayrollPeriodSummary.query.one().headcount == 2
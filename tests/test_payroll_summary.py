@@ -0,0 +1,129 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Department, Employee, EmployeeCompensation, PayPeriod, Payroll, PayrollPeriodSummary, Role, User
+from utils.payroll_runs import start_payroll_run
+from utils.payroll_summary import (
+    apply_payslip_change,
+    get_period_summary,
+    payslip_amounts,
+    period_totals,
+    refresh_period_summary,
+)
+
+
+@pytest.fixture()
+def period_id():
+    app.app.config.update(TESTING=True, BACKGROUND_JOBS_INLINE=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        engineering = Department(name='Engineering')
+        sales = Department(name='Sales')
+        db.session.add_all([engineering, sales])
+        db.session.flush()
+
+        for i, department in enumerate([engineering, engineering, sales, None]):
+            emp = Employee(
+                employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                hire_date=datetime.date(2020, 1, 1), status='Active',
+                department_id=department.id if department else None,
+            )
+            db.session.add(emp)
+            db.session.flush()
+            db.session.add(EmployeeCompensation(
+                employee_id=emp.id, base_salary=52000.0, salary_type='Annual',
+                effective_date=datetime.date(2020, 1, 1),
+            ))
+
+        period = PayPeriod(start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 14),
+                           payment_date=datetime.date(2024, 1, 15), status='Draft')
+        db.session.add(period)
+        db.session.commit()
+        yield period.id
+        db.session.remove()
+    app.app.config.update(BACKGROUND_JOBS_INLINE=False)
+
+
+def test_processing_payroll_builds_department_summary(period_id):
+    with app.app.app_context():
+        period = db.session.get(PayPeriod, period_id)
+        start_payroll_run(period)
+
+        rows = {row.department.name if row.department else None: row for row in get_period_summary(period_id)}
+        assert set(rows) == {'Engineering', 'Sales', None}
+        assert rows['Engineering'].headcount == 2
+        assert rows['Sales'].headcount == 1
+
+        payslips = Payroll.query.filter_by(pay_period_id=period_id).all()
+        totals = period_totals([period_id])[period_id]
+        assert totals.headcount == 4
+        assert totals.total_gross == pytest.approx(sum(p.gross_pay for p in payslips))
+        assert totals.total_net == pytest.approx(sum(p.net_pay for p in payslips))
+        assert period.total_gross == pytest.approx(totals.total_gross)
+
+
+def test_payslip_edit_adjusts_summary_in_place(period_id):
+    with app.app.app_context():
+        start_payroll_run(db.session.get(PayPeriod, period_id))
+        before = period_totals([period_id])[period_id]
+
+        payslip = Payroll.query.filter_by(pay_period_id=period_id).first()
+        previous = payslip_amounts(payslip)
+        payslip.gross_pay += 100.0
+        payslip.net_pay += 100.0
+        apply_payslip_change(payslip, previous)
+        db.session.commit()
+
+        after = period_totals([period_id])[period_id]
+        assert after.headcount == before.headcount
+        assert after.total_gross == pytest.approx(before.total_gross + 100.0)
+        assert after.total_net == pytest.approx(before.total_net + 100.0)
+
+        refresh_period_summary(period_id)
+        db.session.commit()
+        assert period_totals([period_id])[period_id].total_gross == pytest.approx(after.total_gross)
+
+
+def test_period_totals_falls_back_to_payslips(period_id):
+    with app.app.app_context():
+        start_payroll_run(db.session.get(PayPeriod, period_id))
+        db.session.query(PayrollPeriodSummary).delete()
+        db.session.commit()
+
+        totals = period_totals([period_id, period_id + 1])
+        assert totals[period_id].headcount == 4
+        assert totals[period_id + 1].headcount == 0
+
+
+def test_period_page_does_not_write_missing_summary(period_id):
+    with app.app.app_context():
+        start_payroll_run(db.session.get(PayPeriod, period_id))
+        db.session.query(PayrollPeriodSummary).delete()
+        role = Role(name='Admin')
+        db.session.add(role)
+        db.session.flush()
+        user = User(username='admin', email='admin@x.com', role_id=role.id)
+        user.set_password('pw')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    response = client.get(f'/payroll/periods/{period_id}')
+    assert response.status_code == 200
+    assert b'Engineering' in response.data
+
+    with app.app.app_context():
+        assert PayrollPeriodSummary.query.count() == 0
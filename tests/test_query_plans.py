@@ -0,0 +1,140 @@
+import os
+import datetime
+import sqlalchemy
+import pytest
+from sqlalchemy import func, insert, select
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import (
+    Attendance,
+    Department,
+    Employee,
+    EmployeeCompensation,
+    LeaveBalance,
+    LeaveRequest,
+    LeaveType,
+    PayPeriod,
+    Payroll,
+    PayrollEntry,
+    TimeEntry,
+    Timesheet,
+)
+from utils.date_ranges import DateRange
+
+EMPLOYEES = 2000
+PERIODS = 6
+DEPARTMENTS = 20
+START = datetime.date(2024, 1, 1)
+
+
+@pytest.fixture(scope='module')
+def seeded():
+    app.app.config.update(TESTING=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.datetime.utcnow()
+
+        db.session.execute(insert(Department), [{'name': f'Dept {i}'} for i in range(DEPARTMENTS)])
+        db.session.execute(insert(LeaveType), [{'name': f'Leave {i}'} for i in range(3)])
+        db.session.execute(insert(PayPeriod), [
+            {'start_date': START + datetime.timedelta(days=14 * i),
+             'end_date': START + datetime.timedelta(days=14 * i + 13), 'status': 'Completed'}
+            for i in range(PERIODS)
+        ])
+        db.session.execute(insert(Employee), [
+            {'employee_id': f'Q{i:05d}', 'first_name': 'F', 'last_name': f'L{i}', 'email': f'q{i}@x.com',
+             'hire_date': START, 'status': 'Active' if i % 5 else 'Inactive',
+             'department_id': i % DEPARTMENTS + 1, 'manager_id': (i // 10) * 10 + 1 if i % 10 else None}
+            for i in range(EMPLOYEES)
+        ])
+        employee_ids = range(1, EMPLOYEES + 1)
+        period_ids = range(1, PERIODS + 1)
+
+        db.session.execute(insert(EmployeeCompensation), [
+            {'employee_id': e, 'base_salary': 50000.0, 'salary_type': 'Annual',
+             'effective_date': START - datetime.timedelta(days=365 * year)}
+            for e in employee_ids for year in range(3)
+        ])
+        db.session.execute(insert(Payroll), [
+            {'employee_id': e, 'pay_period_id': p, 'gross_pay': 2000.0, 'net_pay': 1500.0, 'status': 'Approved'}
+            for e in employee_ids for p in period_ids
+        ])
+        db.session.execute(insert(PayrollEntry), [
+            {'payroll_id': payroll_id, 'component_name': 'Base Salary', 'type': 'Earning', 'amount': 2000.0}
+            for payroll_id in range(1, EMPLOYEES * PERIODS + 1)
+        ])
+        db.session.execute(insert(Timesheet), [
+            {'employee_id': e, 'pay_period_id': p, 'status': 'Approved'}
+            for e in employee_ids for p in period_ids
+        ])
+        db.session.execute(insert(TimeEntry), [
+            {'timesheet_id': t, 'date': START + datetime.timedelta(days=day), 'hours': 8.0}
+            for t in range(1, EMPLOYEES * PERIODS + 1, 7) for day in range(5)
+        ])
+        db.session.execute(insert(Attendance), [
+            {'employee_id': e, 'date': START + datetime.timedelta(days=day), 'status': 'Present'}
+            for e in employee_ids for day in range(10)
+        ])
+        db.session.execute(insert(LeaveBalance), [
+            {'employee_id': e, 'leave_type_id': t, 'year': year, 'total_hours': 80.0, 'used_hours': 0.0}
+            for e in employee_ids for t in (1, 2, 3) for year in (2023, 2024)
+        ])
+        db.session.execute(insert(LeaveRequest), [
+            {'employee_id': e, 'leave_type_id': 1, 'start_date': START, 'end_date': START,
+             'status': 'Pending' if e % 25 == 0 else 'Approved', 'created_at': now}
+            for e in employee_ids
+        ])
+        db.session.commit()
+        db.session.execute(sqlalchemy.text('ANALYZE'))
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def query_plan(statement):
+    """Return the EXPLAIN QUERY PLAN details of an ORM statement on SQLite."""
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(
+        value.isoformat() if isinstance(value, datetime.date) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    return [row[-1] for row in rows]
+
+
+HOT_QUERIES = {
+    'attendance_by_employee_and_date': lambda: select(Attendance).where(
+        Attendance.employee_id == 42, Attendance.date >= START, Attendance.date <= START + datetime.timedelta(days=6)),
+    'payslip_by_employee_and_period': lambda: select(Payroll).where(
+        Payroll.employee_id == 42, Payroll.pay_period_id == 3),
+    'payslips_by_period': lambda: select(Payroll.id).where(Payroll.pay_period_id == 3),
+    'payroll_entries_by_payslip': lambda: select(PayrollEntry).where(PayrollEntry.payroll_id == 100),
+    'leave_balance_lookup': lambda: select(LeaveBalance).where(
+        LeaveBalance.employee_id == 42, LeaveBalance.leave_type_id == 1, LeaveBalance.year == 2024),
+    'time_entry_by_timesheet_and_date': lambda: select(TimeEntry).where(
+        TimeEntry.timesheet_id == 8, TimeEntry.date == START),
+    'timesheet_by_employee_and_period': lambda: select(Timesheet).where(
+        Timesheet.employee_id == 42, Timesheet.pay_period_id == 3),
+    'compensation_history': lambda: select(EmployeeCompensation).where(
+        EmployeeCompensation.employee_id == 42).order_by(EmployeeCompensation.effective_date.desc()),
+    'pending_leave_for_team': lambda: select(LeaveRequest).where(
+        LeaveRequest.status == 'Pending', LeaveRequest.employee_id.in_([25, 50, 75])),
+    'active_employees_in_department': lambda: select(Employee.id).where(
+        Employee.status == 'Active', Employee.department_id == 4),
+    'direct_reports': lambda: select(Employee.id).where(Employee.manager_id == 11),
+    'attendance_for_month': lambda: select(Attendance.status, func.count()).where(
+        DateRange.for_month(2024, 1).filter(Attendance.date)).group_by(Attendance.status),
+}
+
+
+@pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+def test_hot_query_uses_index(seeded, name):
+    with app.app.app_context():
+        plan = query_plan(HOT_QUERIES[name]())
+        scans = [detail for detail in plan if detail.startswith('SCAN')]
+        assert not scans, f'{name} falls back to a table scan: {plan}'
@@ -0,0 +1,186 @@
+import os
+import datetime
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['SECRET_KEY'] = 'testing'
+
+import app
+from app import db
+from models import Attendance, BackgroundJob, Employee, PayPeriod, Role, TimeEntry, Timesheet, User
+from routes.timesheets import get_employee_timesheet
+from utils import timesheet_generation
+from utils.timesheet_generation import generate_period_timesheets
+
+START = datetime.date(2024, 3, 4)
+
+
+def clocked(employee, day, start, end):
+    return Attendance(
+        employee_id=employee.id, date=day, status='Present',
+        clock_in=datetime.datetime.combine(day, datetime.time(*start)),
+        clock_out=datetime.datetime.combine(day, datetime.time(*end)),
+    )
+
+
+@pytest.fixture()
+def setup_env():
+    app.app.config.update(TESTING=True, BACKGROUND_JOBS_INLINE=True)
+    with app.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        employees = [
+            Employee(employee_id=f'E{i}', first_name='F', last_name=f'L{i}', email=f'e{i}@x.com',
+                     hire_date=datetime.date(2020, 1, 1), status='Active')
+            for i in range(3)
+        ]
+        leaver = Employee(employee_id='E9', first_name='F', last_name='L9', email='e9@x.com',
+                          hire_date=datetime.date(2020, 1, 1), status='Terminated')
+        db.session.add_all(employees + [leaver])
+        period = PayPeriod(start_date=START, end_date=START + datetime.timedelta(days=4), status='Open')
+        db.session.add(period)
+        db.session.flush()
+
+        first, second, third = employees
+        db.session.add_all([
+            # Two sessions on one day add up
+            clocked(first, START, (9, 0), (12, 0)),
+            clocked(first, START, (13, 0), (17, 30)),
+            clocked(first, START + datetime.timedelta(days=1), (9, 0), (17, 0)),
+            # Present without clock times counts as a full day
+            Attendance(employee_id=second.id, date=START, status='Present'),
+            Attendance(employee_id=second.id, date=START + datetime.timedelta(days=1), status='Absent'),
+            # Outside the period
+            clocked(second, START - datetime.timedelta(days=1), (9, 0), (17, 0)),
+            clocked(leaver, START, (9, 0), (17, 0)),
+        ])
+
+        # The third employee already has a timesheet with a saved and an empty entry
+        existing = Timesheet(employee_id=third.id, pay_period_id=period.id)
+        db.session.add(existing)
+        db.session.flush()
+        db.session.add_all([
+            clocked(third, START, (9, 0), (15, 0)),
+            clocked(third, START + datetime.timedelta(days=1), (9, 0), (16, 0)),
+            TimeEntry(timesheet_id=existing.id, date=START, hours=4.0, description='Half day'),
+            TimeEntry(timesheet_id=existing.id, date=START + datetime.timedelta(days=1), hours=0.0),
+        ])
+        db.session.commit()
+
+        yield period.id, [employee.id for employee in employees], leaver.id
+        db.session.remove()
+        db.drop_all()
+    app.app.config.update(BACKGROUND_JOBS_INLINE=False)
+
+
+def entry_hours(employee_id, period_id):
+    timesheet = Timesheet.query.filter_by(employee_id=employee_id, pay_period_id=period_id).one()
+    return timesheet, {entry.date: entry.hours for entry in TimeEntry.query.filter_by(timesheet_id=timesheet.id)}
+
+
+def test_creates_and_prefills_timesheets_of_active_employees(setup_env):
+    period_id, (first, second, third), leaver = setup_env
+    with app.app.app_context():
+        counts = generate_period_timesheets(db.session.get(PayPeriod, period_id))
+
+        assert counts == {'employees': 3, 'timesheets_created': 2, 'entries_created': 3, 'entries_filled': 1}
+        assert Timesheet.query.filter_by(employee_id=leaver).count() == 0
+
+        timesheet, hours = entry_hours(first, period_id)
+        assert timesheet.status == 'Draft'
+        assert hours == {START: 7.5, START + datetime.timedelta(days=1): 8.0}
+        assert timesheet.total_hours == 15.5
+
+        timesheet, hours = entry_hours(second, period_id)
+        assert hours == {START: 8.0}
+        assert timesheet.total_hours == 8.0
+
+        # Saved hours are kept, empty entries are filled
+        timesheet, hours = entry_hours(third, period_id)
+        assert hours == {START: 4.0, START + datetime.timedelta(days=1): 7.0}
+        assert timesheet.total_hours == 11.0
+
+
+def test_rerunning_adds_nothing(setup_env):
+    period_id, *_ = setup_env
+    with app.app.app_context():
+        period = db.session.get(PayPeriod, period_id)
+        generate_period_timesheets(period)
+        counts = generate_period_timesheets(period)
+
+        assert counts == {'employees': 3, 'timesheets_created': 0, 'entries_created': 0, 'entries_filled': 0}
+        assert Timesheet.query.count() == 3
+        assert TimeEntry.query.count() == 5
+
+
+def test_lazily_created_timesheets_are_kept(setup_env):
+    period_id, (first, second, _third), _leaver = setup_env
+    with app.app.app_context():
+        opened = get_employee_timesheet(first, period_id)
+        assert get_employee_timesheet(first, period_id).id == opened.id
+
+        counts = generate_period_timesheets(db.session.get(PayPeriod, period_id))
+        assert counts['timesheets_created'] == 1
+        assert Timesheet.query.filter_by(employee_id=first).one().id == opened.id
+        assert get_employee_timesheet(second, period_id).status == 'Draft'
+        assert Timesheet.query.count() == 3
+
+
+def test_submitted_timesheets_are_left_alone(setup_env):
+    period_id, (_first, _second, third), _leaver = setup_env
+    with app.app.app_context():
+        Timesheet.query.filter_by(employee_id=third).update({'status': 'Submitted', 'total_hours': 4.0})
+        db.session.commit()
+
+        generate_period_timesheets(db.session.get(PayPeriod, period_id))
+
+        timesheet, hours = entry_hours(third, period_id)
+        assert hours == {START: 4.0, START + datetime.timedelta(days=1): 0.0}
+        assert timesheet.total_hours == 4.0
+
+
+def test_statement_count_does_not_grow_with_headcount(setup_env, monkeypatch, count_statements):
+    period_id, *_ = setup_env
+    monkeypatch.setattr(timesheet_generation, 'TIMESHEET_BATCH_SIZE', 2)
+    with app.app.app_context():
+        with count_statements() as statements:
+            generate_period_timesheets(db.session.get(PayPeriod, period_id))
+
+        # Two inserts and two updates for each batch of two employees
+        inserts_and_updates = [s for s in statements if s.startswith(('INSERT', 'UPDATE'))]
+        assert len(inserts_and_updates) == 2 * 4
+
+
+def test_route_runs_generation_job(setup_env):
+    period_id, *_ = setup_env
+    with app.app.app_context():
+        role = Role(name='HR')
+        db.session.add(role)
+        db.session.flush()
+        user = User(username='hr', email='hr@x.com', role_id=role.id)
+        user.set_password('pw')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    response = client.post(f'/timesheets/period/{period_id}/generate')
+    assert response.status_code == 302
+    assert f'/timesheets/period/{period_id}?job_id=' in response.headers['Location']
+
+    with app.app.app_context():
+        job = BackgroundJob.query.one()
+        assert job.job_type == 'period_timesheets'
+        assert job.status == 'Completed'
+        assert job.processed == job.total == 3
+        assert job.result['timesheets_created'] == 2
+        assert Timesheet.query.count() == 3
+
+    response = client.get(response.headers['Location'])
+    assert response.status_code == 200
+    assert b'Timesheet Generation' in response.data
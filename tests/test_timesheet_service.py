@@ -8,7 +8,8 @@ os.environ['SECRET_KEY'] = 'testing'
 
 import app
 from app import db
-from models import Role, User, Employee, PayPeriod, Timesheet, TimeEntry
+from models import Role, User, Employee, PayPeriod, Timesheet, TimeEntry, LeaveType, LeaveBalance
+from utils import timesheet_service
 from utils.timesheet_service import TimesheetService
 
 @pytest.fixture()
@@ -88,3 +89,161 @@ def test_approve_timesheet(setup_env):
         TimesheetService.approve_timesheet(timesheet, user.id, 'ok')
         assert timesheet.status == 'Approved'
         assert timesheet.approved_by == user.id
+
+
+def test_update_entries_writes_only_changed_days(setup_env, count_statements):
+    user, timesheet, period, *_ = setup_env
+    with app.app.app_context():
+        period = db.session.get(PayPeriod, period.id)
+        period.end_date = period.start_date + datetime.timedelta(days=30)
+        db.session.commit()
+        timesheet = db.session.get(Timesheet, timesheet.id)
+        days = [(period.start_date + datetime.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(31)]
+
+        form = {f'hours_{day}': '8' for day in days}
+        assert TimesheetService.update_entries_from_form(timesheet, form) == 31
+        assert timesheet.total_hours == 248
+
+        form[f'hours_{days[0]}'] = '6.5'
+        form[f'description_{days[1]}'] = 'training'
+        # Reload what the first save expired, so only the save itself is counted
+        db.session.refresh(timesheet)
+        db.session.refresh(period)
+        with count_statements() as statements:
+            assert TimesheetService.update_entries_from_form(timesheet, form) == 2
+
+        # One read of the entries, one bulk update and the new total
+        assert sum(s.startswith('SELECT') for s in statements) == 1
+        assert sum(s.startswith('UPDATE time_entries') for s in statements) == 1
+        assert timesheet.total_hours == 246.5
+        assert db.session.get(Timesheet, timesheet.id).total_hours == 246.5
+        entries = {e.date.strftime('%Y-%m-%d'): e for e in TimeEntry.query.filter_by(timesheet_id=timesheet.id)}
+        assert entries[days[0]].hours == 6.5
+        assert entries[days[1]].description == 'training'
+
+        # Nothing changed, nothing written
+        assert TimesheetService.update_entries_from_form(timesheet, form) == 0
+
+
+def test_update_entries_adds_to_the_stored_total(setup_env):
+    user, stale, period, *_ = setup_env
+    with app.app.app_context():
+        start = period.start_date.strftime('%Y-%m-%d')
+        end = period.end_date.strftime('%Y-%m-%d')
+        TimesheetService.update_entries_from_form(db.session.get(Timesheet, stale.id), {f'hours_{start}': '4'})
+
+        # A copy loaded before the first save still adds to the saved total
+        assert stale.total_hours == 0
+        TimesheetService.update_entries_from_form(stale, {f'hours_{start}': '4', f'hours_{end}': '5'})
+        assert stale.total_hours == 9
+        assert db.session.get(Timesheet, stale.id).total_hours == 9
+
+
+def test_update_entries_rejects_invalid_hours(setup_env):
+    user, timesheet, period, *_ = setup_env
+    with app.app.app_context():
+        timesheet = db.session.get(Timesheet, timesheet.id)
+        start = period.start_date.strftime('%Y-%m-%d')
+        end = period.end_date.strftime('%Y-%m-%d')
+        with pytest.raises(ValueError):
+            TimesheetService.update_entries_from_form(timesheet, {f'hours_{start}': '4', f'hours_{end}': 'eight'})
+        assert TimeEntry.query.count() == 0
+
+
+def test_review_timesheets_in_bulk(setup_env, count_statements, monkeypatch):
+    user, timesheet, period, emp_a, emp_b, emp_c = setup_env
+    invalidations = []
+    monkeypatch.setattr(timesheet_service, 'invalidate_dashboard_stats', lambda: invalidations.append(True))
+    with app.app.app_context():
+        vacation = LeaveType(name='Vacation', is_paid=True)
+        unpaid = LeaveType(name='Unpaid', is_paid=False)
+        db.session.add_all([vacation, unpaid])
+        db.session.flush()
+        year = datetime.datetime.now().year
+        db.session.add(LeaveBalance(employee_id=emp_a.id, leave_type_id=vacation.id, year=year, total_hours=10.0))
+        submitted_a = Timesheet(employee_id=emp_a.id, pay_period_id=period.id, status='Submitted', total_hours=40.0)
+        submitted_c = Timesheet(employee_id=emp_c.id, pay_period_id=period.id, status='Submitted', total_hours=20.0)
+        db.session.add_all([submitted_a, submitted_c])
+        db.session.commit()
+        ids = [submitted_a.id, submitted_c.id, timesheet.id, 999]
+
+        with count_statements() as statements:
+            results = TimesheetService.review_timesheets(ids, True, db.session.get(User, user.id), 'ok')
+
+        assert results[submitted_a.id] == {'status': 'Approved', 'message': 'Timesheet approved.',
+                                           'accrued': {'Vacation': pytest.approx(2.8)}}
+        assert results[submitted_c.id]['accrued'] == {'Vacation': pytest.approx(1.4)}
+        assert results[timesheet.id]['status'] is None
+        assert results[999] == {'status': None, 'message': 'Timesheet not found.', 'accrued': {}}
+        # One status update, one balance insert and one balance update
+        assert sum(s.startswith(('UPDATE', 'INSERT')) for s in statements) == 3
+
+        approved = Timesheet.query.filter_by(status='Approved').all()
+        assert {ts.id for ts in approved} == {submitted_a.id, submitted_c.id}
+        assert all(ts.approved_by == user.id and ts.comments == 'ok' for ts in approved)
+        balances = {b.employee_id: b.total_hours for b in LeaveBalance.query.filter_by(leave_type_id=vacation.id)}
+        assert balances == {emp_a.id: pytest.approx(12.8), emp_c.id: pytest.approx(1.4)}
+        assert LeaveBalance.query.filter_by(leave_type_id=unpaid.id).count() == 0
+        assert len(invalidations) == 1  # the dashboard shows leave balances
+
+        # Already approved timesheets are skipped and accrue nothing more
+        results = TimesheetService.review_timesheets(ids[:1], False, db.session.get(User, user.id))
+        assert results[submitted_a.id]['status'] is None
+        assert db.session.get(Timesheet, submitted_a.id).status == 'Approved'
+        assert len(invalidations) == 1
+
+
+def test_managers_review_only_their_reports(setup_env):
+    user, timesheet, period, emp_a, emp_b, emp_c = setup_env
+    with app.app.app_context():
+        manager_role = Role(name='Manager')
+        db.session.add(manager_role)
+        db.session.flush()
+        manager = User(username='mgr', email='mgr@x.com', role_id=manager_role.id)
+        manager.set_password('password')
+        db.session.add(manager)
+        db.session.flush()
+        db.session.get(Employee, emp_a.id).user_id = manager.id
+        db.session.get(Employee, emp_b.id).manager_id = emp_a.id
+        db.session.get(Timesheet, timesheet.id).status = 'Submitted'
+        other = Timesheet(employee_id=emp_c.id, pay_period_id=period.id, status='Submitted')
+        db.session.add(other)
+        db.session.commit()
+
+        results = TimesheetService.review_timesheets([timesheet.id, other.id], False, manager, 'redo')
+
+        assert results[timesheet.id]['status'] == 'Rejected'
+        assert results[other.id]['status'] is None
+        assert db.session.get(Timesheet, other.id).status == 'Submitted'
+        assert db.session.get(Timesheet, timesheet.id).comments == 'redo'
+
+
+
+@pytest.mark.parametrize('viewer, allowed', [('boss', True), ('peer', False)])
+def test_skip_level_managers_can_view_timesheets(setup_env, viewer, allowed):
+    user, timesheet, period, emp_a, emp_b, emp_c = setup_env
+    with app.app.app_context():
+        manager_role = Role(name='Manager')
+        db.session.add(manager_role)
+        db.session.flush()
+        managers = {name: User(username=name, email=f'{name}@x.com', role_id=manager_role.id) for name in ('boss', 'peer')}
+        for manager in managers.values():
+            manager.set_password('password')
+        emp_d = Employee(employee_id='D', first_name='D', last_name='D', email='d@x.com',
+                         hire_date=datetime.date.today(), status='Active')
+        db.session.add_all([*managers.values(), emp_d])
+        db.session.flush()
+        # A manages C, who manages B; D is outside the chain
+        db.session.get(Employee, emp_a.id).user_id = managers['boss'].id
+        db.session.get(Employee, emp_c.id).manager_id = emp_a.id
+        db.session.get(Employee, emp_b.id).manager_id = emp_c.id
+        emp_d.user_id = managers['peer'].id
+        db.session.commit()
+        viewer_id, timesheet_id = managers[viewer].id, timesheet.id
+
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(viewer_id)
+        sess['_fresh'] = True
+    response = client.get(f'/timesheets/view/{timesheet_id}')
+    assert response.status_code == (200 if allowed else 302)
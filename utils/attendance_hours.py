@@ -0,0 +1,69 @@
+"""Hours worked per day, read from the daily attendance rollup.
+
+``attendance_daily`` already sums every clock-in session of a day, so the
+hours of a whole pay period, for one employee or the whole workforce, come
+from one range query instead of a query per employee per day.
+"""
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import Float, case, cast, func, select
+
+from app import db
+from models import AttendanceDaily
+from utils.compensation import EmployeeFilter, filter_employees
+from utils.date_ranges import DateRange
+
+# Hours credited for a day marked Present without clock times
+PRESENT_DEFAULT_HOURS = 8.0
+HALF_HOUR = 1800
+
+
+def hours_for_day(worked_seconds: Optional[int], status: Optional[str]) -> float:
+    """Timesheet hours of one day: worked time to the nearest half hour.
+
+    A day marked Present without closed sessions counts as a full day.
+    Exact quarter hours round up, as SQL ``round()`` does in :func:`hours_expression`.
+    """
+    if worked_seconds:
+        return math.floor(worked_seconds / HALF_HOUR + 0.5) / 2
+    if status == 'Present':
+        return PRESENT_DEFAULT_HOURS
+    return 0.0
+
+
+def hours_expression():
+    """:func:`hours_for_day` as a SQL expression over ``attendance_daily``."""
+    return cast(case(
+        (AttendanceDaily.worked_seconds > 0, func.round(AttendanceDaily.worked_seconds / float(HALF_HOUR)) / 2.0),
+        (AttendanceDaily.status == 'Present', PRESENT_DEFAULT_HOURS),
+        else_=0.0,
+    ), Float)
+
+
+def attendance_hours(date_range: DateRange, employee_ids: EmployeeFilter = None) -> Dict[int, Dict[date, float]]:
+    """Hours per day for each employee over ``date_range``, in one query.
+
+    ``employee_ids`` may be ids, a SELECT returning them, or ``None`` for
+    everyone. Days without hours are left out.
+    """
+    query = select(
+        AttendanceDaily.employee_id, AttendanceDaily.date, AttendanceDaily.worked_seconds, AttendanceDaily.status,
+    ).where(date_range.filter(AttendanceDaily.date))
+    query = filter_employees(query, AttendanceDaily.employee_id, employee_ids)
+
+    hours: Dict[int, Dict[date, float]] = defaultdict(dict)
+    for employee_id, day, worked_seconds, status in db.session.execute(query):
+        day_hours = hours_for_day(worked_seconds, status)
+        if day_hours > 0:
+            hours[employee_id][day] = day_hours
+    return dict(hours)
+
+
+def employee_attendance_hours(employee_id: int, date_range: DateRange) -> Dict[date, float]:
+    """Hours per day for one employee over ``date_range``."""
+    return attendance_hours(date_range, [employee_id]).get(employee_id, {})
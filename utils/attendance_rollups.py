@@ -0,0 +1,247 @@
+"""Daily attendance rollups kept in step with the raw clock-in sessions.
+
+``attendance_daily`` holds one row per employee per day (session count,
+worked seconds of the closed sessions, first clock-in, last clock-out and
+the day's status). Reports, charts, dashboard counts and timesheet
+auto-fill read the rollup instead of scanning raw sessions.
+
+Every ORM insert, update or delete of an :class:`~models.Attendance` row
+marks its day; after the flush the marked days are rebuilt inside the same
+transaction, so the rollup commits or rolls back together with the
+sessions. Bulk ``insert``/``update``/``delete`` statements refresh the days
+they touch as they run. :func:`rebuild_attendance_rollups` rebuilds a whole
+date range, e.g. after writing to the table outside the ORM.
+
+Days are written with an ``INSERT ... ON CONFLICT DO UPDATE`` after locking
+the employees' rows, so two transactions refreshing the same day (say, a
+double-submitted clock-in) wait for each other instead of one failing on
+the unique index.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from models import Attendance, AttendanceDaily, Employee
+from utils.date_ranges import DateRange
+from utils.upserts import dialect_insert
+
+# Keeps IN (...) lists well below SQLite's bind parameter limit
+REFRESH_BATCH_SIZE = 500
+# Daily rows inserted per statement by a full rebuild
+REBUILD_BATCH_SIZE = 5000
+
+# Attendance columns that feed the rollups
+_ROLLED_UP_ATTRIBUTES = ('employee_id', 'date', 'clock_in', 'clock_out', 'status')
+_SESSION_KEYS = 'attendance_rollup_days'
+
+DayKey = Tuple[int, object]
+
+
+def _daily_rows(connection, *criteria) -> Iterator[dict]:
+    """Roll up the attendance sessions matching ``criteria`` into daily rows."""
+    sessions = connection.execute(
+        select(
+            Attendance.employee_id, Attendance.date, Attendance.clock_in, Attendance.clock_out,
+            Attendance.status, Employee.department_id,
+        )
+        .outerjoin(Employee, Employee.id == Attendance.employee_id)
+        .where(*criteria)
+        .order_by(Attendance.employee_id, Attendance.date, Attendance.id)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    for (employee_id, day), rows in groupby(sessions, key=lambda row: (row.employee_id, row.date)):
+        rows = list(rows)
+        closed = [row for row in rows if row.clock_in and row.clock_out]
+        clock_ins = [row.clock_in for row in rows if row.clock_in]
+        yield {
+            'employee_id': employee_id,
+            'department_id': rows[0].department_id,
+            'date': day,
+            'sessions': len(rows),
+            'worked_seconds': sum(max(int((row.clock_out - row.clock_in).total_seconds()), 0) for row in closed),
+            'first_in': min(clock_ins) if clock_ins else None,
+            'last_out': max((row.clock_out for row in closed), default=None),
+            'status': next((row.status for row in rows if row.status), None),
+        }
+
+
+# Rollup columns overwritten when a day is refreshed
+_DAILY_COLUMNS = ('department_id', 'sessions', 'worked_seconds', 'first_in', 'last_out', 'status')
+
+
+def refresh_attendance_days(keys: Iterable[DayKey], connection=None) -> None:
+    """Rebuild the rollups of the given ``(employee_id, date)`` days.
+
+    Runs on ``connection`` (the session's by default) without committing.
+    """
+    connection = connection if connection is not None else db.session.connection()
+    employees_by_date: Dict[object, Set[int]] = defaultdict(set)
+    for employee_id, day in keys:
+        employees_by_date[day].add(employee_id)
+
+    for day, employee_ids in employees_by_date.items():
+        employee_ids = sorted(employee_ids)
+        for start in range(0, len(employee_ids), REFRESH_BATCH_SIZE):
+            batch = employee_ids[start:start + REFRESH_BATCH_SIZE]
+            # Serializes refreshes of the same employees; NO KEY UPDATE does
+            # not conflict with the key-share locks taken by inserting sessions
+            connection.execute(
+                select(Employee.id).where(Employee.id.in_(batch)).order_by(Employee.id)
+                .with_for_update(key_share=True)
+            )
+
+            rows = list(_daily_rows(connection, Attendance.date == day, Attendance.employee_id.in_(batch)))
+            if rows:
+                upsert = dialect_insert(AttendanceDaily, connection)
+                connection.execute(upsert.on_conflict_do_update(
+                    index_elements=['employee_id', 'date'],
+                    set_={column: upsert.excluded[column] for column in _DAILY_COLUMNS},
+                ), rows)
+
+            # Days left without sessions lose their row
+            connection.execute(delete(AttendanceDaily).where(
+                AttendanceDaily.date == day,
+                AttendanceDaily.employee_id.in_(batch),
+                AttendanceDaily.employee_id.not_in([row['employee_id'] for row in rows]),
+            ))
+
+
+def rebuild_attendance_rollups(date_range: Optional[DateRange] = None, connection=None) -> int:
+    """Rebuild the rollup from scratch for ``date_range`` (all dates by default).
+
+    Returns the number of daily rows written. Runs on ``connection`` (the
+    session's by default) without committing.
+    """
+    connection = connection if connection is not None else db.session.connection()
+    connection.execute(delete(AttendanceDaily).where(
+        *([date_range.filter(AttendanceDaily.date)] if date_range else [])))
+
+    written = 0
+    batch: List[dict] = []
+    for row in _daily_rows(connection, *([date_range.filter(Attendance.date)] if date_range else [])):
+        batch.append(row)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            connection.execute(insert(AttendanceDaily), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        connection.execute(insert(AttendanceDaily), batch)
+        written += len(batch)
+    return written
+
+
+# Statuses counted by daily_status_counts, keyed by their count name
+_COUNTED_STATUSES = {'Present': 'present', 'Late': 'late', 'Absent': 'absent'}
+
+
+def daily_status_counts(date_range: DateRange) -> Dict[object, Dict[str, int]]:
+    """Organisation-wide present/late/absent counts for each day with attendance.
+
+    Grouped straight from ``attendance_daily`` by its ``(date, status)`` index.
+    """
+    rows = db.session.execute(
+        select(AttendanceDaily.date, AttendanceDaily.status, func.count())
+        .where(date_range.filter(AttendanceDaily.date), AttendanceDaily.status.in_(list(_COUNTED_STATUSES)))
+        .group_by(AttendanceDaily.date, AttendanceDaily.status)
+    )
+    counts: Dict[object, Dict[str, int]] = {}
+    for day, status, count in rows:
+        day_counts = counts.setdefault(day, dict.fromkeys(_COUNTED_STATUSES.values(), 0))
+        day_counts[_COUNTED_STATUSES[status]] = count
+    return counts
+
+
+def _mark_days(session: Optional[Session], keys: Iterable[DayKey]) -> None:
+    if session is not None:
+        session.info.setdefault(_SESSION_KEYS, set()).update(keys)
+
+
+@event.listens_for(Attendance, 'after_insert')
+@event.listens_for(Attendance, 'after_delete')
+def _mark_inserted_or_deleted_day(mapper, connection, target):
+    _mark_days(object_session(target), [(target.employee_id, target.date)])
+
+
+@event.listens_for(Attendance.employee_id, 'set', active_history=True)
+@event.listens_for(Attendance.date, 'set', active_history=True)
+def _keep_previous_day(target, value, oldvalue, initiator):
+    # Registered for active_history: assigning a new employee or date loads
+    # the old one first, so after_update can see which day the session left
+    pass
+
+
+@event.listens_for(Attendance, 'after_update')
+def _mark_updated_day(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if not any(getattr(attrs, name).history.has_changes() for name in _ROLLED_UP_ATTRIBUTES):
+        return
+    # A session moved to another employee or day also changes the day it left
+    old_employee = (attrs.employee_id.history.deleted or [target.employee_id])[0]
+    old_date = (attrs.date.history.deleted or [target.date])[0]
+    _mark_days(object_session(target), {(target.employee_id, target.date), (old_employee, old_date)})
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_marked_days(session, flush_context):
+    keys = session.info.pop(_SESSION_KEYS, None)
+    if keys:
+        refresh_attendance_days(keys, session.connection())
+
+
+def _session_days(connection, criteria) -> List[Tuple[int, int, object]]:
+    return connection.execute(
+        select(Attendance.id, Attendance.employee_id, Attendance.date).where(*criteria)
+    ).all()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _refresh_bulk_written_days(orm_execute_state):
+    # Bulk statements skip the mapper events above, so the days they touch
+    # are looked up around the statement and refreshed straight after it
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_select or mapper is None or mapper.class_ is not Attendance:
+        return None
+
+    connection = orm_execute_state.session.connection()
+    statement = orm_execute_state.statement
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+    touched_ids: List[int] = []
+    if orm_execute_state.is_insert:
+        if not rows and statement._values:
+            # insert(Attendance).values(...) carries its row in the statement
+            rows = [statement.compile().params]
+        keys = {(row['employee_id'], row['date']) for row in rows if 'employee_id' in row and 'date' in row}
+        if not keys and not parameters and not statement._returning:
+            # Multi-row VALUES or INSERT ... SELECT: read the days back as
+            # they're written; the caller asked for no rows, so none are left
+            result = connection.execute(statement.returning(Attendance.employee_id, Attendance.date))
+            keys = {(employee_id, day) for employee_id, day in result.all()}
+            if keys:
+                refresh_attendance_days(keys, connection)
+            return result
+    else:
+        if rows and all('id' in row for row in rows):
+            # Bulk UPDATE by primary key
+            criteria = [Attendance.id.in_([row['id'] for row in rows])]
+        else:
+            whereclause = orm_execute_state.statement.whereclause
+            criteria = [whereclause] if whereclause is not None else []
+        before = _session_days(connection, criteria)
+        keys = {(employee_id, day) for _id, employee_id, day in before}
+        touched_ids = [session_id for session_id, _employee_id, _day in before]
+
+    result = orm_execute_state.invoke_statement()
+    if orm_execute_state.is_update:
+        for start in range(0, len(touched_ids), REFRESH_BATCH_SIZE):
+            after = _session_days(connection, [Attendance.id.in_(touched_ids[start:start + REFRESH_BATCH_SIZE])])
+            keys.update((employee_id, day) for _id, employee_id, day in after)
+    if keys:
+        refresh_attendance_days(keys, connection)
+    return result
@@ -0,0 +1,44 @@
+"""Run long jobs off the request thread without an external broker."""
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor(max_workers: int = 4) -> ThreadPoolExecutor:
+    """Return the process-wide executor used for background jobs."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ems-job')
+    return _executor
+
+
+def run_in_background(func: Callable, *args, **kwargs) -> Optional[Future]:
+    """Run ``func(*args, **kwargs)`` inside an app context on a worker thread.
+
+    When ``BACKGROUND_JOBS_INLINE`` is set (e.g. in tests) the job runs
+    synchronously in the calling thread and ``None`` is returned.
+    """
+    app = current_app._get_current_object()
+
+    if app.config.get('BACKGROUND_JOBS_INLINE'):
+        func(*args, **kwargs)
+        return None
+
+    def job():
+        with app.app_context():
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception('Background job %s failed', getattr(func, '__name__', func))
+                raise
+
+    executor = get_executor(app.config.get('BACKGROUND_JOB_WORKERS', 4))
+    return executor.submit(job)
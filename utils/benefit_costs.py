@@ -0,0 +1,64 @@
+"""Employer benefit cost calculation for many employees at once."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Mapping, Optional
+
+from sqlalchemy import or_, select
+
+from app import db
+from models import Benefit, EmployeeBenefit
+from utils.compensation import EmployeeFilter, filter_employees
+
+# Flat employer contributions are stored per month
+MONTHS_PER_YEAR = 12
+
+
+@dataclass
+class BenefitCosts:
+    """Annual employer benefit cost per employee and overall."""
+    per_employee: Dict[int, float] = field(default_factory=dict)
+    flat_total: float = 0.0
+    percentage_total: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return self.flat_total + self.percentage_total
+
+    def get(self, employee_id: int) -> float:
+        return self.per_employee.get(employee_id, 0.0)
+
+
+def employer_benefit_costs(annual_salaries: Mapping[int, float], employee_ids: EmployeeFilter = None,
+                           as_of: Optional[date] = None) -> BenefitCosts:
+    """Annual employer cost of every active benefit enrollment.
+
+    Enrollments are joined to their benefit plan in one query. Flat plans
+    cost twelve monthly contributions; percentage plans cost a share of the
+    employee's annual salary, taken from ``annual_salaries``.
+    """
+    as_of = as_of or datetime.now().date()
+    query = (
+        select(
+            EmployeeBenefit.employee_id,
+            Benefit.employer_contribution,
+            Benefit.employer_contribution_percentage,
+        )
+        .join(Benefit, EmployeeBenefit.benefit_id == Benefit.id)
+        .where(or_(EmployeeBenefit.end_date.is_(None), EmployeeBenefit.end_date >= as_of))
+    )
+    query = filter_employees(query, EmployeeBenefit.employee_id, employee_ids)
+
+    costs = BenefitCosts()
+    for employee_id, flat, percentage in db.session.execute(query):
+        if flat:
+            amount = flat * MONTHS_PER_YEAR
+            costs.flat_total += amount
+        elif percentage:
+            amount = annual_salaries.get(employee_id, 0.0) * percentage / 100
+            costs.percentage_total += amount
+        else:
+            continue
+        costs.per_employee[employee_id] = costs.per_employee.get(employee_id, 0.0) + amount
+    return costs
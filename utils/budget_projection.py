@@ -0,0 +1,157 @@
+"""Vectorized personnel cost projections.
+
+The active workforce is loaded into a pandas frame with one query and every
+cost column is computed with column operations, so projections stay fast
+for very large headcounts.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+import pandas as pd
+from sqlalchemy import Select, select
+
+from app import db
+from models import Department, Employee
+from utils.benefit_costs import BenefitCosts, employer_benefit_costs
+from utils.compensation import current_compensation_subquery
+
+# Employer cost assumptions (simplified US rates)
+RETIREMENT_MATCH_RATE = 0.04  # 401(k) match for enrolled employees
+FICA_RATE = 0.0765  # 6.2% Social Security + 1.45% Medicare
+FUTA_RATE = 0.006
+FUTA_WAGE_BASE = 7000
+SUTA_RATE = 0.035  # Varies by state, using example rate
+
+WEEKS_PER_YEAR = 52
+DEFAULT_HOURS_PER_WEEK = 40.0
+
+WORKFORCE_COLUMNS = [
+    'employee_id', 'first_name', 'last_name', 'department', 'job_title',
+    'is_401k_enrolled', 'base_salary', 'salary_type', 'hours_per_week',
+]
+
+COST_COLUMNS = ['base_salary', 'retirement', 'taxes', 'benefits', 'total']
+
+
+@dataclass
+class ProjectionAssumptions:
+    """Growth assumptions applied year over year from the base year."""
+    years: int = 1
+    raise_rate: float = 0.0  # e.g. 0.03 for a 3% annual raise
+    headcount_growth_rate: float = 0.0  # e.g. 0.05 for 5% more staff per year
+
+
+def active_employee_ids(department_id: Optional[int] = None) -> Select:
+    """SELECT of the active employees included in a projection."""
+    query = select(Employee.id).where(Employee.status == 'Active')
+    if department_id:
+        query = query.where(Employee.department_id == department_id)
+    return query
+
+
+def load_workforce(department_id: Optional[int] = None, as_of: Optional[date] = None) -> pd.DataFrame:
+    """Load active employees and their current compensation as a frame.
+
+    Employees without a current compensation get a zero salary.
+    """
+    current = current_compensation_subquery(as_of)
+    query = (
+        select(
+            Employee.id,
+            Employee.first_name,
+            Employee.last_name,
+            Department.name,
+            Employee.job_title,
+            Employee.is_401k_enrolled,
+            current.c.base_salary,
+            current.c.salary_type,
+            current.c.hours_per_week,
+        )
+        .outerjoin(Department, Department.id == Employee.department_id)
+        .outerjoin(current, (current.c.employee_id == Employee.id) & (current.c.rank == 1))
+        .where(Employee.status == 'Active')
+        .order_by(Employee.id)
+    )
+    if department_id:
+        query = query.where(Employee.department_id == department_id)
+
+    frame = pd.DataFrame(db.session.execute(query).all(), columns=WORKFORCE_COLUMNS)
+    frame['base_salary'] = frame['base_salary'].astype(float).fillna(0.0)
+    frame['hours_per_week'] = frame['hours_per_week'].astype(float).fillna(DEFAULT_HOURS_PER_WEEK)
+    frame['hours_per_week'] = frame['hours_per_week'].mask(frame['hours_per_week'] == 0, DEFAULT_HOURS_PER_WEEK)
+    frame['is_401k_enrolled'] = frame['is_401k_enrolled'].fillna(False).astype(bool)
+    frame['annual_salary'] = frame['base_salary'].where(
+        frame['salary_type'] == 'Annual',
+        frame['base_salary'] * frame['hours_per_week'] * WEEKS_PER_YEAR,
+    )
+    return frame
+
+
+def workforce_benefit_costs(workforce: pd.DataFrame, department_id: Optional[int] = None,
+                            as_of: Optional[date] = None) -> BenefitCosts:
+    """Employer benefit costs for ``workforce``, priced against its salaries."""
+    salaries = dict(zip(workforce['employee_id'], workforce['annual_salary']))
+    return employer_benefit_costs(salaries, active_employee_ids(department_id), as_of)
+
+
+def benefits_column(workforce: pd.DataFrame, benefit_costs: BenefitCosts) -> pd.Series:
+    """Per-employee benefit costs aligned with the rows of ``workforce``."""
+    return workforce['employee_id'].map(benefit_costs.per_employee).fillna(0.0).astype(float)
+
+
+def compute_costs(salaries: pd.Series, is_401k_enrolled: pd.Series,
+                  benefits: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Compute employer cost columns for a series of annual salaries."""
+    retirement = (salaries * RETIREMENT_MATCH_RATE).where(is_401k_enrolled, 0.0)
+    taxes = (
+        salaries * FICA_RATE
+        + salaries.clip(upper=FUTA_WAGE_BASE) * FUTA_RATE
+        + salaries * SUTA_RATE
+    )
+    benefits = benefits if benefits is not None else pd.Series(0.0, index=salaries.index)
+    return pd.DataFrame({
+        'base_salary': salaries,
+        'retirement': retirement,
+        'taxes': taxes,
+        'benefits': benefits,
+        'total': salaries + retirement + taxes + benefits,
+    })
+
+
+def employee_costs(workforce: pd.DataFrame, benefits: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Per-employee cost frame for the base year."""
+    costs = compute_costs(workforce['annual_salary'], workforce['is_401k_enrolled'], benefits)
+    identity = workforce[['employee_id', 'first_name', 'last_name', 'department', 'job_title']]
+    return pd.concat([identity, costs], axis=1)
+
+
+def project_years(costs: pd.DataFrame, workforce: pd.DataFrame, start_year: int,
+                  assumptions: ProjectionAssumptions) -> List[dict]:
+    """Roll the base-year costs forward for ``assumptions.years`` years.
+
+    Raises compound on every salary. Headcount growth adds hires at the
+    average cost of the current workforce.
+    """
+    rows = []
+    headcount = len(workforce)
+    for offset in range(max(assumptions.years, 1)):
+        raise_factor = (1 + assumptions.raise_rate) ** offset
+        growth_factor = (1 + assumptions.headcount_growth_rate) ** offset
+        year_costs = compute_costs(
+            workforce['annual_salary'] * raise_factor,
+            workforce['is_401k_enrolled'],
+            costs['benefits'],
+        ).sum() * growth_factor
+        row = {'year': start_year + offset, 'headcount': round(headcount * growth_factor)}
+        row.update({column: float(year_costs[column]) for column in COST_COLUMNS})
+        rows.append(row)
+    return rows
+
+
+def summarize(costs: pd.DataFrame) -> dict:
+    """Column totals of a cost frame as plain floats."""
+    totals = costs[COST_COLUMNS].sum()
+    return {column: float(totals[column]) for column in COST_COLUMNS}
@@ -0,0 +1,231 @@
+"""Resolve employees' current compensation with a per-request cache.
+
+An employee's current compensation is the most recent record (by
+``effective_date``) that has started and not ended. Lookups are cached on
+``flask.g``, so every ``Employee`` property and helper that needs it during
+one request or job shares a single query, and ``resolve_many`` loads a whole
+list of employees with one windowed query.
+
+``compensation_totals`` aggregates base, bonus and benefit amounts for a
+whole population of employees in a fixed number of queries.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Union
+
+from flask import g, has_app_context
+from sqlalchemy import Select, case, event, func, inspect, or_, select
+
+from app import db
+from models.compensation import EmployeeCompensation, EmployeeIncentive
+
+# Either explicit employee ids or a SELECT returning them
+EmployeeFilter = Union[Select, Iterable[int], None]
+
+# Keeps IN (...) lists well below SQLite's bind parameter limit
+RESOLVE_BATCH_SIZE = 500
+
+_CACHE_ATTR = '_compensation_cache'
+
+
+def _cache() -> Optional[dict]:
+    """Return the request-scoped cache, or ``None`` outside an app context."""
+    if not has_app_context():
+        return None
+    cache = g.get(_CACHE_ATTR)
+    if cache is None:
+        cache = {}
+        setattr(g, _CACHE_ATTR, cache)
+    return cache
+
+
+def current_compensation_subquery(as_of: Optional[date] = None, employee_ids: EmployeeFilter = None):
+    """Subquery with each employee's current compensation (``rank == 1``) columns.
+
+    Join it on ``employee_id`` with ``rank == 1`` to pick one row per employee.
+    Records that start after ``as_of`` or ended before it are not ranked.
+    ``employee_ids`` limits the window to those employees.
+    """
+    as_of = as_of or datetime.now().date()
+    query = (
+        select(
+            EmployeeCompensation.id,
+            EmployeeCompensation.employee_id,
+            EmployeeCompensation.base_salary,
+            EmployeeCompensation.salary_type,
+            EmployeeCompensation.hours_per_week,
+            EmployeeCompensation.salary_structure_id,
+            func.row_number().over(
+                partition_by=EmployeeCompensation.employee_id,
+                order_by=(EmployeeCompensation.effective_date.desc(), EmployeeCompensation.id.desc()),
+            ).label('rank'),
+        )
+        .where(
+            EmployeeCompensation.effective_date <= as_of,
+            or_(EmployeeCompensation.end_date.is_(None), EmployeeCompensation.end_date >= as_of),
+        )
+    )
+    return filter_employees(query, EmployeeCompensation.employee_id, employee_ids).subquery()
+
+
+def _load(employee_ids: Iterable[int], as_of: date) -> Dict[int, EmployeeCompensation]:
+    employee_ids = list(employee_ids)
+    loaded: Dict[int, EmployeeCompensation] = {}
+
+    for start in range(0, len(employee_ids), RESOLVE_BATCH_SIZE):
+        current = current_compensation_subquery(as_of, employee_ids[start:start + RESOLVE_BATCH_SIZE])
+        rows = db.session.execute(
+            select(EmployeeCompensation)
+            .join(current, current.c.id == EmployeeCompensation.id)
+            .where(current.c.rank == 1)
+        ).scalars()
+        for compensation in rows:
+            loaded[compensation.employee_id] = compensation
+
+    return loaded
+
+
+def _is_cached(cache: dict, key) -> bool:
+    # Instances expired by a commit would otherwise be refreshed one by one
+    if key not in cache:
+        return False
+    compensation = cache[key]
+    return compensation is None or not inspect(compensation).expired
+
+
+def resolve_many(employee_ids: Iterable[int], as_of: Optional[date] = None) -> Dict[int, EmployeeCompensation]:
+    """Return the current compensation for each of ``employee_ids``.
+
+    Employees without a current compensation are left out of the result.
+    Only employees not already cached for this request are queried.
+    """
+    as_of = as_of or datetime.now().date()
+    employee_ids = {employee_id for employee_id in employee_ids if employee_id}
+    cache = _cache()
+
+    if cache is None:
+        return _load(employee_ids, as_of)
+
+    missing = [employee_id for employee_id in employee_ids if not _is_cached(cache, (employee_id, as_of))]
+    if missing:
+        loaded = _load(missing, as_of)
+        for employee_id in missing:
+            cache[(employee_id, as_of)] = loaded.get(employee_id)
+
+    resolved = {}
+    for employee_id in employee_ids:
+        compensation = cache[(employee_id, as_of)]
+        if compensation is not None:
+            resolved[employee_id] = compensation
+    return resolved
+
+
+def resolve(employee_id: int, as_of: Optional[date] = None) -> Optional[EmployeeCompensation]:
+    """Return one employee's current compensation, or ``None``."""
+    return resolve_many([employee_id], as_of).get(employee_id)
+
+
+def invalidate(employee_id: Optional[int] = None) -> None:
+    """Drop cached compensation for one employee, or for everyone."""
+    cache = _cache()
+    if not cache:
+        return
+    if employee_id is None:
+        cache.clear()
+        return
+    for key in [key for key in cache if key[0] == employee_id]:
+        del cache[key]
+
+
+def annual_salary(compensation: Optional[EmployeeCompensation]) -> float:
+    """Annualize a compensation record, treating hourly wages as 52 weeks."""
+    if not compensation:
+        return 0.0
+    if compensation.salary_type == 'Annual':
+        return compensation.base_salary
+    hours = compensation.hours_per_week or 40.0
+    return compensation.base_salary * hours * 52
+
+
+def annual_salary_expression(columns=EmployeeCompensation):
+    """SQL counterpart of :func:`annual_salary` for use in aggregates.
+
+    ``columns`` is the model or a subquery's ``.c``, such as that of
+    :func:`current_compensation_subquery`.
+    """
+    return case(
+        (columns.salary_type == 'Annual', columns.base_salary),
+        else_=columns.base_salary * func.coalesce(columns.hours_per_week, 40.0) * 52,
+    )
+
+
+@dataclass
+class CompensationTotals:
+    """Annual base, bonus and employer benefit totals for one employee."""
+    base: float = 0.0
+    bonus: float = 0.0
+    benefits: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return self.base + self.bonus + self.benefits
+
+
+def filter_employees(query, column, employee_ids: EmployeeFilter):
+    if employee_ids is None:
+        return query
+    if not isinstance(employee_ids, Select):
+        employee_ids = list(employee_ids)
+    return query.where(column.in_(employee_ids))
+
+
+def base_totals(employee_ids: EmployeeFilter = None, as_of: Optional[date] = None) -> Dict[int, float]:
+    """Annualized base pay of each employee's current compensation record."""
+    current = current_compensation_subquery(as_of)
+    query = select(current.c.employee_id, annual_salary_expression(current.c)).where(current.c.rank == 1)
+    query = filter_employees(query, current.c.employee_id, employee_ids)
+    return {employee_id: total or 0.0 for employee_id, total in db.session.execute(query)}
+
+
+def bonus_totals(employee_ids: EmployeeFilter = None) -> Dict[int, float]:
+    """Sum of incentives awarded, per employee."""
+    query = (
+        select(EmployeeIncentive.employee_id, func.sum(EmployeeIncentive.amount))
+        .group_by(EmployeeIncentive.employee_id)
+    )
+    query = filter_employees(query, EmployeeIncentive.employee_id, employee_ids)
+    return {employee_id: total or 0.0 for employee_id, total in db.session.execute(query)}
+
+
+def compensation_totals(employee_ids: EmployeeFilter = None,
+                        as_of: Optional[date] = None) -> Dict[int, CompensationTotals]:
+    """Base, bonus and benefit totals keyed by employee id.
+
+    Benefits are the annual employer cost from
+    :func:`utils.benefit_costs.employer_benefit_costs`, with percentage plans
+    priced against the base totals. Runs three queries regardless of how
+    many employees match. ``employee_ids`` may be a SELECT of ids so the
+    filter stays in SQL.
+    """
+    from utils.benefit_costs import employer_benefit_costs
+
+    if employee_ids is not None and not isinstance(employee_ids, Select):
+        employee_ids = list(employee_ids)
+    totals: Dict[int, CompensationTotals] = {}
+    salaries = base_totals(employee_ids, as_of)
+    for employee_id, amount in salaries.items():
+        totals.setdefault(employee_id, CompensationTotals()).base = amount
+    for employee_id, amount in bonus_totals(employee_ids).items():
+        totals.setdefault(employee_id, CompensationTotals()).bonus = amount
+    for employee_id, amount in employer_benefit_costs(salaries, employee_ids, as_of).per_employee.items():
+        totals.setdefault(employee_id, CompensationTotals()).benefits = amount
+    return totals
+
+
+@event.listens_for(EmployeeCompensation, 'after_insert')
+@event.listens_for(EmployeeCompensation, 'after_update')
+@event.listens_for(EmployeeCompensation, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate(target.employee_id)
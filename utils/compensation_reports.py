@@ -0,0 +1,147 @@
+"""Batch generation of yearly per-employee compensation reports."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, select, update
+
+from app import db
+from models import (
+    BackgroundJob,
+    ComponentType,
+    CompensationReport,
+    Employee,
+    PayPeriod,
+    Payroll,
+    PayrollEntry,
+    SalaryComponent,
+)
+from utils import compensation as compensation_resolver
+from utils.benefit_costs import employer_benefit_costs
+from utils.date_ranges import DateRange
+from utils.jobs import update_progress
+
+# Employees handled per set of aggregate queries and bulk writes
+REPORT_BATCH_SIZE = 500
+
+REPORT_COMPONENT_TYPES = (ComponentType.BONUS, ComponentType.ALLOWANCE, ComponentType.DEDUCTION)
+
+
+def payroll_component_totals(employee_ids: Iterable[int], year: int) -> Dict[int, Dict[str, float]]:
+    """Sum bonus, allowance and deduction payroll entries paid in ``year``.
+
+    Payroll entries record the component name, so they are matched to the
+    salary component type through the component catalogue. Returns
+    ``{employee_id: {component_type: total}}`` from a single grouped query.
+    """
+    component_types = (
+        select(SalaryComponent.name, SalaryComponent.component_type)
+        .where(SalaryComponent.component_type.in_(REPORT_COMPONENT_TYPES))
+        .distinct()
+        .subquery()
+    )
+
+    rows = db.session.execute(
+        select(Payroll.employee_id, component_types.c.component_type, func.sum(PayrollEntry.amount))
+        .join(Payroll, PayrollEntry.payroll_id == Payroll.id)
+        .join(PayPeriod, Payroll.pay_period_id == PayPeriod.id)
+        .join(component_types, component_types.c.name == PayrollEntry.component_name)
+        .where(
+            Payroll.employee_id.in_(list(employee_ids)),
+            DateRange.for_year(year).filter(PayPeriod.payment_date),
+        )
+        .group_by(Payroll.employee_id, component_types.c.component_type)
+    )
+
+    totals: Dict[int, Dict[str, float]] = {}
+    for employee_id, component_type, amount in rows:
+        totals.setdefault(employee_id, {})[component_type] = amount or 0.0
+    return totals
+
+
+def _write_reports(employee_ids: List[int], year: int, created_by: Optional[int]) -> int:
+    compensations = compensation_resolver.resolve_many(employee_ids)
+    components = payroll_component_totals(employee_ids, year)
+    salaries = {
+        employee_id: compensation_resolver.annual_salary(compensation)
+        for employee_id, compensation in compensations.items()
+    }
+    benefits = employer_benefit_costs(salaries, employee_ids)
+    existing = dict(
+        db.session.execute(
+            select(CompensationReport.employee_id, CompensationReport.id)
+            .where(CompensationReport.year == year, CompensationReport.employee_id.in_(employee_ids))
+        ).all()
+    )
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for employee_id in employee_ids:
+        base_salary = salaries.get(employee_id, 0.0)
+        totals = components.get(employee_id, {})
+        total_bonus = totals.get(ComponentType.BONUS, 0.0)
+        total_allowances = totals.get(ComponentType.ALLOWANCE, 0.0)
+        benefits_cost = benefits.get(employee_id)
+
+        values = {
+            'base_salary': base_salary,
+            'total_bonus': total_bonus,
+            'total_allowances': total_allowances,
+            'total_deductions': totals.get(ComponentType.DEDUCTION, 0.0),
+            'employer_benefit_contributions': benefits_cost,
+            'total_compensation': base_salary + total_bonus + total_allowances + benefits_cost,
+            'is_visible_to_employee': True,
+            'created_by': created_by,
+            'created_at': now,
+            'updated_at': now,
+        }
+        if employee_id in existing:
+            updates.append({'id': existing[employee_id], **values})
+        else:
+            inserts.append({'employee_id': employee_id, 'year': year, 'generated_date': now, **values})
+
+    if inserts:
+        db.session.execute(insert(CompensationReport), inserts)
+    if updates:
+        db.session.execute(update(CompensationReport), updates)
+    return len(employee_ids)
+
+
+def generate_compensation_reports(year: int, department_id: Optional[int] = None, created_by: Optional[int] = None,
+                                  progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Create or refresh the ``year`` report of every active employee.
+
+    Employees are handled in batches: each batch costs a fixed number of
+    aggregate queries and two bulk writes, and is committed before
+    ``progress(processed, total)`` is called.
+
+    Returns:
+        int: Number of reports generated or updated.
+    """
+    query = select(Employee.id).where(Employee.status == 'Active').order_by(Employee.id)
+    if department_id:
+        query = query.where(Employee.department_id == department_id)
+    employee_ids = db.session.scalars(query).all()
+
+    processed = 0
+    for start in range(0, len(employee_ids), REPORT_BATCH_SIZE):
+        batch = employee_ids[start:start + REPORT_BATCH_SIZE]
+        processed += _write_reports(batch, year, created_by)
+        db.session.commit()
+        if progress:
+            progress(processed, len(employee_ids))
+    return processed
+
+
+def run_compensation_report_job(job: BackgroundJob) -> dict:
+    """Background job entry point; parameters come from ``job.params``."""
+    params = job.params or {}
+    year = params['year']
+    generated = generate_compensation_reports(
+        year,
+        department_id=params.get('department_id'),
+        created_by=job.created_by,
+        progress=lambda processed, total: update_progress(job, processed=processed, total=total),
+    )
+    return {'generated': generated, 'year': year}
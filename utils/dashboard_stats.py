@@ -0,0 +1,126 @@
+"""Dashboard statistics computed in bulk and cached per role scope.
+
+Counts are bundled into one statement of scalar subqueries and today's
+attendance is read from the daily attendance rollups, so a dashboard load
+costs at most two queries, and none while the cached figures are fresh.
+
+Figures are cached per scope (the organisation, a manager's reporting
+subtree, or one employee) for ``DASHBOARD_STATS_TTL`` seconds. Clock-in/out,
+attendance edits and leave actions call :func:`invalidate_dashboard_stats`
+so the user who made the change sees it straight away; the TTL bounds how
+stale other processes' caches can get.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from models import AttendanceDaily, Department, Employee, LeaveBalance, LeaveRequest
+from utils.attendance_rollups import daily_status_counts
+from utils.date_ranges import DateRange
+from utils.org_hierarchy import manager_scope
+
+# Attendance statuses counted on the dashboard
+ATTENDANCE_STATUSES = ('Present', 'Absent', 'Late')
+
+_lock = threading.Lock()
+# Scope key -> (expiry on the monotonic clock, day computed for, figures)
+_cache: Dict[tuple, Tuple[float, date, dict]] = {}
+_generation = 0
+
+
+def organisation_stats(today: date) -> dict:
+    """Active employees, departments, pending leave and today's attendance."""
+    counts = db.session.execute(select(
+        select(func.count(Employee.id)).where(Employee.status == 'Active').scalar_subquery().label('employees'),
+        select(func.count(Department.id)).scalar_subquery().label('departments'),
+        select(func.count(LeaveRequest.id)).where(LeaveRequest.status == 'Pending')
+        .scalar_subquery().label('pending_leaves'),
+    )).one()
+    stats = dict(counts._mapping)
+    stats.update(attendance_counts(today))
+    return stats
+
+
+def attendance_counts(today: date) -> dict:
+    """Employees present, absent and late today, from the daily attendance rollup."""
+    counts = dict.fromkeys((status.lower() for status in ATTENDANCE_STATUSES), 0)
+    counts.update(daily_status_counts(DateRange.inclusive(today, today)).get(today, {}))
+    return counts
+
+
+def manager_stats(manager_id: int) -> dict:
+    """Pending leave requests across a manager's reporting subtree."""
+    pending = db.session.scalar(
+        select(func.count(LeaveRequest.id))
+        .where(LeaveRequest.status == 'Pending', LeaveRequest.employee_id.in_(manager_scope(manager_id)))
+    )
+    return {'pending_leaves': pending}
+
+
+def employee_stats(employee_id: int, today: date) -> dict:
+    """An employee's remaining leave (in days) and today's attendance status."""
+    row = db.session.execute(select(
+        select(func.coalesce(func.sum(LeaveBalance.total_hours - func.coalesce(LeaveBalance.used_hours, 0)), 0))
+        .where(LeaveBalance.employee_id == employee_id).scalar_subquery().label('remaining_hours'),
+        select(AttendanceDaily.status).where(AttendanceDaily.employee_id == employee_id, AttendanceDaily.date == today)
+        .scalar_subquery().label('attendance_today'),
+    )).one()
+    return {
+        'leave_balance': row.remaining_hours / 8.0,
+        'attendance_today': row.attendance_today or 'Not Recorded',
+    }
+
+
+def _cached(key: tuple, today: date, compute) -> dict:
+    ttl = current_app.config.get('DASHBOARD_STATS_TTL', 30)
+    if ttl <= 0:
+        return compute()
+    entry = _cache.get(key)
+    if entry is not None and entry[1] == today and time.monotonic() < entry[0]:
+        return entry[2]
+
+    generation = _generation
+    stats = compute()
+    with _lock:
+        # Figures read before an invalidation are returned but not kept
+        if generation == _generation:
+            _cache[key] = (time.monotonic() + ttl, today, stats)
+    return stats
+
+
+def dashboard_stats(role_name: str, employee_id: Optional[int] = None) -> dict:
+    """Statistics shown on the dashboard for a user's role.
+
+    Everyone sees organisation-wide headcounts; Admin, HR and Manager see
+    today's attendance and pending leave (a manager only for their reporting
+    subtree); employees see their own leave balance and attendance.
+    """
+    today = datetime.now().date()
+    stats = dict(_cached(('organisation',), today, lambda: organisation_stats(today)))
+
+    if role_name not in ('Admin', 'HR', 'Manager'):
+        for key in ('pending_leaves', *(status.lower() for status in ATTENDANCE_STATUSES)):
+            stats.pop(key)
+    if role_name == 'Manager':
+        if employee_id is None:
+            stats['pending_leaves'] = 0
+        else:
+            stats.update(_cached(('manager', employee_id), today, lambda: manager_stats(employee_id)))
+    if role_name == 'Employee' and employee_id is not None:
+        stats.update(_cached(('employee', employee_id), today, lambda: employee_stats(employee_id, today)))
+    return stats
+
+
+def invalidate_dashboard_stats() -> None:
+    """Drop every cached scope; attendance and leave changes affect several."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
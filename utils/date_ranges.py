@@ -0,0 +1,86 @@
+"""Month, year and period filters as index-friendly SQL predicates.
+
+A filter such as ``extract('month', Attendance.date) == 5`` wraps the
+column in a function, so the database has to evaluate it for every row and
+cannot use an index on the column. :class:`DateRange` expresses the same
+filter as a half-open range, ``column >= start AND column < end``, which an
+index on the column can answer directly.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import DateTime, and_
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """Days from ``start`` up to, but not including, ``end``."""
+    start: date
+    end: date
+
+    @classmethod
+    def for_month(cls, year: int, month: int) -> 'DateRange':
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return cls(start, end)
+
+    @classmethod
+    def month_of(cls, day: date) -> 'DateRange':
+        return cls.for_month(day.year, day.month)
+
+    @classmethod
+    def for_year(cls, year: int) -> 'DateRange':
+        return cls(date(year, 1, 1), date(year + 1, 1, 1))
+
+    @classmethod
+    def inclusive(cls, first: date, last: date) -> 'DateRange':
+        """The days ``first`` through ``last``, both included."""
+        return cls(first, last + timedelta(days=1))
+
+    @classmethod
+    def for_period(cls, period) -> 'DateRange':
+        """The days of a pay period (anything with ``start_date``/``end_date``)."""
+        return cls.inclusive(period.start_date, period.end_date)
+
+    @classmethod
+    def parse_month(cls, value: Optional[str]) -> Optional['DateRange']:
+        """The month of a ``YYYY-MM`` string, or ``None`` if it isn't one."""
+        try:
+            year, month = (int(part) for part in (value or '').split('-'))
+            return cls.for_month(year, month)
+        except ValueError:
+            return None
+
+    @property
+    def last(self) -> date:
+        """The last day in the range."""
+        return self.end - timedelta(days=1)
+
+    def __contains__(self, day: date) -> bool:
+        return self.start <= day < self.end
+
+    def __len__(self) -> int:
+        return (self.end - self.start).days
+
+    def days(self) -> Iterator[date]:
+        for offset in range(len(self)):
+            yield self.start + timedelta(days=offset)
+
+    def bounds_for(self, column) -> Tuple[date, date]:
+        """Range bounds typed for ``column``: midnight datetimes for DateTime columns."""
+        if isinstance(column.type, DateTime):
+            return datetime.combine(self.start, time.min), datetime.combine(self.end, time.min)
+        return self.start, self.end
+
+    def filter(self, column):
+        """``column >= start AND column < end``."""
+        start, end = self.bounds_for(column)
+        return and_(column >= start, column < end)
+
+    def overlaps(self, start_column, end_column):
+        """Rows spanning ``start_column``..``end_column`` (inclusive) that share a day with the range."""
+        start, end = self.bounds_for(start_column)
+        return and_(start_column < end, end_column >= start)
@@ -0,0 +1,188 @@
+"""File imports run as background jobs.
+
+The upload is saved to ``UPLOAD_FOLDER`` during the request and a
+:class:`BackgroundJob` is queued; the import itself streams the saved file
+on a background worker, reports rows read and failed as job progress and
+stores counts and row errors as the job result.
+"""
+from __future__ import annotations
+
+import os
+import uuid
+from typing import Callable, Dict, Optional
+
+from flask import current_app
+from openpyxl import load_workbook
+from werkzeug.utils import secure_filename
+
+from app import db
+from models import BackgroundJob
+from utils.importers import (
+    apply_bulk_update_diff,
+    bulk_update_diff_report,
+    bulk_update_employees,
+    diff_employee_bulk_update,
+    import_budget_items,
+    import_employees,
+    iter_import_frames,
+    load_bulk_update_diff,
+    save_bulk_update_diff,
+)
+from utils.jobs import create_job, start_job, update_progress
+
+IMPORT_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+
+# Row errors kept in a job result; the total is always reported
+MAX_REPORTED_ERRORS = 1000
+# Changed cells shown on the page after a dry run; the download has all of them
+PREVIEW_CHANGES = 100
+
+
+def upload_extension(filename: Optional[str]) -> Optional[str]:
+    """Lower-case extension of an importable file name, or ``None``."""
+    if not filename or '.' not in filename:
+        return None
+    extension = filename.rsplit('.', 1)[1].lower()
+    return extension if extension in IMPORT_EXTENSIONS else None
+
+
+def save_upload(file, upload_folder: Optional[str] = None) -> str:
+    """Save an upload under a unique name and return its path."""
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_folder, exist_ok=True)
+    path = os.path.join(upload_folder, f"import-{uuid.uuid4().hex}-{secure_filename(file.filename)}")
+    file.save(path)
+    return path
+
+
+def count_data_rows(path: str, extension: str) -> int:
+    """Number of data rows in a saved upload, without loading it."""
+    if extension == 'csv':
+        with open(path, 'rb') as handle:
+            return max(sum(1 for line in handle if line.strip()) - 1, 0)
+    if extension == 'xlsx':
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    return 0
+
+
+def start_import_job(job_type: str, file, created_by: Optional[int] = None,
+                     params: Optional[dict] = None) -> BackgroundJob:
+    """Save ``file`` and queue the importer registered for ``job_type``."""
+    extension = upload_extension(file.filename)
+    path = save_upload(file)
+    job = create_job(
+        job_type,
+        created_by=created_by,
+        params={'path': path, 'extension': extension, 'filename': file.filename, **(params or {})},
+        total=count_data_rows(path, extension),
+    )
+    return start_job(job, IMPORT_RUNNERS[job_type])
+
+
+def _progress(job: BackgroundJob) -> Callable[[int, int], None]:
+    def report(rows_read: int, error_count: int) -> None:
+        update_progress(job, processed=rows_read, failed=error_count, total=max(job.total, rows_read))
+    return report
+
+
+def _error_result(errors) -> dict:
+    return {'errors': errors[:MAX_REPORTED_ERRORS], 'errors_truncated': len(errors) > MAX_REPORTED_ERRORS}
+
+
+def _run_import(job: BackgroundJob, run: Callable) -> dict:
+    params = job.params or {}
+    try:
+        return run(iter_import_frames(params['path'], params['extension']), params)
+    finally:
+        if os.path.exists(params['path']):
+            os.remove(params['path'])
+
+
+def run_employee_import_job(job: BackgroundJob) -> dict:
+    def run(frames, params):
+        result = import_employees(frames, progress=_progress(job))
+        return {'imported': result.success_count, 'error_count': result.error_count, **_error_result(result.errors)}
+    return _run_import(job, run)
+
+
+def run_bulk_update_job(job: BackgroundJob) -> dict:
+    def run(frames, params):
+        result = bulk_update_employees(frames, progress=_progress(job))
+        if not result['success']:
+            raise ValueError(result['message'])
+        return {
+            'updated': result['updated'],
+            'error_count': result['errors'],
+            **_error_result(result['error_messages']),
+        }
+    return _run_import(job, run)
+
+
+def run_budget_item_import_job(job: BackgroundJob) -> dict:
+    def run(frames, params):
+        result = import_budget_items(params['budget_id'], frames, progress=_progress(job))
+        return {'imported': result.success_count, 'error_count': result.error_count, **_error_result(result.errors)}
+    return _run_import(job, run)
+
+
+def bulk_update_diff_path(job_id: int) -> str:
+    """Where the diff of a bulk update dry run is kept until it is applied."""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], f'bulk-update-diff-{job_id}.csv')
+
+
+def run_bulk_update_preview_job(job: BackgroundJob) -> dict:
+    def run(frames, params):
+        diff = diff_employee_bulk_update(frames, progress=_progress(job))
+        save_bulk_update_diff(diff.changes, bulk_update_diff_path(job.id))
+        return {
+            'employees_changed': diff.employees_changed,
+            'cells_changed': len(diff.changes),
+            'preview': bulk_update_diff_report(diff.changes.head(PREVIEW_CHANGES)).to_dict('records'),
+            'unknown_keys': diff.unknown_keys[:MAX_REPORTED_ERRORS],
+            'unknown_columns': diff.unknown_columns,
+            'error_count': len(diff.errors),
+            **_error_result(diff.errors),
+        }
+    return _run_import(job, run)
+
+
+def run_bulk_update_apply_job(job: BackgroundJob) -> dict:
+    path = bulk_update_diff_path(job.params['preview_job_id'])
+    changes = load_bulk_update_diff(path)
+    update_progress(job, total=len(changes))
+    result = apply_bulk_update_diff(changes)
+    # A diff is applied once; later edits need a fresh dry run
+    os.remove(path)
+    update_progress(job, processed=result.rows_read, failed=result.error_count, commit=False)
+    return {'updated': result.success_count, 'error_count': result.error_count, **_error_result(result.errors)}
+
+
+def start_bulk_update_apply_job(preview_job: BackgroundJob, created_by: Optional[int] = None) -> BackgroundJob:
+    """Queue writing the changes found by a completed bulk update dry run."""
+    job = create_job('employee_bulk_update_apply', created_by=created_by,
+                     params={'preview_job_id': preview_job.id, 'filename': (preview_job.params or {}).get('filename')})
+    return start_job(job, run_bulk_update_apply_job)
+
+
+IMPORT_RUNNERS: Dict[str, Callable[[BackgroundJob], dict]] = {
+    'employee_import': run_employee_import_job,
+    'employee_bulk_update': run_bulk_update_job,
+    'employee_bulk_update_preview': run_bulk_update_preview_job,
+    'budget_item_import': run_budget_item_import_job,
+}
+
+
+# Jobs shown on the bulk employee update page
+BULK_UPDATE_JOB_TYPES = ('employee_bulk_update', 'employee_bulk_update_preview', 'employee_bulk_update_apply')
+
+
+def get_import_job(job_id: Optional[int], *job_types: str) -> Optional[BackgroundJob]:
+    """Load an import job of one of ``job_types`` for display, or ``None``."""
+    if not job_id:
+        return None
+    job = db.session.get(BackgroundJob, job_id)
+    return job if job is not None and job.job_type in job_types else None
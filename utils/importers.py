@@ -1,21 +1,458 @@
 """Utility functions for importing data from files."""
+import logging
 import os
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from io import BytesIO
-from datetime import datetime
+from datetime import date, datetime, time
+from typing import List, Tuple
+from openpyxl import load_workbook
+from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
+from sqlalchemy import insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
-from flask import flash
+from flask import current_app, flash
 from app import db
-from models import Employee, Department, User, Role
+from models import BudgetItem, Employee, Department, User, Role
 from utils.helpers import allowed_file
+from utils.sequences import allocate_block
 
-def process_employee_import(file, upload_folder):
+logger = logging.getLogger(__name__)
+
+# Accepted spellings of a true boolean cell
+TRUE_VALUES = {'yes', 'true', '1', 'y'}
+
+EMPLOYEE_REQUIRED_FIELDS = ['first_name', 'last_name', 'email', 'hire_date', 'job_title']
+EMPLOYEE_TEXT_FIELDS = [
+    'employee_id', 'first_name', 'last_name', 'email', 'phone', 'address', 'department', 'job_title',
+    'manager_email', 'manager_employee_id', 'level', 'education_level', 'employment_type',
+]
+
+# Rows written per transaction
+IMPORT_BATCH_SIZE = 1000
+# Values per IN (...) lookup, well below SQLite's bind parameter limit
+LOOKUP_BATCH_SIZE = 500
+# Employee fields a bulk update file can change, and the columns it may have
+BULK_UPDATE_FIELDS = ['is_manager', 'department_id', 'manager_id']
+BULK_UPDATE_COLUMNS = ['employee_id', 'department_id', 'department_name', 'manager_id', 'manager_employee_id',
+                       'is_manager']
+# Columns of a bulk update diff: one line per changed cell
+DIFF_COLUMNS = ['row', 'employee_id', 'field', 'old_value', 'new_value']
+# Threads hashing default passwords for new user accounts
+PASSWORD_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import: imported rows plus per-row error messages."""
+    success_count: int = 0
+    error_count: int = 0
+    rows_read: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def fail(self, row_number: int, message: str) -> None:
+        self.errors.append(f"Row {row_number}: {message}")
+        self.error_count += 1
+
+    def warn(self, row_number: int, message: str) -> None:
+        self.errors.append(f"Row {row_number}: {message}")
+
+    def checkpoint(self) -> Tuple[int, int]:
+        """Mark the messages recorded so far, for :meth:`discard_since`."""
+        return len(self.errors), self.error_count
+
+    def discard_since(self, checkpoint: Tuple[int, int]) -> None:
+        """Forget the messages recorded after ``checkpoint``, e.g. for rolled-back rows."""
+        self.errors[checkpoint[0]:] = []
+        self.error_count = checkpoint[1]
+
+
+def normalize_columns(df):
+    """Strip, lowercase and underscore column names in place."""
+    df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+    return df
+
+
+def _text_column(df, column):
+    if column not in df.columns:
+        return pd.Series(None, index=df.index, dtype='object')
+    values = df[column].astype('string').str.strip()
+    values = values.mask(values == '')
+    return values.astype('object').where(values.notna(), None)
+
+
+def _date_column(df, column):
+    if column not in df.columns:
+        return pd.Series(pd.NaT, index=df.index), pd.Series(False, index=df.index)
+    raw = _text_column(df, column)
+    parsed = pd.to_datetime(raw, errors='coerce', format='mixed')
+    return parsed, raw.notna() & parsed.isna()
+
+
+def _as_dates(parsed):
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def _lookup(columns, key_column, values):
+    """Map ``key_column`` values to rows of ``columns`` with batched IN queries."""
+    values = list({value for value in values if value is not None})
+    found = {}
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        batch = values[start:start + LOOKUP_BATCH_SIZE]
+        for row in db.session.execute(select(key_column, *columns).where(key_column.in_(batch))):
+            found[row[0]] = row[1:] if len(columns) > 1 else row[1]
+    return found
+
+
+def prepare_employee_rows(df, result):
+    """Validate and coerce an employee import frame column by column.
+
+    Returns a frame of clean values indexed by spreadsheet row number (the
+    frame's positional index plus the header line); rows that fail
+    validation are reported on ``result`` and dropped.
+    """
+    df = df.set_axis(df.index + 2)
+    rows = pd.DataFrame({column: _text_column(df, column) for column in EMPLOYEE_TEXT_FIELDS})
+
+    hire_dates, bad_hire_dates = _date_column(df, 'hire_date')
+    rows['hire_date'] = _as_dates(hire_dates)
+    # Unparseable birth dates are ignored rather than rejected
+    rows['birth_date'] = _as_dates(_date_column(df, 'birth_date')[0])
+    rows['is_manager'] = _text_column(df, 'is_manager').str.lower().isin(TRUE_VALUES)
+
+    missing = rows[['first_name', 'last_name', 'email']].isna().any(axis=1) | _text_column(df, 'hire_date').isna()
+    duplicate_email = rows['email'].notna() & rows['email'].duplicated()
+    invalid = missing | bad_hire_dates | duplicate_email
+
+    for row_number in rows.index[missing]:
+        result.fail(row_number, "Missing mandatory fields")
+    for row_number in rows.index[bad_hire_dates & ~missing]:
+        result.fail(row_number, "Invalid date format for hire_date. Use YYYY-MM-DD")
+    for row_number in rows.index[duplicate_email & ~missing & ~bad_hire_dates]:
+        result.fail(row_number, f"Duplicate email '{rows.at[row_number, 'email']}' in file")
+
+    return rows[~invalid]
+
+
+def _employee_id_seed(year):
+    prefix = f"EMP-{year}-"
+
+    def seed():
+        existing = db.session.scalars(
+            select(Employee.employee_id).where(Employee.employee_id.like(f"{prefix}%"))
+        ).all()
+        suffixes = [int(value[len(prefix):]) for value in existing if value[len(prefix):].isdigit()]
+        return max(suffixes, default=0) + 1
+
+    return seed
+
+
+def allocate_employee_ids(count):
+    """Reserve ``count`` unused ``EMP-YYYY-NNN`` identifiers."""
+    year = datetime.now().year
+    allocated = []
+    while len(allocated) < count:
+        block = allocate_block(f"employee_id:{year}", count - len(allocated), initial=_employee_id_seed(year))
+        candidates = [f"EMP-{year}-{number:03d}" for number in block]
+        # Skip identifiers that were entered by hand
+        taken = set(_lookup([Employee.id], Employee.employee_id, candidates))
+        allocated.extend(candidate for candidate in candidates if candidate not in taken)
+    return allocated
+
+
+def _unique_usernames(emails):
+    """Derive a free username from each email, as the signup flow does."""
+    bases = {email: email.split('@')[0] for email in emails}
+    taken = set(_lookup([User.id], User.username, bases.values()))
+    for base in {base for base in bases.values() if base in taken}:
+        taken.update(db.session.scalars(select(User.username).where(User.username.like(f"{base}%"))))
+
+    usernames = {}
+    for email, base in bases.items():
+        username, count = base, 0
+        while username in taken:
+            count += 1
+            username = f"{base}{count}"
+        taken.add(username)
+        usernames[email] = username
+    return usernames
+
+
+def hash_passwords(passwords):
+    """Hash many passwords; scrypt releases the GIL, so threads run in parallel."""
+    passwords = list(passwords)
+    if len(passwords) < 2:
+        return [generate_password_hash(password) for password in passwords]
+    with ThreadPoolExecutor(max_workers=min(PASSWORD_HASH_WORKERS, len(passwords))) as pool:
+        return list(pool.map(generate_password_hash, passwords))
+
+
+def _employee_values(row, department_id):
+    return {
+        'first_name': row.first_name,
+        'last_name': row.last_name,
+        'email': row.email,
+        'phone': row.phone,
+        'address': row.address,
+        'department_id': department_id,
+        'job_title': row.job_title,
+        'manager_id': None,
+        'hire_date': row.hire_date,
+        'is_manager': bool(row.is_manager),
+        'level': row.level,
+        'education_level': row.education_level,
+        'birth_date': row.birth_date,
+        'employment_type': row.employment_type,
+    }
+
+
+def _write_employee_batch(rows, result, employee_role_id):
+    """Upsert one batch of prepared rows; returns the row numbers written."""
+    by_code = _lookup([Employee.id], Employee.employee_id, rows['employee_id'])
+    by_email = _lookup([Employee.id], Employee.email, rows['email'])
+    departments = _lookup([Department.id], Department.name, rows['department'])
+
+    updates, new_rows = [], []
+    for row in rows.itertuples():
+        existing_id = by_code.get(row.employee_id) or by_email.get(row.email)
+        email_owner = by_email.get(row.email)
+        if existing_id and email_owner and email_owner != existing_id:
+            result.fail(row.Index, f"Email '{row.email}' belongs to another employee")
+            continue
+
+        department_id = departments.get(row.department)
+        if row.department is not None and department_id is None:
+            result.warn(row.Index, f"Department '{row.department}' not found")
+
+        values = _employee_values(row, department_id)
+        if existing_id:
+            updates.append((row.Index, {'id': existing_id, **values}))
+        else:
+            new_rows.append((row.Index, row, values))
+
+    user_emails = _lookup([User.id], User.email, [row.email for _, row, _ in new_rows])
+    for row_number, row, _ in [item for item in new_rows if item[1].email in user_emails]:
+        result.fail(row_number, f"A user account with email '{row.email}' already exists")
+    new_rows = [item for item in new_rows if item[1].email not in user_emails]
+
+    now = datetime.utcnow()
+    employee_ids = allocate_employee_ids(len(new_rows))
+    usernames = _unique_usernames([row.email for _, row, _ in new_rows])
+    password_hashes = hash_passwords(
+        f"{employee_id}{row.last_name[:3].lower()}" for (_, row, _), employee_id in zip(new_rows, employee_ids)
+    )
+    users = [
+        {
+            'username': usernames[row.email],
+            'email': row.email,
+            'role_id': employee_role_id,
+            'password_hash': password_hash,
+            'created_at': now,
+        }
+        for (_, row, _), password_hash in zip(new_rows, password_hashes)
+    ]
+    if users:
+        db.session.execute(insert(User), users)
+    user_ids = _lookup([User.id], User.email, [user['email'] for user in users])
+
+    inserts = [
+        {
+            'employee_id': employee_id,
+            'status': 'Active',
+            'user_id': user_ids[row.email],
+            'created_at': now,
+            'updated_at': now,
+            **values,
+        }
+        for (_, row, values), employee_id in zip(new_rows, employee_ids)
+    ]
+    if inserts:
+        db.session.execute(insert(Employee), inserts)
+    if updates:
+        db.session.execute(update(Employee), [{**values, 'updated_at': now} for _, values in updates])
+
+    return [row_number for row_number, _ in updates] + [row_number for row_number, _, _ in new_rows]
+
+
+def _assign_managers(rows):
+    """Set managers by email or employee ID on rows that were written.
+
+    Returns the rows whose manager is not in the database yet.
+    """
+    by_email = _lookup([Employee.id], Employee.email, rows['manager_email'])
+    by_code = _lookup([Employee.id], Employee.employee_id, rows['manager_employee_id'])
+    employee_ids = _lookup([Employee.id], Employee.email, rows['email'])
+
+    assignments, unresolved = [], []
+    for row in rows.itertuples():
+        manager_id = by_email.get(row.manager_email) or by_code.get(row.manager_employee_id)
+        if manager_id is None:
+            unresolved.append(row.Index)
+        elif row.email in employee_ids:
+            assignments.append({'id': employee_ids[row.email], 'manager_id': manager_id})
+    if assignments:
+        db.session.execute(update(Employee), assignments)
+    return rows.loc[unresolved]
+
+
+def _write_employee_rows(batch, result, employee_role_id):
+    """Write a batch one row per savepoint, failing only the rows that raise."""
+    written = []
+    for row_number in batch.index:
+        checkpoint = result.checkpoint()
+        try:
+            with db.session.begin_nested():
+                written.extend(_write_employee_batch(batch.loc[[row_number]], result, employee_role_id))
+        except SQLAlchemyError as e:
+            # Messages from the rolled-back attempt would describe a row that was not written
+            result.discard_since(checkpoint)
+            result.fail(row_number, str(e.orig) if getattr(e, 'orig', None) else str(e))
+    return written
+
+
+def _import_employee_frame(df, result, employee_role_id):
+    """Import one frame; returns written rows whose manager is still unknown."""
+    rows = prepare_employee_rows(df, result)
+
+    written = []
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = rows.iloc[start:start + IMPORT_BATCH_SIZE]
+        checkpoint = result.checkpoint()
+        try:
+            batch_written = _write_employee_batch(batch, result, employee_role_id)
+            db.session.commit()
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            logger.warning('Bulk write of import rows %s-%s failed, retrying per row: %s',
+                           batch.index[0], batch.index[-1], exc)
+            result.discard_since(checkpoint)
+            batch_written = _write_employee_rows(batch, result, employee_role_id)
+            db.session.commit()
+        written.extend(batch_written)
+        result.success_count += len(batch_written)
+
+    with_manager = rows.loc[written, ['email', 'manager_email', 'manager_employee_id']]
+    with_manager = with_manager[with_manager['manager_email'].notna() | with_manager['manager_employee_id'].notna()]
+    if with_manager.empty:
+        return with_manager
+    unresolved = _assign_managers(with_manager)
+    db.session.commit()
+    return unresolved
+
+
+def import_employees(frames, result=None, progress=None):
+    """Create or update employees from one import frame or an iterable of chunks.
+
+    Each frame is validated column-wise, matched against existing
+    employees, departments and users with batched IN lookups and written
+    with bulk INSERT/UPDATE statements, one transaction per
+    ``IMPORT_BATCH_SIZE`` rows. A batch that fails to write is rolled back
+    and retried one row per savepoint, so only the rows that fail are
+    reported. Frame indexes must be positional across chunks
+    (as ``read_csv(chunksize=...)`` produces) so errors name the right row.
+
+    Managers are assigned after each chunk; those listed in a later chunk
+    are resolved once the last chunk is written. ``progress(rows_read,
+    error_count)`` is called after every chunk.
+    """
+    result = result or ImportResult()
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+
+    employee_role_id = db.session.scalar(select(Role.id).where(Role.name == 'Employee'))
+    pending_managers = []
+    chunks = 0
+    for df in frames:
+        normalize_columns(df)
+        missing_fields = [column for column in EMPLOYEE_REQUIRED_FIELDS if column not in df.columns]
+        if missing_fields:
+            result.errors.append(f"Missing required fields: {', '.join(missing_fields)}")
+            return result
+
+        unresolved = _import_employee_frame(df, result, employee_role_id)
+        chunks += 1
+        if not unresolved.empty:
+            pending_managers.append(unresolved)
+        result.rows_read += len(df)
+        logger.info('Employee import: %d rows read, %d imported, %d errors',
+                    result.rows_read, result.success_count, result.error_count)
+        if progress:
+            progress(result.rows_read, result.error_count)
+
+    if pending_managers and chunks > 1:
+        _assign_managers(pd.concat(pending_managers))
+        db.session.commit()
+
+    return result
+
+
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _iter_xlsx_frames(source, chunk_size):
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [_cell_text(value) or f'column_{position}' for position, value in enumerate(header)]
+
+        chunk, positions = [], []
+        for position, values in enumerate(rows):
+            if all(value is None for value in values):
+                continue
+            cells = [_cell_text(value) for value in values[:len(columns)]]
+            chunk.append(cells + [None] * (len(columns) - len(cells)))
+            positions.append(position)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=columns, index=positions, dtype=object)
+                chunk, positions = [], []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, index=positions, dtype=object)
+    finally:
+        workbook.close()
+
+
+def iter_import_frames(source, extension, chunk_size=None):
+    """Read an upload as text-only frames of at most ``chunk_size`` rows.
+
+    CSV files are parsed in chunks and ``.xlsx`` workbooks through
+    openpyxl's read-only row iterator, so memory stays bounded whatever the
+    file size. Legacy ``.xls`` workbooks can only be read whole.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 5000)
+    if extension == 'csv':
+        with pd.read_csv(source, dtype=str, chunksize=chunk_size) as reader:
+            yield from reader
+    elif extension == 'xlsx':
+        yield from _iter_xlsx_frames(source, chunk_size)
+    else:
+        df = pd.read_excel(source, dtype=str)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def process_employee_import(file, upload_folder, progress=None):
     """Process employee import from CSV or Excel file.
     
+    The file is streamed in ``IMPORT_CHUNK_SIZE`` row chunks, each validated
+    and committed before the next one is read.
+
     Args:
         file: The uploaded file object
         upload_folder: Directory to save the uploaded file temporarily
+        progress: Optional ``progress(rows_read, error_count)`` callback
         
     Returns:
         tuple: (success_count, error_count, errors)
@@ -33,162 +470,11 @@ def process_employee_import(file, upload_folder):
         extension = filename.rsplit('.', 1)[1].lower()
         
         try:
-            # Read file into DataFrame
-            if extension == 'csv':
-                df = pd.read_csv(file_path)
-            else:  # Excel file
-                df = pd.read_excel(file_path)
-                
-            # Clean up column names (remove whitespaces, lowercase)
-            df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
-            
-            # Required fields
-            required_fields = ['first_name', 'last_name', 'email', 'hire_date', 'job_title']
-            
-            # Check if required fields exist
-            missing_fields = [field for field in required_fields if field not in df.columns]
-            if missing_fields:
-                return 0, 0, [f"Missing required fields: {', '.join(missing_fields)}"]
-            
-            # Prepare for import
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            # Process each row
-            for index, row in df.iterrows():
-                try:
-                    # Skip if mandatory fields are empty
-                    if (pd.isna(row['first_name']) or pd.isna(row['last_name']) or
-                            pd.isna(row['email']) or pd.isna(row['hire_date'])):
-                        errors.append(f"Row {index+2}: Missing mandatory fields")
-                        error_count += 1
-                        continue
-
-                    # Lookup existing employee by employee_id or email
-                    existing_employee = None
-                    if 'employee_id' in df.columns and not pd.isna(row.get('employee_id')):
-                        existing_employee = Employee.query.filter_by(employee_id=str(row['employee_id'])).first()
-                    if existing_employee is None:
-                        existing_employee = Employee.query.filter_by(email=row['email']).first()
-
-                    # Handle department if present
-                    department_id = None
-                    if 'department' in df.columns and not pd.isna(row['department']):
-                        # Look up department by name
-                        department = Department.query.filter_by(name=row['department']).first()
-                        if department:
-                            department_id = department.id
-                        else:
-                            # If configured to create departments
-                            errors.append(f"Row {index+2}: Department '{row['department']}' not found")
-                    
-                    # Handle manager if present (by email or employee_id)
-                    manager_id = None
-                    if 'manager_email' in df.columns and not pd.isna(row.get('manager_email')):
-                        manager = Employee.query.filter_by(email=row['manager_email']).first()
-                        if manager:
-                            manager_id = manager.id
-                    if manager_id is None and 'manager_employee_id' in df.columns and not pd.isna(row.get('manager_employee_id')):
-                        manager = Employee.query.filter_by(employee_id=str(row['manager_employee_id'])).first()
-                        if manager:
-                            manager_id = manager.id
-                    
-                    # Parse hire date
-                    try:
-                        hire_date = pd.to_datetime(row['hire_date']).date()
-                    except Exception:
-                        errors.append(f"Row {index+2}: Invalid date format for hire_date. Use YYYY-MM-DD")
-                        error_count += 1
-                        continue
-                    
-                    # Generate employee ID (e.g., EMP-2023-001)
-                    # You might want to customize this based on your requirements
-                    year = datetime.now().year
-                    last_employee = Employee.query.order_by(Employee.id.desc()).first()
-                    if last_employee:
-                        last_id = last_employee.id
-                    else:
-                        last_id = 0
-                    
-                    employee_id = f"EMP-{year}-{last_id + 1:03d}"
-                    
-                    # Handle new fields
-                    is_manager = False
-                    if 'is_manager' in row and row['is_manager']:
-                        is_manager_val = str(row['is_manager']).lower()
-                        is_manager = is_manager_val in ['yes', 'true', '1', 'y']
-
-                    employment_type = None
-                    if 'employment_type' in df.columns and not pd.isna(row.get('employment_type')):
-                        employment_type = str(row['employment_type']).strip()
-                    
-                    # Parse birth date if provided
-                    birth_date = None
-                    if 'birth_date' in row and pd.notna(row['birth_date']):
-                        try:
-                            birth_date = pd.to_datetime(row['birth_date']).date()
-                        except Exception:
-                            pass
-                    
-                    # Use existing employee if found, otherwise create new
-                    if existing_employee:
-                        employee = existing_employee
-                    else:
-                        employee = Employee(employee_id=employee_id, status='Active')
-
-                    employee.first_name = row['first_name']
-                    employee.last_name = row['last_name']
-                    employee.email = row['email']
-                    employee.phone = row.get('phone', None)
-                    employee.address = row.get('address', None)
-                    employee.department_id = department_id
-                    employee.job_title = row['job_title']
-                    employee.manager_id = manager_id
-                    employee.hire_date = hire_date
-                    employee.is_manager = is_manager
-                    employee.level = row.get('level', None)
-                    employee.education_level = row.get('education_level', None)
-                    employee.birth_date = birth_date
-                    employee.employment_type = employment_type
-                    
-                    # Create a corresponding user account for new employees
-                    if not existing_employee:
-                        username = row['email'].split('@')[0]
-                        existing_user = User.query.filter_by(username=username).first()
-                        if existing_user:
-                            count = 1
-                            while User.query.filter_by(username=f"{username}{count}").first():
-                                count += 1
-                            username = f"{username}{count}"
-
-                        employee_role = Role.query.filter_by(name='Employee').first()
-                        default_password = f"{employee_id}{row['last_name'][:3].lower()}"
-
-                        new_user = User(
-                            username=username,
-                            email=row['email'],
-                            role_id=employee_role.id if employee_role else None
-                        )
-                        new_user.set_password(default_password)
-
-                        db.session.add(new_user)
-                        db.session.flush()
-
-                        employee.user_id = new_user.id
-
-                    db.session.add(employee)
-                    db.session.commit()
-                    success_count += 1
-                    
-                except Exception as e:
-                    db.session.rollback()
-                    errors.append(f"Row {index+2}: {str(e)}")
-                    error_count += 1
-            
-            return success_count, error_count, errors
+            result = import_employees(iter_import_frames(file_path, extension), progress=progress)
+            return result.success_count, result.error_count, result.errors
             
         except Exception as e:
+            db.session.rollback()
             return 0, 0, [f"Error processing file: {str(e)}"]
         
         finally:
@@ -256,130 +542,58 @@ def get_import_template(upload_folder, file_format='csv'):
     
     return file_path
 
-def process_employee_bulk_update(file):
+def process_employee_bulk_update(file, progress=None):
     """Process bulk updates for employee departments and managers.
     
     Args:
         file: The uploaded file (CSV or Excel)
+        progress: Optional ``progress(rows_read, error_count)`` callback
         
+    Returns:
+        dict: Result with success flag, count of updated records, and errors
+    """
+    extension = file.filename.rsplit('.', 1)[-1].lower()
+    return bulk_update_employees(iter_import_frames(getattr(file, 'stream', file), extension), progress)
+
+
+def bulk_update_employees(frames, progress=None):
+    """Apply department and manager updates from an iterable of frames.
+
+    Each chunk is diffed against the current employees and only changed
+    cells are written; a chunk's updates are committed before the next one
+    is read, so uploads streamed with :func:`iter_import_frames` use bounded
+    memory.
+
     Returns:
         dict: Result with success flag, count of updated records, and errors
     """
     try:
-        # Read file
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file)
-        else:  # Excel
-            df = pd.read_excel(file)
-        
-        # Clean column names
-        df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
-        
-        # Check for required employee_id column
-        if 'employee_id' not in df.columns:
-            return {
-                'success': False,
-                'message': 'Missing required column: employee_id',
-                'updated': 0,
-                'errors': 0
-            }
-        
-        # Process updates
         updated_count = 0
         error_messages = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Skip rows without employee_id
-                if pd.isna(row['employee_id']):
-                    error_messages.append(f"Row {index+2}: Missing employee_id")
-                    continue
-                
-                # Find employee
-                employee = Employee.query.filter_by(employee_id=row['employee_id']).first()
-                if not employee:
-                    error_messages.append(f"Row {index+2}: Employee with ID '{row['employee_id']}' not found")
-                    continue
-                
-                # Track if anything changed
-                changed = False
-                
-                # Update is_manager flag if provided
-                if 'is_manager' in df.columns and not pd.isna(row['is_manager']):
-                    is_manager_val = str(row['is_manager']).lower().strip()
-                    is_manager = is_manager_val in ['yes', 'true', '1', 'y']
-                    
-                    if employee.is_manager != is_manager:
-                        employee.is_manager = is_manager
-                        changed = True
-                
-                # Update department (by ID or name)
-                if ('department_id' in df.columns and not pd.isna(row['department_id'])) or \
-                   ('department_name' in df.columns and not pd.isna(row['department_name'])):
-                    
-                    department = None
-                    
-                    # Try to find department by ID first
-                    if 'department_id' in df.columns and not pd.isna(row['department_id']):
-                        try:
-                            dept_id = int(row['department_id'])
-                            department = Department.query.get(dept_id)
-                        except (ValueError, TypeError):
-                            error_messages.append(f"Row {index+2}: Invalid department_id format")
-                    
-                    # If not found or not specified, try by name
-                    if department is None and 'department_name' in df.columns and not pd.isna(row['department_name']):
-                        department = Department.query.filter_by(name=row['department_name']).first()
-                    
-                    # If department found, update employee
-                    if department:
-                        if employee.department_id != department.id:
-                            employee.department_id = department.id
-                            changed = True
-                    else:
-                        error_messages.append(f"Row {index+2}: Department not found")
-                
-                # Update manager (by ID or employee_id)
-                if ('manager_id' in df.columns and not pd.isna(row['manager_id'])) or \
-                   ('manager_employee_id' in df.columns and not pd.isna(row['manager_employee_id'])):
-                    
-                    manager = None
-                    
-                    # Try to find manager by ID first
-                    if 'manager_id' in df.columns and not pd.isna(row['manager_id']):
-                        try:
-                            mgr_id = int(row['manager_id'])
-                            manager = Employee.query.get(mgr_id)
-                        except (ValueError, TypeError):
-                            error_messages.append(f"Row {index+2}: Invalid manager_id format")
-                    
-                    # If not found or not specified, try by employee_id
-                    if manager is None and 'manager_employee_id' in df.columns and not pd.isna(row['manager_employee_id']):
-                        manager = Employee.query.filter_by(employee_id=row['manager_employee_id']).first()
-                    
-                    # If manager found, update employee
-                    if manager:
-                        # Prevent circular reporting relationships
-                        if manager.id == employee.id:
-                            error_messages.append(f"Row {index+2}: Cannot set employee as their own manager")
-                        else:
-                            if employee.manager_id != manager.id:
-                                employee.manager_id = manager.id
-                                changed = True
-                    else:
-                        error_messages.append(f"Row {index+2}: Manager not found")
-                
-                # Count updates
-                if changed:
-                    updated_count += 1
-                
-            except Exception as e:
-                error_messages.append(f"Row {index+2}: {str(e)}")
-        
-        # Commit all changes at once
-        if updated_count > 0:
+        rows_read = 0
+
+        for df in frames:
+            normalize_columns(df)
+
+            # Check for required employee_id column
+            if 'employee_id' not in df.columns:
+                return {
+                    'success': False,
+                    'message': 'Missing required column: employee_id',
+                    'updated': 0,
+                    'errors': 0
+                }
+
+            changes, _unknown_keys = _diff_bulk_update_frame(df, error_messages)
+            updated_count += _write_bulk_update_changes(changes)
             db.session.commit()
-        
+
+            rows_read += len(df)
+            logger.info('Bulk update: %d rows read, %d updated, %d errors',
+                        rows_read, updated_count, len(error_messages))
+            if progress:
+                progress(rows_read, len(error_messages))
+
         return {
             'success': True,
             'updated': updated_count,
@@ -396,3 +610,269 @@ def process_employee_bulk_update(file):
             'updated': 0,
             'errors': 1
         }
+
+
+def import_budget_items(budget_id, frames, progress=None):
+    """Add budget items to a budget from an iterable of frames.
+
+    Employees are matched by their ``employee_id`` code with one IN lookup
+    per chunk and items are bulk inserted, one transaction per chunk. Rows
+    without a category or with a non-numeric amount are reported as errors.
+    """
+    result = ImportResult()
+    for df in frames:
+        normalize_columns(df)
+        missing_fields = [column for column in ('category', 'amount') if column not in df.columns]
+        if missing_fields:
+            result.errors.append(f"Missing required fields: {', '.join(missing_fields)}")
+            return result
+
+        df = df.set_axis(df.index + 2)
+        categories = _text_column(df, 'category')
+        amounts = pd.to_numeric(_text_column(df, 'amount'), errors='coerce')
+        employee_codes = _text_column(df, 'employee_id')
+        employees = _lookup([Employee.id], Employee.employee_id, employee_codes)
+        subcategories = _text_column(df, 'subcategory').fillna('')
+        descriptions = _text_column(df, 'description').fillna('')
+
+        items, item_rows = [], []
+        for row_number in df.index:
+            if categories[row_number] is None:
+                result.fail(row_number, "Missing category")
+            elif pd.isna(amounts[row_number]):
+                result.fail(row_number, "Invalid amount")
+            else:
+                items.append({
+                    'budget_id': budget_id,
+                    'category': categories[row_number],
+                    'subcategory': subcategories[row_number],
+                    'description': descriptions[row_number],
+                    'amount': float(amounts[row_number]),
+                    'employee_id': employees.get(employee_codes[row_number]),
+                })
+                item_rows.append(row_number)
+
+        try:
+            if items:
+                db.session.execute(insert(BudgetItem), items)
+            db.session.commit()
+            result.success_count += len(items)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for row_number in item_rows:
+                result.fail(row_number, str(e))
+
+        result.rows_read += len(df)
+        if progress:
+            progress(result.rows_read, result.error_count)
+    return result
+
+
+def _integer_column(df, column):
+    """Parse an ID column; returns nullable integers and a mask of malformed cells."""
+    text = _text_column(df, column)
+    numbers = pd.to_numeric(text, errors='coerce')
+    valid = numbers.notna() & (numbers % 1 == 0)
+    return numbers.where(valid).astype('Int64'), text.notna() & ~valid
+
+
+def _resolve_ids(df, id_column, name_column, key_column, name_key_column, problems, label):
+    """Resolve a reference given by database ID or by a natural key.
+
+    The ID is tried first and the natural key is the fallback, as in the
+    row-by-row updater this replaces. Returns nullable IDs; malformed and
+    unresolvable references are added to ``problems``.
+    """
+    ids, malformed = _integer_column(df, id_column)
+    names = _text_column(df, name_column)
+    for row_number in df.index[malformed]:
+        problems.append((row_number, f"Invalid {id_column} format"))
+
+    by_id = ids.map(_lookup([key_column], key_column, [int(value) for value in ids.dropna()]))
+    by_name = names.map(_lookup([key_column], name_key_column, names.dropna()))
+    resolved = pd.to_numeric(by_id.where(by_id.notna(), by_name)).astype('Int64')
+
+    requested = ids.notna() | malformed | names.notna()
+    for row_number in df.index[requested & resolved.isna()]:
+        problems.append((row_number, f"{label} not found"))
+    return resolved
+
+
+def _employee_snapshot(keys):
+    """Current bulk-updatable fields of the employees with ``keys``, indexed by employee_id."""
+    snapshot = _lookup([Employee.id] + [getattr(Employee, name) for name in BULK_UPDATE_FIELDS],
+                       Employee.employee_id, keys)
+    current = pd.DataFrame.from_dict(snapshot, orient='index', columns=['id'] + BULK_UPDATE_FIELDS)
+    return current.astype({'id': 'Int64', 'is_manager': 'boolean', 'department_id': 'Int64', 'manager_id': 'Int64'})
+
+
+def _diff_bulk_update_frame(df, error_messages):
+    """Compare one chunk of a bulk update file with the employees it names.
+
+    The chunk is checked against a single snapshot of the named employees
+    and every field is compared as a whole column. Returns a frame of
+    changed cells (``DIFF_COLUMNS`` plus the employee's primary key) and the
+    employee IDs that matched nobody; row problems go to ``error_messages``.
+    """
+    df = df.set_axis(df.index + 2)
+    problems = []
+
+    keys = _text_column(df, 'employee_id')
+    current = _employee_snapshot(keys.dropna())
+    missing = keys.isna()
+    unknown = ~missing & ~keys.isin(current.index)
+    for row_number in df.index[missing]:
+        problems.append((row_number, "Missing employee_id"))
+    for row_number in df.index[unknown]:
+        problems.append((row_number, f"Employee with ID '{keys[row_number]}' not found"))
+    unknown_keys = keys[unknown].tolist()
+
+    # Rows naming the same employee twice: the later row wins
+    known = ~missing & ~unknown & ~keys.duplicated(keep='last')
+    df, keys = df[known], keys[known]
+    current = current.reindex(keys).set_axis(df.index)
+
+    is_manager = _text_column(df, 'is_manager')
+    proposed = pd.DataFrame({
+        'is_manager': is_manager.str.lower().isin(TRUE_VALUES).astype('boolean').mask(is_manager.isna()),
+        'department_id': _resolve_ids(df, 'department_id', 'department_name', Department.id, Department.name,
+                                      problems, 'Department'),
+        'manager_id': _resolve_ids(df, 'manager_id', 'manager_employee_id', Employee.id, Employee.employee_id,
+                                   problems, 'Manager'),
+    }, index=df.index)
+
+    own_manager = (proposed['manager_id'] == current['id']).fillna(False)
+    for row_number in df.index[own_manager]:
+        problems.append((row_number, "Cannot set employee as their own manager"))
+    proposed.loc[own_manager, 'manager_id'] = pd.NA
+
+    cells = []
+    for name in BULK_UPDATE_FIELDS:
+        changed = (proposed[name].notna() & proposed[name].ne(current[name]).fillna(True)).astype(bool)
+        cells.append(pd.DataFrame({
+            'row': df.index[changed],
+            'employee_id': keys[changed].to_numpy(),
+            'field': name,
+            'old_value': _diff_values(current.loc[changed, name]),
+            'new_value': _diff_values(proposed.loc[changed, name]),
+            'id': current.loc[changed, 'id'].to_numpy(),
+        }))
+    changes = pd.concat(cells, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
+
+    error_messages.extend(f"Row {row_number}: {message}"
+                          for row_number, message in sorted(problems, key=lambda problem: problem[0]))
+    return changes, unknown_keys
+
+
+def _diff_values(values):
+    """Render field values as the text stored in a diff; empty for none."""
+    return values.astype('string').fillna('').to_numpy(dtype=object)
+
+
+def _field_value(name, text):
+    """Database value of a diff cell for field ``name``."""
+    if name == 'is_manager':
+        return text == 'True'
+    return int(text) if text else None
+
+
+def _write_bulk_update_changes(changes):
+    """Write changed cells with bulk UPDATEs by primary key; returns employees updated."""
+    values = {}
+    for cell in changes.itertuples(index=False):
+        values.setdefault(int(cell.id), {'id': int(cell.id)})[cell.field] = _field_value(cell.field, cell.new_value)
+    values = list(values.values())
+    for start in range(0, len(values), IMPORT_BATCH_SIZE):
+        db.session.execute(update(Employee), values[start:start + IMPORT_BATCH_SIZE])
+    return len(values)
+
+
+@dataclass
+class BulkUpdateDiff:
+    """Changes a bulk update file would make, computed without writing."""
+    changes: pd.DataFrame
+    errors: List[str] = field(default_factory=list)
+    unknown_keys: List[str] = field(default_factory=list)
+    unknown_columns: List[str] = field(default_factory=list)
+    rows_read: int = 0
+
+    @property
+    def employees_changed(self) -> int:
+        return self.changes['employee_id'].nunique()
+
+
+def diff_employee_bulk_update(frames, progress=None):
+    """Dry run of :func:`bulk_update_employees`: what would change, per cell.
+
+    Raises:
+        ValueError: if the file has no ``employee_id`` column
+    """
+    diff = BulkUpdateDiff(changes=pd.DataFrame(columns=DIFF_COLUMNS))
+    chunks = []
+    for df in frames:
+        normalize_columns(df)
+        if 'employee_id' not in df.columns:
+            raise ValueError('Missing required column: employee_id')
+        diff.unknown_columns.extend(column for column in df.columns
+                                    if column not in BULK_UPDATE_COLUMNS and column not in diff.unknown_columns)
+
+        changes, unknown_keys = _diff_bulk_update_frame(df, diff.errors)
+        chunks.append(changes[DIFF_COLUMNS])
+        diff.unknown_keys.extend(unknown_keys)
+        diff.rows_read += len(df)
+        if progress:
+            progress(diff.rows_read, len(diff.errors))
+
+    if chunks:
+        diff.changes = pd.concat(chunks, ignore_index=True)
+    return diff
+
+
+def bulk_update_diff_report(changes):
+    """Diff cells with readable department names and manager employee IDs added."""
+    report = changes[DIFF_COLUMNS].copy()
+    ids = pd.concat([report['old_value'], report['new_value']])
+    ids = {int(value) for value in ids[ids != ''] if value.isdigit()}
+    labels = {
+        'department_id': {str(key): name for key, name in _lookup([Department.name], Department.id, ids).items()},
+        'manager_id': {str(key): code for key, code in _lookup([Employee.employee_id], Employee.id, ids).items()},
+        'is_manager': {'True': 'Yes', 'False': 'No'},
+    }
+    for column, label in (('old_value', 'old_label'), ('new_value', 'new_label')):
+        report[label] = [labels[name].get(value, value) for name, value in zip(report['field'], report[column])]
+    return report
+
+
+def save_bulk_update_diff(changes, path):
+    bulk_update_diff_report(changes).to_csv(path, index=False)
+
+
+def load_bulk_update_diff(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)[DIFF_COLUMNS].astype({'row': int})
+
+
+def apply_bulk_update_diff(changes):
+    """Write a diff computed by :func:`diff_employee_bulk_update`.
+
+    Only the changed cells are written. A cell whose current value no
+    longer matches the diff's old value was edited since the dry run and is
+    skipped with an error instead of being overwritten.
+    """
+    result = ImportResult(rows_read=len(changes))
+    current = _employee_snapshot(changes['employee_id'].unique())
+    current = current.reset_index(names='employee_id').melt(
+        id_vars=['employee_id', 'id'], value_vars=BULK_UPDATE_FIELDS, var_name='field', value_name='value')
+    current['value'] = _diff_values(current['value'])
+    cells = changes.merge(current, on=['employee_id', 'field'], how='left')
+
+    stale = cells['id'].isna() | (cells['value'] != cells['old_value'])
+    for cell in cells[stale].itertuples(index=False):
+        result.fail(cell.row, f"{cell.field} of employee '{cell.employee_id}' changed since the preview; not updated")
+
+    try:
+        result.success_count = _write_bulk_update_changes(cells[~stale])
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    return result
@@ -0,0 +1,98 @@
+"""Persisted background jobs with progress reporting.
+
+A job function receives its :class:`BackgroundJob` row as first argument and
+reports progress through :func:`update_progress`; :func:`start_job` takes
+care of status transitions and error capture.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+
+from app import db
+from models import BackgroundJob
+from utils.background import run_in_background
+
+logger = logging.getLogger(__name__)
+
+
+def create_job(job_type: str, created_by: Optional[int] = None, params: Optional[dict] = None,
+               total: int = 0) -> BackgroundJob:
+    """Create and commit a queued job."""
+    job = BackgroundJob(job_type=job_type, created_by=created_by, params=params or {}, total=total)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def update_progress(job: BackgroundJob, processed: Optional[int] = None, total: Optional[int] = None,
+                    failed: Optional[int] = None, message: Optional[str] = None, commit: bool = True) -> None:
+    """Record progress on ``job``; committed by default so pollers see it."""
+    if processed is not None:
+        job.processed = processed
+    if total is not None:
+        job.total = total
+    if failed is not None:
+        job.failed = failed
+    if message is not None:
+        job.message = message
+    job.updated_at = datetime.utcnow()
+    if commit:
+        db.session.commit()
+
+
+def _execute(job_id: int, func: Callable, args: tuple, kwargs: dict) -> None:
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None or job.is_finished:
+        return
+
+    job.status = 'Running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        result = func(job, *args, **kwargs)
+        job.status = 'Completed'
+        if result is not None:
+            job.result = result
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        logger.exception('Background job %s (%s) failed', job_id, getattr(func, '__name__', func))
+        job = db.session.get(BackgroundJob, job_id)
+        job.status = 'Failed'
+        job.message = str(exc)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def start_job(job: BackgroundJob, func: Callable, *args, **kwargs) -> BackgroundJob:
+    """Run ``func(job, *args, **kwargs)`` in the background.
+
+    The return value of ``func``, if any, is stored as the job's result.
+    Exceptions mark the job as ``Failed`` with the error message.
+    """
+    run_in_background(_execute, job.id, func, args, kwargs)
+    return job
+
+
+def job_status(job: Optional[BackgroundJob]) -> dict:
+    """Serialize a job for the JSON status endpoint."""
+    if job is None:
+        return {'status': 'NotFound'}
+
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'failed': job.failed,
+        'percent': job.percent,
+        'message': job.message,
+        'result': job.result,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
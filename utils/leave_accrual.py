@@ -1,8 +1,15 @@
 """Utility functions for leave accrual."""
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
+from sqlalchemy import case, exists, func, insert, literal, select
 from app import db
-from models import Timesheet, LeaveBalance, LeaveType, Employee
+from models import Timesheet, LeaveAccrual, LeaveBalance, LeaveType, Employee
+from utils.upserts import dialect_insert
+
+STANDARD_ACCRUAL_RATE = 2.80
+SENIOR_ACCRUAL_RATE = 3.80
+# Years of service from which the senior rate applies
+SENIOR_TENURE_YEARS = 5
 
 def get_accrual_rate_by_tenure(employee_id):
     """Calculate the appropriate accrual rate based on employee tenure.
@@ -18,23 +25,84 @@ def get_accrual_rate_by_tenure(employee_id):
     """
     employee = Employee.query.get(employee_id)
     if not employee:
-        return 2.80  # Default if employee not found
-    
-    # Calculate tenure in years
-    today = date.today()
-    hire_date = employee.hire_date
-    
-    if not hire_date:
-        return 2.80  # Default if hire date not available
-    
-    # Calculate years of service
-    years_of_service = relativedelta(today, hire_date).years
+        return STANDARD_ACCRUAL_RATE  # Default if employee not found
     
-    # Return appropriate accrual rate
-    if years_of_service >= 5:
-        return 3.80  # Higher rate for 5+ years of service
-    else:
-        return 2.80  # Standard rate for less than 5 years
+    return accrual_rate_for_hire_date(employee.hire_date)
+
+def senior_tenure_cutoff(today=None):
+    """Latest hire date that earns the senior rate on ``today``."""
+    return (today or date.today()) - relativedelta(years=SENIOR_TENURE_YEARS)
+
+def accrual_rate_for_hire_date(hire_date, today=None):
+    """Accrual rate (hours per 40 hours worked) for an employee hired on ``hire_date``."""
+    if hire_date and hire_date <= senior_tenure_cutoff(today):
+        return SENIOR_ACCRUAL_RATE  # Higher rate for 5+ years of service
+    return STANDARD_ACCRUAL_RATE  # Standard rate, also when the hire date is unknown
+
+def accrual_rate_expression(today=None):
+    """:func:`accrual_rate_for_hire_date` as a SQL expression over ``Employee.hire_date``."""
+    return case(
+        (Employee.hire_date <= senior_tenure_cutoff(today), SENIOR_ACCRUAL_RATE),
+        else_=STANDARD_ACCRUAL_RATE,
+    )
+
+def accrue_leave_for_timesheets(timesheet_ids, today=None):
+    """Accrue leave for a batch of approved timesheets.
+
+    Each timesheet not accrued before gets a :class:`~models.LeaveAccrual`
+    ledger row, written with one ``INSERT ... SELECT`` that works out the
+    tenure-based rate of every employee in SQL. The ledger rows are then
+    added to the year's balance of every paid leave type with one upsert.
+    A timesheet already in the ledger accrues nothing, so approving it
+    again never double-counts. The caller is responsible for committing.
+
+    Args:
+        timesheet_ids: IDs of approved timesheets
+        today: Date tenure is measured at (today by default)
+
+    Returns:
+        Dictionary mapping each timesheet that accrued leave to a dictionary
+        with leave type names as keys and hours accrued as values
+    """
+    timesheet_ids = list(timesheet_ids)
+    leave_types = db.session.scalars(select(LeaveType.name).where(LeaveType.is_paid.is_(True))).all()
+    if not timesheet_ids or not leave_types:
+        return {}
+
+    rate = accrual_rate_expression(today)
+    already_accrued = exists().where(LeaveAccrual.timesheet_id == Timesheet.id)
+    pending = (
+        select(Timesheet.id, Timesheet.employee_id, literal(datetime.now().year), Timesheet.total_hours,
+               rate, Timesheet.total_hours * rate / 40.0, literal(datetime.utcnow()))
+        .join(Employee, Employee.id == Timesheet.employee_id)
+        .where(Timesheet.id.in_(timesheet_ids), Timesheet.status == 'Approved', Timesheet.total_hours > 0,
+               ~already_accrued)
+    )
+    accrued = db.session.execute(
+        insert(LeaveAccrual)
+        .from_select(['timesheet_id', 'employee_id', 'year', 'hours_worked', 'accrual_rate', 'hours_accrued',
+                      'created_at'], pending)
+        .returning(LeaveAccrual.timesheet_id, LeaveAccrual.hours_accrued)
+    ).all()
+    if not accrued:
+        return {}
+
+    per_balance = (
+        select(LeaveAccrual.employee_id, LeaveType.id, LeaveAccrual.year,
+               func.sum(LeaveAccrual.hours_accrued), literal(0.0), func.max(LeaveAccrual.accrual_rate))
+        .join(LeaveType, LeaveType.is_paid.is_(True))
+        .where(LeaveAccrual.timesheet_id.in_([row.timesheet_id for row in accrued]))
+        .group_by(LeaveAccrual.employee_id, LeaveType.id, LeaveAccrual.year)
+    )
+    upsert = dialect_insert(LeaveBalance).from_select(
+        ['employee_id', 'leave_type_id', 'year', 'total_hours', 'used_hours', 'accrual_rate'], per_balance)
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=['employee_id', 'leave_type_id', 'year'],
+        set_={'total_hours': LeaveBalance.total_hours + upsert.excluded.total_hours,
+              'accrual_rate': upsert.excluded.accrual_rate},
+    ))
+
+    return {row.timesheet_id: {name: row.hours_accrued for name in leave_types} for row in accrued}
 
 def accrue_leave_from_timesheet(timesheet_id):
     """Accrue leave hours based on timesheet hours.
@@ -45,59 +113,10 @@ def accrue_leave_from_timesheet(timesheet_id):
     Returns:
         Dictionary with leave type names as keys and hours accrued as values
     """
-    # Get the timesheet
-    timesheet = Timesheet.query.get(timesheet_id)
-    if not timesheet or timesheet.status != 'Approved':
+    accrual_results = accrue_leave_for_timesheets([timesheet_id]).get(timesheet_id)
+    if accrual_results is None:
         return None
     
-    # Get employee and total hours
-    employee_id = timesheet.employee_id
-    total_hours = timesheet.total_hours
-    
-    if total_hours <= 0:
-        return None
-    
-    # Get the current year
-    current_year = datetime.now().year
-    
-    # Get all leave types that are available for accrual
-    leave_types = LeaveType.query.filter_by(is_paid=True).all()
-    
-    accrual_results = {}
-    
-    # For each leave type, accrue hours
-    for leave_type in leave_types:
-        # Get or create balance for this employee, leave type, and year
-        balance = LeaveBalance.query.filter_by(
-            employee_id=employee_id,
-            leave_type_id=leave_type.id,
-            year=current_year
-        ).first()
-        
-        # Calculate appropriate accrual rate based on tenure
-        accrual_rate = get_accrual_rate_by_tenure(employee_id)
-        
-        if not balance:
-            # Create a new balance if one doesn't exist
-            balance = LeaveBalance(
-                employee_id=employee_id,
-                leave_type_id=leave_type.id,
-                year=current_year,
-                total_hours=0,
-                used_hours=0,
-                accrual_rate=accrual_rate  # Tenure-based accrual rate
-            )
-            db.session.add(balance)
-        else:
-            # Update the accrual rate for existing balance based on current tenure
-            balance.accrual_rate = accrual_rate
-        
-        # Calculate and apply accrual
-        hours_accrued = balance.accrue_from_timesheet(total_hours)
-        
-        # Record the result
-        accrual_results[leave_type.name] = hours_accrued
-    
     # Commit changes
     db.session.commit()
     
@@ -0,0 +1,259 @@
+"""In-memory index of the reporting hierarchy.
+
+The manager tree is loaded with one query into parent and children maps
+that are shared by the whole process. Reporting chains, direct reports,
+subtrees, span of control and depth are then answered from memory in time
+proportional to the result, without a query per level.
+
+The index is dropped whenever an employee is added or removed or their
+``manager_id``, ``status`` or ``department_id`` changes through the ORM,
+including bulk ``insert``/``update`` statements, and rebuilt on next use. ``ORG_INDEX_MAX_AGE`` bounds how long
+another process's changes can go unnoticed.
+
+:func:`manager_scope` expresses the same subtree in SQL, as a recursive CTE,
+for views that filter rows down to a manager's reports in the database.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import Select, event, inspect, literal, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from models.employees import Employee
+
+_SESSION_FLAG = 'org_hierarchy_changed'
+# Employee columns held in the index; changing any of them drops it
+_INDEXED_ATTRIBUTES = ('manager_id', 'status', 'department_id')
+
+_lock = threading.Lock()
+_index: Optional['OrgIndex'] = None
+_built_at = 0.0
+_generation = 0
+
+
+@dataclass
+class ChartForest:
+    """The org chart for one filter: visible employees under visible managers.
+
+    An employee whose manager is filtered out becomes a root, as the chart
+    has always drawn them.
+    """
+    roots: List[int]
+    report_counts: Dict[int, int]
+    descendant_counts: Dict[int, int]
+
+
+class OrgIndex:
+    """Parent and children maps of the manager tree, keyed by employee ``id``.
+
+    Status and department are kept alongside so org chart views can be
+    derived without going back to the database.
+    """
+
+    def __init__(self, managers: Dict[int, Optional[int]], statuses: Optional[Dict[int, str]] = None,
+                 departments: Optional[Dict[int, Optional[int]]] = None):
+        self.managers = managers
+        self.statuses = statuses or {}
+        self.departments = departments or {}
+        self.reports: Dict[int, List[int]] = {}
+        for employee_id, manager_id in managers.items():
+            if manager_id is not None:
+                self.reports.setdefault(manager_id, []).append(employee_id)
+        self._forests: Dict[Optional[int], ChartForest] = {}
+
+    def __contains__(self, employee_id: int) -> bool:
+        return employee_id in self.managers
+
+    def __len__(self) -> int:
+        return len(self.managers)
+
+    def manager_of(self, employee_id: int) -> Optional[int]:
+        return self.managers.get(employee_id)
+
+    def chain(self, employee_id: int) -> List[int]:
+        """The employee followed by each manager up to the top; stops at a cycle."""
+        chain, seen = [], set()
+        current = employee_id if employee_id in self.managers else None
+        while current is not None and current not in seen:
+            chain.append(current)
+            seen.add(current)
+            current = self.managers.get(current)
+        return chain
+
+    def direct_reports(self, employee_id: int) -> List[int]:
+        return list(self.reports.get(employee_id, ()))
+
+    def subtree(self, employee_id: int, include_self: bool = False) -> List[int]:
+        """Everyone reporting to the employee directly or indirectly, breadth first."""
+        seen = {employee_id}
+        members = [employee_id] if include_self else []
+        queue = deque([employee_id])
+        while queue:
+            for report in self.reports.get(queue.popleft(), ()):
+                if report not in seen:
+                    seen.add(report)
+                    members.append(report)
+                    queue.append(report)
+        return members
+
+    def span_of_control(self, employee_id: int) -> int:
+        """Number of direct reports."""
+        return len(self.reports.get(employee_id, ()))
+
+    def depth(self, employee_id: int) -> int:
+        """Levels between the employee and the top of their chain (0 at the top)."""
+        return max(len(self.chain(employee_id)) - 1, 0)
+
+    def roots(self) -> List[int]:
+        """Employees without a manager."""
+        return [employee_id for employee_id, manager_id in self.managers.items() if manager_id is None]
+
+    def chart_forest(self, department_id: Optional[int] = None) -> ChartForest:
+        """Active employees (optionally of one department) as a forest with subtree sizes.
+
+        Computed in one pass over the index and memoized until the index is
+        rebuilt.
+        """
+        forest = self._forests.get(department_id)
+        if forest is not None:
+            return forest
+
+        visible = {
+            employee_id for employee_id, status in self.statuses.items()
+            if status == 'Active' and (department_id is None or self.departments.get(employee_id) == department_id)
+        }
+        roots = [employee_id for employee_id in visible if self.managers.get(employee_id) not in visible]
+
+        # Breadth-first from the roots, then sizes bubble up in reverse order
+        order = list(roots)
+        report_counts: Dict[int, int] = {}
+        for employee_id in order:
+            reports = [report for report in self.reports.get(employee_id, ()) if report in visible]
+            report_counts[employee_id] = len(reports)
+            order.extend(reports)
+        descendant_counts = dict.fromkeys(order, 0)
+        for employee_id in reversed(order):
+            manager_id = self.managers.get(employee_id)
+            if manager_id in visible:
+                descendant_counts[manager_id] += descendant_counts[employee_id] + 1
+
+        forest = ChartForest(roots=roots, report_counts=report_counts, descendant_counts=descendant_counts)
+        self._forests[department_id] = forest
+        return forest
+
+
+def get_org_index() -> OrgIndex:
+    """Return the cached index, rebuilding it with one query when needed."""
+    global _index, _built_at
+
+    index = _index
+    max_age = current_app.config.get('ORG_INDEX_MAX_AGE', 300)
+    if index is not None and time.monotonic() - _built_at < max_age:
+        return index
+
+    generation = _generation
+    rows = db.session.execute(select(Employee.id, Employee.manager_id, Employee.status, Employee.department_id)).all()
+    index = OrgIndex(
+        managers={row.id: row.manager_id for row in rows},
+        statuses={row.id: row.status for row in rows},
+        departments={row.id: row.department_id for row in rows},
+    )
+    if db.session.info.get(_SESSION_FLAG):
+        # Includes this session's uncommitted changes; not for anyone else
+        return index
+    with _lock:
+        # Don't cache a tree read while someone else was changing it
+        if generation == _generation:
+            _index, _built_at = index, time.monotonic()
+    return index
+
+
+def invalidate_org_index() -> None:
+    """Drop the cached index; the next lookup rebuilds it."""
+    global _index, _generation
+    with _lock:
+        _generation += 1
+        _index = None
+
+
+def reporting_chain(employee_id: int) -> List[int]:
+    return get_org_index().chain(employee_id)
+
+
+def direct_reports(employee_id: int) -> List[int]:
+    return get_org_index().direct_reports(employee_id)
+
+
+def subtree(employee_id: int, include_self: bool = False) -> List[int]:
+    return get_org_index().subtree(employee_id, include_self)
+
+
+def span_of_control(employee_id: int) -> int:
+    return get_org_index().span_of_control(employee_id)
+
+
+def depth(employee_id: int) -> int:
+    return get_org_index().depth(employee_id)
+
+
+def manager_scope(manager_id: int, include_self: bool = False) -> Select:
+    """SELECT of the ids of everyone reporting to ``manager_id`` at any depth.
+
+    Built on a recursive CTE for use as ``Model.employee_id.in_(...)``, so
+    skip-level managers see their whole organisation without the id list
+    being loaded into Python. ``UNION`` keeps reporting cycles finite.
+    """
+    tree = select(Employee.id).where(Employee.id == manager_id).cte('reporting_tree', recursive=True)
+    tree = tree.union(select(Employee.id).join(tree, Employee.manager_id == tree.c.id))
+    scope = select(tree.c.id)
+    return scope if include_self else scope.where(tree.c.id != manager_id)
+
+
+def manages(manager_id: int, employee_id: int) -> bool:
+    """Whether ``employee_id`` reports to ``manager_id`` directly or indirectly."""
+    return bool(db.session.scalar(select(literal(employee_id).in_(manager_scope(manager_id)))))
+
+
+def _hierarchy_changed(session: Optional[Session]) -> None:
+    # Dropped now so this session sees its own change, and again once the
+    # transaction ends so no one keeps a tree read before the commit
+    if session is not None:
+        session.info[_SESSION_FLAG] = True
+    invalidate_org_index()
+
+
+@event.listens_for(Employee, 'after_insert')
+@event.listens_for(Employee, 'after_delete')
+def _invalidate_on_insert_or_delete(mapper, connection, target):
+    _hierarchy_changed(object_session(target))
+
+
+@event.listens_for(Employee, 'after_update')
+def _invalidate_on_manager_change(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if any(getattr(attrs, name).history.has_changes() for name in _INDEXED_ATTRIBUTES):
+        _hierarchy_changed(object_session(target))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _invalidate_on_bulk_write(orm_execute_state):
+    # Bulk statements skip the mapper events above; rebuilding is one query,
+    # so any bulk write to employees drops the index
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_select or mapper is None or mapper.class_ is not Employee:
+        return
+    _hierarchy_changed(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_soft_rollback')
+def _invalidate_after_transaction(session, *args):
+    if session.info.pop(_SESSION_FLAG, False):
+        invalidate_org_index()
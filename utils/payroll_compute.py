@@ -0,0 +1,149 @@
+"""Pure payroll arithmetic, optionally fanned out across a process pool.
+
+This module must not import the Flask app or the models so that worker
+processes can import it cheaply.
+"""
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Simple flat tax rate (would be more complex in a real system)
+TAX_RATE = 0.2
+
+# Annual salaries are paid bi-weekly
+PAY_PERIODS_PER_YEAR = 26
+
+DEDUCTION_COMPONENT_TYPES = ('deduction', 'tax')
+
+# (employee_id, base_salary, salary_type, salary_structure_id)
+InputRecord = Tuple[int, float, str, Optional[int]]
+# (employee_id, gross_pay, tax_amount, total_deductions, net_pay, entries)
+OutputRecord = Tuple[int, float, float, float, float, List[Tuple[str, str, float]]]
+
+
+@dataclass
+class PayslipInput:
+    """Compact per-employee input for the payroll computation."""
+    employee_id: int
+    base_salary: float = 0.0
+    salary_type: str = ''
+    salary_structure_id: Optional[int] = None
+
+    def as_record(self) -> InputRecord:
+        return (self.employee_id, self.base_salary, self.salary_type, self.salary_structure_id)
+
+
+@dataclass
+class ComponentInput:
+    """Salary component values needed to build payroll entries."""
+    name: str
+    component_type: str
+    value: float
+
+
+@dataclass
+class ComputedPayslip:
+    """Result of computing a single payslip in memory."""
+    employee_id: int
+    gross_pay: float
+    tax_amount: float
+    total_deductions: float
+    net_pay: float
+    # (component_name, type, amount) tuples in display order
+    entries: List[Tuple[str, str, float]] = field(default_factory=list)
+
+
+def _compute_record(record: InputRecord, components: Iterable[Tuple[str, str, float]]) -> OutputRecord:
+    employee_id, base_salary, salary_type, _ = record
+    base_pay = base_salary / PAY_PERIODS_PER_YEAR if salary_type == 'Annual' else base_salary
+
+    entries = [('Base Salary', 'Earning', base_pay)]
+    total_earnings = base_pay
+    total_deductions = 0.0
+
+    for name, component_type, value in components:
+        entry_type = 'Deduction' if component_type in DEDUCTION_COMPONENT_TYPES else 'Earning'
+        entries.append((name, entry_type, value))
+        if entry_type == 'Deduction':
+            total_deductions += value
+        else:
+            total_earnings += value
+
+    tax_amount = total_earnings * TAX_RATE
+    entries.append(('Income Tax', 'Deduction', tax_amount))
+
+    return (employee_id, total_earnings, tax_amount, total_deductions,
+            total_earnings - tax_amount - total_deductions, entries)
+
+
+def compute_payslip(payslip_input: PayslipInput, components: Iterable[ComponentInput]) -> ComputedPayslip:
+    """Compute gross, tax, deductions and net pay for one employee.
+
+    This is pure arithmetic and performs no database access.
+    """
+    record = _compute_record(
+        payslip_input.as_record(),
+        ((c.name, c.component_type, c.value) for c in components),
+    )
+    return ComputedPayslip(*record)
+
+
+def _compute_batch(records: Sequence[InputRecord],
+                   components: Dict[int, List[Tuple[str, str, float]]]) -> List[OutputRecord]:
+    return [_compute_record(record, components.get(record[3], ())) for record in records]
+
+
+def _batches(records: List[InputRecord], size: int):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def _map_batches(pool: ProcessPoolExecutor, batches, batch_components) -> List[ComputedPayslip]:
+    results = []
+    for batch in pool.map(_compute_batch, batches, batch_components):
+        results.extend(ComputedPayslip(*record) for record in batch)
+    return results
+
+
+def open_worker_pool(workers: int, start_method: Optional[str] = None) -> ProcessPoolExecutor:
+    """Start a process pool that can compute many batches of payslips.
+
+    The pool is not tied to a set of salary components, so one pool can be
+    reused for every chunk of a payroll run.
+    """
+    context = multiprocessing.get_context(start_method) if start_method else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def compute_payslips_parallel(inputs: Iterable[PayslipInput], components: Dict[int, List[ComponentInput]],
+                              workers: int, batch_size: int = 2000,
+                              start_method: Optional[str] = None,
+                              pool: Optional[ProcessPoolExecutor] = None) -> List[ComputedPayslip]:
+    """Compute payslips across ``workers`` processes.
+
+    Workers receive plain tuples and return plain tuples; each batch ships
+    only the components of the salary structures it uses. Batches are made
+    small enough to keep every worker busy. Results come back in input order
+    so a single writer can bulk insert them. ``pool`` reuses a pool from
+    :func:`open_worker_pool` instead of starting a new one.
+    """
+    records = [payslip_input.as_record() for payslip_input in inputs]
+    if not records:
+        return []
+    compact_components = {
+        structure_id: [(c.name, c.component_type, c.value) for c in items]
+        for structure_id, items in components.items()
+    }
+    batches = list(_batches(records, min(batch_size, -(-len(records) // workers))))
+    batch_components = [
+        {record[3]: compact_components[record[3]] for record in batch if record[3] in compact_components}
+        for batch in batches
+    ]
+
+    if pool is None:
+        with open_worker_pool(workers, start_method) as own_pool:
+            return _map_batches(own_pool, batches, batch_components)
+    return _map_batches(pool, batches, batch_components)
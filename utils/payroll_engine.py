@@ -0,0 +1,192 @@
+"""Set-based payroll engine used to process a whole pay period at once."""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from app import db
+from models import (
+    Employee,
+    PayPeriod,
+    Payroll,
+    PayrollEntry,
+    SalaryComponent,
+)
+from utils.compensation import current_compensation_subquery
+from utils.payroll_compute import (  # noqa: F401 - re-exported for callers
+    DEDUCTION_COMPONENT_TYPES,
+    PAY_PERIODS_PER_YEAR,
+    TAX_RATE,
+    ComponentInput,
+    ComputedPayslip,
+    PayslipInput,
+    compute_payslip,
+    compute_payslips_parallel,
+    open_worker_pool,
+)
+
+
+def load_payslip_inputs(period: PayPeriod, as_of=None, after_employee_id: Optional[int] = None,
+                        limit: Optional[int] = None) -> List[PayslipInput]:
+    """Load every active employee still missing a payslip for ``period``.
+
+    Each employee's current compensation is picked with the shared
+    ``current_compensation_subquery`` window, so the whole workforce is
+    loaded in a single query. ``after_employee_id`` and ``limit`` page
+    through employees in id order for chunked runs.
+    """
+    ranked = current_compensation_subquery(as_of)
+    existing = select(Payroll.employee_id).where(Payroll.pay_period_id == period.id)
+
+    query = (
+        select(
+            Employee.id,
+            ranked.c.base_salary,
+            ranked.c.salary_type,
+            ranked.c.salary_structure_id,
+        )
+        .outerjoin(ranked, (ranked.c.employee_id == Employee.id) & (ranked.c.rank == 1))
+        .where(Employee.status == 'Active', Employee.id.not_in(existing))
+        .order_by(Employee.id)
+    )
+    if after_employee_id:
+        query = query.where(Employee.id > after_employee_id)
+    if limit:
+        query = query.limit(limit)
+
+    rows = db.session.execute(query).all()
+
+    return [
+        PayslipInput(
+            employee_id=row[0],
+            base_salary=row[1] or 0.0,
+            salary_type=row[2] if row[1] is not None else '',
+            salary_structure_id=row[3],
+        )
+        for row in rows
+    ]
+
+
+def load_structure_components(structure_ids: Iterable[int]) -> Dict[int, List[ComponentInput]]:
+    """Return active salary components grouped by salary structure id."""
+    structure_ids = {sid for sid in structure_ids if sid}
+    if not structure_ids:
+        return {}
+
+    rows = db.session.execute(
+        select(
+            SalaryComponent.salary_structure_id,
+            SalaryComponent.name,
+            SalaryComponent.component_type,
+            SalaryComponent.value,
+        )
+        .where(
+            SalaryComponent.salary_structure_id.in_(structure_ids),
+            SalaryComponent.is_active.is_(True),
+        )
+        .order_by(SalaryComponent.id)
+    ).all()
+
+    components: Dict[int, List[ComponentInput]] = {}
+    for structure_id, name, component_type, value in rows:
+        components.setdefault(structure_id, []).append(ComponentInput(name, component_type, value))
+    return components
+
+
+@contextmanager
+def payroll_worker_pool(employee_count: int) -> Iterator[Optional[ProcessPoolExecutor]]:
+    """Yield one process pool for a payroll run of ``employee_count`` employees.
+
+    A pool is only started when ``PAYROLL_WORKERS`` is greater than one and
+    the run covers at least ``PAYROLL_PARALLEL_MIN_EMPLOYEES`` employees;
+    smaller runs get ``None`` and are computed in-process since starting
+    workers would cost more than it saves.
+    """
+    config = current_app.config
+    workers = config.get('PAYROLL_WORKERS', 1)
+    if workers <= 1 or employee_count < config.get('PAYROLL_PARALLEL_MIN_EMPLOYEES', 5000):
+        yield None
+        return
+
+    with open_worker_pool(workers, config.get('PAYROLL_WORKER_START_METHOD')) as pool:
+        yield pool
+
+
+def compute_payslips(inputs: List[PayslipInput], components: Dict[int, List[ComponentInput]],
+                     pool: Optional[ProcessPoolExecutor] = None) -> List[ComputedPayslip]:
+    """Compute payslips for a batch of employees in memory.
+
+    With a ``pool`` from :func:`payroll_worker_pool` the work is spread over
+    its processes; otherwise it is computed in-process.
+    """
+    if pool is not None:
+        config = current_app.config
+        return compute_payslips_parallel(
+            inputs,
+            components,
+            config.get('PAYROLL_WORKERS', 1),
+            batch_size=config.get('PAYROLL_PARALLEL_BATCH_SIZE', 2000),
+            pool=pool,
+        )
+
+    return [
+        compute_payslip(payslip_input, components.get(payslip_input.salary_structure_id, ()))
+        for payslip_input in inputs
+    ]
+
+
+def write_payslips(period: PayPeriod, payslips: List[ComputedPayslip], created_by: Optional[int] = None,
+                   status: str = 'Pending') -> int:
+    """Bulk insert ``Payroll`` and ``PayrollEntry`` rows for computed payslips.
+
+    Payslips are inserted with one executemany statement that returns their
+    ids, then all entries are inserted with a second executemany statement.
+    Nothing is committed here.
+    """
+    if not payslips:
+        return 0
+
+    now = datetime.utcnow()
+    inserted = db.session.execute(
+        insert(Payroll).returning(Payroll.employee_id, Payroll.id),
+        [
+            {
+                'employee_id': payslip.employee_id,
+                'pay_period_id': period.id,
+                'gross_pay': payslip.gross_pay,
+                'tax_amount': payslip.tax_amount,
+                'total_deductions': payslip.total_deductions,
+                'net_pay': payslip.net_pay,
+                'status': status,
+                'created_by': created_by,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for payslip in payslips
+        ],
+    )
+    payroll_ids = dict(inserted.all())
+
+    entry_rows = []
+    for payslip in payslips:
+        payroll_id = payroll_ids[payslip.employee_id]
+        for component_name, entry_type, amount in payslip.entries:
+            entry_rows.append({
+                'payroll_id': payroll_id,
+                'component_name': component_name,
+                'type': entry_type,
+                'amount': amount,
+                'is_recurring': True,
+                'created_by': created_by,
+                'created_at': now,
+                'updated_at': now,
+            })
+
+    db.session.execute(insert(PayrollEntry), entry_rows)
+    return len(payslips)
+
@@ -0,0 +1,209 @@
+"""Chunked, resumable payroll runs executed as background jobs."""
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from models import Employee, PayPeriod, Payroll, PayrollRun, PayrollRunError
+from utils.background import run_in_background
+from utils.payroll_engine import (
+    ComponentInput,
+    ComputedPayslip,
+    PayslipInput,
+    compute_payslip,
+    compute_payslips,
+    load_payslip_inputs,
+    load_structure_components,
+    payroll_worker_pool,
+    write_payslips,
+)
+from utils.payroll_summary import add_to_period_summary, refresh_period_summary
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_RUN_STATUSES = ('Queued', 'Running')
+
+
+def get_latest_run(period_id: int) -> Optional[PayrollRun]:
+    """Return the most recent payroll run for a pay period."""
+    return PayrollRun.query.filter_by(pay_period_id=period_id).order_by(PayrollRun.id.desc()).first()
+
+
+def is_run_stale(run: PayrollRun) -> bool:
+    """Whether a Queued/Running run has stopped reporting progress."""
+    stale_after = current_app.config.get('PAYROLL_RUN_STALE_SECONDS', 300)
+    last_seen = run.updated_at or run.created_at
+    return last_seen is None or datetime.utcnow() - last_seen > timedelta(seconds=stale_after)
+
+
+def start_payroll_run(period: PayPeriod, created_by: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> PayrollRun:
+    """Create (or resume) the payroll run for ``period`` and queue it.
+
+    A run that is still reporting progress is returned untouched. A run that
+    crashed or stalled is resumed from its last committed chunk instead of
+    starting over.
+    """
+    run = get_latest_run(period.id)
+
+    if run and run.status in ACTIVE_RUN_STATUSES and not is_run_stale(run):
+        return run
+
+    if run is None or run.status == 'Completed':
+        pending = db.session.query(func.count(Employee.id)).filter(
+            Employee.status == 'Active',
+            Employee.id.not_in(db.session.query(Payroll.employee_id).filter(Payroll.pay_period_id == period.id)),
+        ).scalar() or 0
+        run = PayrollRun(
+            pay_period_id=period.id,
+            chunk_size=chunk_size or current_app.config.get('PAYROLL_CHUNK_SIZE', 500),
+            total_employees=pending,
+            created_by=created_by,
+        )
+        db.session.add(run)
+
+    run.status = 'Queued'
+    run.message = None
+    run.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    run_in_background(execute_payroll_run, run.id)
+    return run
+
+
+def _write_chunk(period: PayPeriod, run: PayrollRun, payslips: List[ComputedPayslip]) -> int:
+    """Write one chunk, falling back to per-employee savepoints on failure."""
+    try:
+        with db.session.begin_nested():
+            return write_payslips(period, payslips, created_by=run.created_by)
+    except Exception as exc:
+        logger.warning('Bulk write failed for payroll run %s, retrying per employee: %s', run.id, exc)
+
+    written = 0
+    for payslip in payslips:
+        try:
+            with db.session.begin_nested():
+                written += write_payslips(period, [payslip], created_by=run.created_by)
+        except Exception as exc:
+            db.session.add(PayrollRunError(run_id=run.id, employee_id=payslip.employee_id, message=str(exc)))
+            run.failed_count += 1
+    return written
+
+
+def _compute_chunk(run: PayrollRun, inputs: List[PayslipInput], components: Dict[int, List[ComponentInput]],
+                   pool: Optional[ProcessPoolExecutor] = None) -> List[ComputedPayslip]:
+    """Compute a chunk, isolating failures to the employees that caused them.
+
+    The whole chunk is computed in one go (in the run's process pool when it
+    has one); if that fails, it is recomputed one employee at a time so a
+    single bad record only fails itself.
+    """
+    try:
+        return compute_payslips(inputs, components, pool=pool)
+    except Exception as exc:
+        logger.warning('Batch computation failed for payroll run %s, retrying per employee: %s', run.id, exc)
+
+    payslips = []
+    for payslip_input in inputs:
+        try:
+            payslips.append(compute_payslip(payslip_input, components.get(payslip_input.salary_structure_id, ())))
+        except Exception as exc:
+            db.session.add(PayrollRunError(run_id=run.id, employee_id=payslip_input.employee_id, message=str(exc)))
+            run.failed_count += 1
+    return payslips
+
+
+def process_next_chunk(run: PayrollRun, period: PayPeriod, pool: Optional[ProcessPoolExecutor] = None) -> bool:
+    """Compute, write and commit the next chunk of a run.
+
+    Payslips, their period summary totals and the run cursor are committed
+    in the same transaction, so a crash never loses or duplicates a chunk. ``pool`` is the run's worker
+    pool, shared by all of its chunks.
+
+    Returns:
+        bool: ``True`` if a chunk was processed, ``False`` when nothing is left.
+    """
+    inputs = load_payslip_inputs(period, after_employee_id=run.last_employee_id, limit=run.chunk_size)
+    if not inputs:
+        return False
+
+    components = load_structure_components(i.salary_structure_id for i in inputs)
+    payslips = _compute_chunk(run, inputs, components, pool)
+
+    run.processed_count += _write_chunk(period, run, payslips)
+    add_to_period_summary(period.id, [payslip.employee_id for payslip in payslips])
+    run.last_employee_id = inputs[-1].employee_id
+    run.updated_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def execute_payroll_run(run_id: int) -> None:
+    """Process a payroll run chunk by chunk until every employee is covered."""
+    run = db.session.get(PayrollRun, run_id)
+    if run is None or run.status == 'Completed':
+        return
+
+    period = db.session.get(PayPeriod, run.pay_period_id)
+    run.status = 'Running'
+    run.started_at = run.started_at or datetime.utcnow()
+    db.session.commit()
+
+    try:
+        # One pool for the whole run; whether to parallelize depends on the
+        # run's size, not on the size of a single chunk
+        with payroll_worker_pool(run.remaining_count) as pool:
+            while process_next_chunk(run, period, pool):
+                pass
+
+        refresh_period_summary(period.id)
+        run.status = 'Completed'
+        run.finished_at = datetime.utcnow()
+        if period.status == 'Draft':
+            period.status = 'Processing'
+            period.updated_at = datetime.now()
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        logger.exception('Payroll run %s failed', run_id)
+        run = db.session.get(PayrollRun, run_id)
+        run.status = 'Failed'
+        run.message = str(exc)
+        run.finished_at = datetime.utcnow()
+        # Match the summary to the chunks that were committed
+        refresh_period_summary(run.pay_period_id)
+        db.session.commit()
+
+
+def run_progress(run: Optional[PayrollRun]) -> dict:
+    """Serialize a run's progress for the JSON status endpoint."""
+    if run is None:
+        return {'status': 'NotStarted'}
+
+    total = run.total_employees or 0
+    done = run.processed_count + run.failed_count
+    return {
+        'id': run.id,
+        'pay_period_id': run.pay_period_id,
+        'status': run.status,
+        'chunk_size': run.chunk_size,
+        'total': total,
+        'processed': run.processed_count,
+        'failed': run.failed_count,
+        'remaining': run.remaining_count,
+        'percent': round(done * 100.0 / total, 1) if total else (100.0 if run.status == 'Completed' else 0.0),
+        'message': run.message,
+        'stale': run.status in ACTIVE_RUN_STATUSES and is_run_stale(run),
+        'errors': [
+            {'employee_id': error.employee_id, 'message': error.message}
+            for error in run.errors.order_by(PayrollRunError.id).limit(100)
+        ],
+        'started_at': run.started_at.isoformat() if run.started_at else None,
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+    }
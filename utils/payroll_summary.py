@@ -0,0 +1,210 @@
+"""Materialized per-department payroll totals for pay periods.
+
+``payroll_period_summaries`` holds one row per (period, department) with
+headcount and pay totals, so period pages and listings read a handful of
+rows instead of aggregating every payslip. Each chunk of a payroll run adds
+its payslips in the same commit, rows are rebuilt with a single
+INSERT ... SELECT when a run ends or a period is completed, and adjusted in
+place when one payslip is edited.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from app import db
+from models import Department, Employee, Payroll, PayrollPeriodSummary
+
+SUMMARY_AMOUNT_FIELDS = ('total_gross', 'total_net', 'total_tax', 'total_deductions')
+
+# Payslip column feeding each summary total
+_PAYSLIP_FIELDS = {
+    'total_gross': 'gross_pay',
+    'total_net': 'net_pay',
+    'total_tax': 'tax_amount',
+    'total_deductions': 'total_deductions',
+}
+
+
+@dataclass
+class PeriodTotals:
+    """Headcount and pay totals of one pay period."""
+    headcount: int = 0
+    total_gross: float = 0.0
+    total_net: float = 0.0
+    total_tax: float = 0.0
+    total_deductions: float = 0.0
+
+
+def refresh_period_summary(period_id: int) -> None:
+    """Rebuild the summary rows of a period from its payslips.
+
+    The caller is responsible for committing.
+    """
+    db.session.execute(delete(PayrollPeriodSummary).where(PayrollPeriodSummary.pay_period_id == period_id))
+    aggregate = (
+        select(
+            Payroll.pay_period_id,
+            Employee.department_id,
+            func.count(Payroll.id),
+            func.coalesce(func.sum(Payroll.gross_pay), 0.0),
+            func.coalesce(func.sum(Payroll.net_pay), 0.0),
+            func.coalesce(func.sum(Payroll.tax_amount), 0.0),
+            func.coalesce(func.sum(Payroll.total_deductions), 0.0),
+            literal(datetime.utcnow()),
+        )
+        .join(Employee, Employee.id == Payroll.employee_id)
+        .where(Payroll.pay_period_id == period_id)
+        .group_by(Payroll.pay_period_id, Employee.department_id)
+    )
+    db.session.execute(
+        insert(PayrollPeriodSummary).from_select(
+            ['pay_period_id', 'department_id', 'headcount', 'total_gross', 'total_net',
+             'total_tax', 'total_deductions', 'refreshed_at'],
+            aggregate,
+        )
+    )
+
+
+def add_to_period_summary(period_id: int, employee_ids: Iterable[int]) -> None:
+    """Add the payslips of ``employee_ids`` to the period's summary rows.
+
+    Used by payroll runs right after a chunk of payslips is written, so the
+    summary is committed together with them. Departments without a row yet
+    get one. The caller is responsible for committing.
+    """
+    employee_ids = list(employee_ids)
+    if not employee_ids:
+        return
+
+    added = db.session.execute(
+        select(
+            Employee.department_id,
+            func.count(Payroll.id),
+            func.coalesce(func.sum(Payroll.gross_pay), 0.0),
+            func.coalesce(func.sum(Payroll.net_pay), 0.0),
+            func.coalesce(func.sum(Payroll.tax_amount), 0.0),
+            func.coalesce(func.sum(Payroll.total_deductions), 0.0),
+        )
+        .join(Employee, Employee.id == Payroll.employee_id)
+        .where(Payroll.pay_period_id == period_id, Payroll.employee_id.in_(employee_ids))
+        .group_by(Employee.department_id)
+    ).all()
+    if not added:
+        return
+
+    rows = {
+        row.department_id: row
+        for row in db.session.scalars(
+            select(PayrollPeriodSummary).where(PayrollPeriodSummary.pay_period_id == period_id)
+        )
+    }
+    now = datetime.utcnow()
+    for department_id, headcount, *amounts in added:
+        row = rows.get(department_id)
+        if row is None:
+            row = PayrollPeriodSummary(pay_period_id=period_id, department_id=department_id, headcount=0,
+                                       **{field: 0.0 for field in SUMMARY_AMOUNT_FIELDS})
+            db.session.add(row)
+        row.headcount += headcount
+        for field, amount in zip(SUMMARY_AMOUNT_FIELDS, amounts):
+            setattr(row, field, getattr(row, field) + amount)
+        row.refreshed_at = now
+
+
+def payslip_amounts(payslip: Payroll) -> Dict[str, float]:
+    """Snapshot of the payslip amounts that feed the summary."""
+    return {field: getattr(payslip, column) or 0.0 for field, column in _PAYSLIP_FIELDS.items()}
+
+
+def apply_payslip_change(payslip: Payroll, previous: Dict[str, float]) -> None:
+    """Adjust the summary row of ``payslip``'s department after an edit.
+
+    ``previous`` is the :func:`payslip_amounts` snapshot taken before the
+    edit. Falls back to a full refresh when the period has no summary row
+    for the department yet. The caller is responsible for committing.
+    """
+    department_id = db.session.scalar(select(Employee.department_id).where(Employee.id == payslip.employee_id))
+    row = db.session.scalar(
+        select(PayrollPeriodSummary).where(
+            PayrollPeriodSummary.pay_period_id == payslip.pay_period_id,
+            PayrollPeriodSummary.department_id.is_not_distinct_from(department_id),
+        )
+    )
+    if row is None:
+        db.session.flush()
+        refresh_period_summary(payslip.pay_period_id)
+        return
+
+    current = payslip_amounts(payslip)
+    for field in SUMMARY_AMOUNT_FIELDS:
+        setattr(row, field, (getattr(row, field) or 0.0) + current[field] - previous.get(field, 0.0))
+    row.refreshed_at = datetime.utcnow()
+
+
+def get_period_summary(period_id: int) -> List[PayrollPeriodSummary]:
+    """Summary rows of a period with their departments, largest first."""
+    return db.session.scalars(
+        select(PayrollPeriodSummary)
+        .outerjoin(Department, Department.id == PayrollPeriodSummary.department_id)
+        .where(PayrollPeriodSummary.pay_period_id == period_id)
+        .order_by(PayrollPeriodSummary.total_gross.desc(), Department.name)
+    ).all()
+
+
+def _payroll_totals(period_ids: List[int]) -> Dict[int, PeriodTotals]:
+    query = (
+        select(
+            Payroll.pay_period_id,
+            func.count(Payroll.id),
+            func.sum(Payroll.gross_pay),
+            func.sum(Payroll.net_pay),
+            func.sum(Payroll.tax_amount),
+            func.sum(Payroll.total_deductions),
+        )
+        .where(Payroll.pay_period_id.in_(period_ids))
+        .group_by(Payroll.pay_period_id)
+    )
+    return {
+        period_id: PeriodTotals(headcount or 0, gross or 0.0, net or 0.0, tax or 0.0, deductions or 0.0)
+        for period_id, headcount, gross, net, tax, deductions in db.session.execute(query)
+    }
+
+
+def period_totals(period_ids: Iterable[int]) -> Dict[int, PeriodTotals]:
+    """Period-level totals for every id in ``period_ids``.
+
+    Reads the summary rows with one grouped query. Periods that have not
+    been summarized yet are aggregated from their payslips in one more
+    query, and periods without payslips get zero totals.
+    """
+    period_ids = list(period_ids)
+    if not period_ids:
+        return {}
+
+    query = (
+        select(
+            PayrollPeriodSummary.pay_period_id,
+            func.sum(PayrollPeriodSummary.headcount),
+            func.sum(PayrollPeriodSummary.total_gross),
+            func.sum(PayrollPeriodSummary.total_net),
+            func.sum(PayrollPeriodSummary.total_tax),
+            func.sum(PayrollPeriodSummary.total_deductions),
+        )
+        .where(PayrollPeriodSummary.pay_period_id.in_(period_ids))
+        .group_by(PayrollPeriodSummary.pay_period_id)
+    )
+    totals = {
+        period_id: PeriodTotals(headcount or 0, gross or 0.0, net or 0.0, tax or 0.0, deductions or 0.0)
+        for period_id, headcount, gross, net, tax, deductions in db.session.execute(query)
+    }
+
+    missing = [period_id for period_id in period_ids if period_id not in totals]
+    if missing:
+        totals.update(_payroll_totals(missing))
+    for period_id in period_ids:
+        totals.setdefault(period_id, PeriodTotals())
+    return totals
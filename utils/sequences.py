@@ -0,0 +1,35 @@
+"""Block allocation of sequential numbers shared across processes."""
+from __future__ import annotations
+
+from typing import Callable, Union
+
+from sqlalchemy import select, update
+
+from app import db
+from models import IdSequence
+
+
+def allocate_block(name: str, size: int, initial: Union[int, Callable[[], int]] = 1) -> range:
+    """Reserve ``size`` consecutive numbers from the sequence ``name``.
+
+    The counter is advanced with a single UPDATE, which holds the row lock
+    until the caller's transaction ends, so concurrent allocations never
+    overlap. ``initial`` (a value or a callable) seeds a sequence that does
+    not exist yet. The caller is responsible for committing.
+    """
+    if size <= 0:
+        return range(0)
+
+    advanced = db.session.execute(
+        update(IdSequence)
+        .where(IdSequence.name == name)
+        .values(next_value=IdSequence.next_value + size)
+    )
+    if advanced.rowcount == 0:
+        start = initial() if callable(initial) else initial
+        db.session.add(IdSequence(name=name, next_value=start + size))
+        db.session.flush()
+        return range(start, start + size)
+
+    next_value = db.session.scalar(select(IdSequence.next_value).where(IdSequence.name == name))
+    return range(next_value - size, next_value)
@@ -0,0 +1,134 @@
+"""Create and prefill every active employee's timesheet when a period opens.
+
+Instead of each employee's first visit creating their timesheet and
+filling it from attendance, a background job does the whole workforce in
+batches of employees. Each batch is a fixed set of statements: one
+``INSERT ... SELECT ... ON CONFLICT DO NOTHING`` for the missing
+timesheets, one ``INSERT ... SELECT`` for the time entries of days with
+attendance, one ``UPDATE`` filling entries saved with zero hours, and one
+recomputing the timesheets' totals.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, exists, func, insert, literal, select, update
+
+from app import db
+from models import AttendanceDaily, BackgroundJob, Employee, PayPeriod, TimeEntry, Timesheet
+from utils.attendance_hours import hours_expression
+from utils.date_ranges import DateRange
+from utils.jobs import create_job, start_job, update_progress
+from utils.timesheet_service import AUTO_FILL_DESCRIPTION
+from utils.upserts import dialect_insert
+
+# Employees handled per committed batch
+TIMESHEET_BATCH_SIZE = 1000
+
+# Only timesheets their employee can still edit are prefilled
+EDITABLE_STATUSES = ('Draft', 'Rejected')
+
+
+def _create_timesheets(period_id: int, employee_ids, now: datetime) -> int:
+    # Employees opening their timesheet meanwhile create it too; theirs is kept
+    employees = select(
+        Employee.id, literal(period_id), literal('Draft'), literal(0.0), literal(now), literal(now),
+    ).where(Employee.id.in_(employee_ids))
+    result = db.session.execute(
+        dialect_insert(Timesheet)
+        .from_select(['employee_id', 'pay_period_id', 'status', 'total_hours', 'created_at', 'updated_at'],
+                     employees)
+        .on_conflict_do_nothing(index_elements=['employee_id', 'pay_period_id'])
+    )
+    return result.rowcount
+
+
+def _prefill_entries(period_id: int, period: DateRange, employee_ids, now: datetime) -> Dict[str, int]:
+    hours = hours_expression()
+    day_of_timesheet = and_(
+        Timesheet.employee_id == AttendanceDaily.employee_id,
+        Timesheet.pay_period_id == period_id,
+        Timesheet.status.in_(EDITABLE_STATUSES),
+    )
+    in_scope = (period.filter(AttendanceDaily.date), AttendanceDaily.employee_id.in_(employee_ids), hours > 0)
+
+    has_entry = exists().where(TimeEntry.timesheet_id == Timesheet.id, TimeEntry.date == AttendanceDaily.date)
+    new_entries = select(
+        Timesheet.id, AttendanceDaily.date, hours, literal(AUTO_FILL_DESCRIPTION), literal(now), literal(now),
+    ).join(Timesheet, day_of_timesheet).where(*in_scope, ~has_entry)
+    created = db.session.execute(insert(TimeEntry).from_select(
+        ['timesheet_id', 'date', 'hours', 'description', 'created_at', 'updated_at'], new_entries)).rowcount
+
+    # Entries saved with zero hours are filled too, as a visit would
+    attendance_hours = (
+        select(hours).join(Timesheet, day_of_timesheet)
+        .where(*in_scope, Timesheet.id == TimeEntry.timesheet_id, AttendanceDaily.date == TimeEntry.date)
+        .scalar_subquery()
+    )
+    filled = db.session.execute(
+        update(TimeEntry)
+        .where(TimeEntry.hours == 0, period.filter(TimeEntry.date), attendance_hours > 0)
+        .values(hours=attendance_hours, description=AUTO_FILL_DESCRIPTION, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return {'entries_created': created, 'entries_filled': filled}
+
+
+def _refresh_totals(period_id: int, employee_ids) -> None:
+    total = (
+        select(func.coalesce(func.sum(TimeEntry.hours), 0.0))
+        .where(TimeEntry.timesheet_id == Timesheet.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(Timesheet)
+        .where(Timesheet.pay_period_id == period_id, Timesheet.employee_id.in_(employee_ids),
+               Timesheet.status.in_(EDITABLE_STATUSES))
+        .values(total_hours=total)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def generate_period_timesheets(period: PayPeriod, progress: Optional[Callable[[int, int], None]] = None
+                               ) -> Dict[str, int]:
+    """Create missing timesheets for every active employee and prefill them.
+
+    Days with attendance get a time entry unless one with hours exists.
+    Each batch of employees is committed before ``progress(processed,
+    total)`` is called; running it again only adds what is still missing.
+    """
+    employee_ids = db.session.scalars(
+        select(Employee.id).where(Employee.status == 'Active').order_by(Employee.id)
+    ).all()
+    days = DateRange.for_period(period)
+    counts = {'employees': len(employee_ids), 'timesheets_created': 0, 'entries_created': 0, 'entries_filled': 0}
+
+    for start in range(0, len(employee_ids), TIMESHEET_BATCH_SIZE):
+        batch = employee_ids[start:start + TIMESHEET_BATCH_SIZE]
+        now = datetime.utcnow()
+        counts['timesheets_created'] += _create_timesheets(period.id, batch, now)
+        for key, value in _prefill_entries(period.id, days, batch, now).items():
+            counts[key] += value
+        _refresh_totals(period.id, batch)
+        db.session.commit()
+        if progress:
+            progress(start + len(batch), len(employee_ids))
+    return counts
+
+
+def run_period_timesheets_job(job: BackgroundJob) -> dict:
+    """Background job entry point; the period comes from ``job.params``."""
+    period = db.session.get(PayPeriod, job.params['period_id'])
+    if period is None:
+        raise ValueError('Pay period no longer exists.')
+    counts = generate_period_timesheets(
+        period, progress=lambda processed, total: update_progress(job, processed=processed, total=total))
+    return {'period_id': period.id, **counts}
+
+
+def start_period_timesheets_job(period: PayPeriod, created_by: Optional[int] = None) -> BackgroundJob:
+    """Queue creating and prefilling the timesheets of ``period``."""
+    active = db.session.scalar(select(func.count(Employee.id)).where(Employee.status == 'Active')) or 0
+    job = create_job('period_timesheets', created_by=created_by, params={'period_id': period.id}, total=active)
+    return start_job(job, run_period_timesheets_job)
@@ -1,12 +1,19 @@
 """Service helpers for timesheet operations."""
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import Iterable, Tuple
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
 
 from app import db
 from models import Employee, TimeEntry, Timesheet
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from utils.attendance_hours import employee_attendance_hours
+from utils.dashboard_stats import invalidate_dashboard_stats
+from utils.date_ranges import DateRange
+from utils.leave_accrual import accrue_leave_for_timesheets
+
+AUTO_FILL_DESCRIPTION = 'Auto-filled from attendance records'
 
 
 class TimesheetService:
@@ -37,35 +44,93 @@ class TimesheetService:
         return prev_employee, next_employee
 
     @staticmethod
-    def update_entries_from_form(timesheet: Timesheet, form: dict) -> None:
-        """Update timesheet entries based on submitted form data."""
-        start_date = timesheet.pay_period.start_date
-        end_date = timesheet.pay_period.end_date
-        current_date = start_date
-
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            hours_raw = form.get(f'hours_{date_str}', '0')
-            description = form.get(f'description_{date_str}', '')
-            entry = TimeEntry.query.filter_by(timesheet_id=timesheet.id, date=current_date).first()
+    def update_entries_from_form(timesheet: Timesheet, form: dict) -> int:
+        """Save the hours and descriptions submitted for each day of the period.
+
+        Existing entries are read once and only days whose values changed are
+        written, as one bulk insert and one bulk update; ``total_hours`` is
+        adjusted by the difference in the database. Days left empty get no entry. Raises
+        ``ValueError`` before writing anything if a day's hours aren't a
+        number. Returns the number of days changed and commits when any did.
+        """
+        submitted = {}
+        for day in DateRange.for_period(timesheet.pay_period).days():
+            date_str = day.strftime('%Y-%m-%d')
+            hours_raw = form.get(f'hours_{date_str}', '')
             try:
-                hours_val = float(hours_raw) if hours_raw else 0
+                hours = float(hours_raw) if hours_raw else 0.0
             except ValueError:
-                hours_val = 0
+                raise ValueError(f'Invalid hours for {date_str}: {hours_raw!r}') from None
+            submitted[day] = (hours, form.get(f'description_{date_str}', ''))
 
-            if entry:
-                entry.hours = hours_val
-                entry.description = description
-            else:
-                if hours_val > 0 or description:
-                    entry = TimeEntry(timesheet_id=timesheet.id, date=current_date, hours=hours_val, description=description)
-                    db.session.add(entry)
+        existing = {
+            row.date: row for row in db.session.execute(
+                select(TimeEntry.id, TimeEntry.date, TimeEntry.hours, TimeEntry.description)
+                .where(TimeEntry.timesheet_id == timesheet.id)
+            )
+        }
+        inserts, updates = [], []
+        hours_delta = 0.0
+        for day, (hours, description) in submitted.items():
+            entry = existing.get(day)
+            if entry is None:
+                if hours > 0 or description:
+                    inserts.append({'timesheet_id': timesheet.id, 'date': day, 'hours': hours,
+                                    'description': description})
+                    hours_delta += hours
+            elif entry.hours != hours or (entry.description or '') != description:
+                updates.append({'id': entry.id, 'hours': hours, 'description': description})
+                hours_delta += hours - (entry.hours or 0)
 
-            current_date += timedelta(days=1)
+        if inserts:
+            db.session.execute(insert(TimeEntry), inserts)
+        if updates:
+            db.session.execute(update(TimeEntry), updates)
+        if inserts or updates:
+            # Added in SQL so concurrent saves of the timesheet don't lose each other's hours
+            total_hours = db.session.scalar(
+                update(Timesheet)
+                .where(Timesheet.id == timesheet.id)
+                .values(total_hours=func.coalesce(Timesheet.total_hours, 0) + hours_delta)
+                .returning(Timesheet.total_hours)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            set_committed_value(timesheet, 'total_hours', total_hours)
+        return len(inserts) + len(updates)
 
-        # Recalculate total hours
-        timesheet.total_hours = db.session.query(func.sum(TimeEntry.hours)).filter(TimeEntry.timesheet_id == timesheet.id).scalar() or 0
-        db.session.commit()
+    @staticmethod
+    def fill_from_attendance(timesheet: Timesheet, hours: Optional[Dict[date, float]] = None) -> bool:
+        """Fill days without hours from attendance; return whether anything changed.
+
+        ``hours`` is the employee's date -> hours map for the period when it
+        was already fetched for a whole workforce; otherwise it is read with
+        one query. Commits when entries change.
+        """
+        period = DateRange.for_period(timesheet.pay_period)
+        if hours is None:
+            hours = employee_attendance_hours(timesheet.employee_id, period)
+
+        entries = {entry.date: entry for entry in TimeEntry.query.filter_by(timesheet_id=timesheet.id)}
+        updates_made = False
+        for day, day_hours in sorted(hours.items()):
+            if day not in period or day_hours <= 0:
+                continue
+            entry = entries.get(day)
+            if entry is None:
+                entries[day] = TimeEntry(timesheet_id=timesheet.id, date=day, hours=day_hours,
+                                         description=AUTO_FILL_DESCRIPTION)
+                db.session.add(entries[day])
+                updates_made = True
+            elif entry.hours == 0:
+                entry.hours = day_hours
+                entry.description = AUTO_FILL_DESCRIPTION
+                updates_made = True
+
+        if updates_made:
+            timesheet.total_hours = sum(entry.hours or 0 for entry in entries.values())
+            db.session.commit()
+        return updates_made
 
     @staticmethod
     def submit_timesheet(timesheet: Timesheet) -> None:
@@ -88,3 +153,61 @@ class TimesheetService:
         timesheet.approved_at = datetime.now()
         timesheet.comments = comments
         db.session.commit()
+
+    @staticmethod
+    def review_timesheets(timesheet_ids: Iterable[int], approve: bool, reviewer, comments: str = '') -> Dict[int, dict]:
+        """Approve or reject many submitted timesheets at once.
+
+        Timesheets that aren't Submitted, or that ``reviewer`` may not review
+        (Admin and HR review all, managers their direct reports), are
+        skipped. The rest change status with one UPDATE and, when approved,
+        accrue leave as one batch; all of it commits together. Returns a
+        result per requested id with ``status`` (the new status, or
+        ``None`` if skipped), ``message`` and the ``accrued`` leave hours.
+        """
+        timesheet_ids = list(dict.fromkeys(timesheet_ids))
+        results = {timesheet_id: {'status': None, 'message': 'Timesheet not found.', 'accrued': {}}
+                   for timesheet_id in timesheet_ids}
+        reviews_all = reviewer.role.name in ['Admin', 'HR']
+        reviewer_employee_id = reviewer.employee.id if reviewer.employee else None
+
+        eligible = []
+        rows = db.session.execute(
+            select(Timesheet.id, Timesheet.status, Employee.manager_id)
+            .join(Employee, Employee.id == Timesheet.employee_id)
+            .where(Timesheet.id.in_(timesheet_ids))
+        )
+        for row in rows:
+            if not reviews_all and (reviewer_employee_id is None or row.manager_id != reviewer_employee_id):
+                results[row.id]['message'] = 'You do not have permission to review this timesheet.'
+            elif row.status != 'Submitted':
+                results[row.id]['message'] = f'Only submitted timesheets can be reviewed (status is {row.status}).'
+            else:
+                eligible.append(row.id)
+        if not eligible:
+            return results
+
+        if approve:
+            values = {'status': 'Approved', 'approved_by': reviewer.id, 'approved_at': datetime.now(),
+                      'comments': comments}
+        else:
+            values = {'status': 'Rejected', 'comments': comments}
+        # The status guard skips timesheets reviewed since they were read
+        reviewed = db.session.scalars(
+            update(Timesheet)
+            .where(Timesheet.id.in_(eligible), Timesheet.status == 'Submitted')
+            .values(**values)
+            .returning(Timesheet.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        accrued = accrue_leave_for_timesheets(reviewed) if approve else {}
+        db.session.commit()
+        if accrued:
+            invalidate_dashboard_stats()
+
+        for timesheet_id in eligible:
+            results[timesheet_id]['message'] = 'Timesheet was reviewed by someone else.'
+        for timesheet_id in reviewed:
+            results[timesheet_id] = {'status': values['status'], 'message': f"Timesheet {values['status'].lower()}.",
+                                     'accrued': accrued.get(timesheet_id, {})}
+        return results
@@ -0,0 +1,23 @@
+"""Dialect-specific ``INSERT`` statements for ``ON CONFLICT`` upserts."""
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+
+# PostgreSQL in production, SQLite in development and tests
+_DIALECT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def dialect_insert(model, bind=None):
+    """``insert(model)`` of the bind's dialect, with ``on_conflict_do_*`` support.
+
+    ``bind`` is a connection or engine; the session's bind by default.
+    Raises ``NotImplementedError`` for dialects without a supported upsert.
+    """
+    bind = bind if bind is not None else db.session.get_bind()
+    dialect = bind.dialect.name
+    if dialect not in _DIALECT_INSERTS:
+        supported = ', '.join(sorted(_DIALECT_INSERTS))
+        raise NotImplementedError(f'Upserts are not supported on {dialect!r}; use one of: {supported}.')
+    return _DIALECT_INSERTS[dialect](model)